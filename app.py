@@ -1,13 +1,19 @@
 from functools import lru_cache
+import asyncio
+import json
 import os
-import tempfile
-from typing import List, Optional
+import shutil
+from typing import Any, Dict, List, Literal, Optional
 
 from dotenv import load_dotenv
-from fastapi import APIRouter, FastAPI, File, Form, HTTPException, UploadFile, Body
-from pydantic import BaseModel
+from fastapi import APIRouter, FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
 
+from src.api.api_utils import UploadTooLargeError, save_upload
 from src.retrieval.vector_store import get_vector_store
+from src.services.ingestion_jobs import QueueFullError, TERMINAL_STATES, get_job_manager
 
 load_dotenv()
 
@@ -76,14 +82,30 @@ async def debug_info():
         doc_count = store.get_document_count()
     except Exception:
         doc_count = len(getattr(store, '_memory', []))
+    from src.retrieval.embedding_cache import get_embedding_cache, get_query_embedding_lru
+    from src.retrieval.embedding_dispatcher import get_embedding_dispatcher
+    embedding_cache = get_embedding_cache()
+    dispatcher = get_embedding_dispatcher()
     return {
         "qdrant_path": os.getenv("QDRANT_PATH", "./data/qdrant_db"),
         "collection": os.getenv("QDRANT_COLLECTION", "enterprise_knowledge"),
         "documents_indexed": doc_count,
+        "fallback_points": len(store._memory) if hasattr(store, "_memory") else 0,
         "embedding_model": os.getenv("EMBEDDING_MODEL", "BAAI/bge-large-en-v1.5"),
+        # The backend actually serving (onnx-int8 falls back to torch if it fails to load)
+        "embedding_backend": getattr(getattr(store, "model", None), "backend", "torch"),
+        "vector_dim": getattr(store, "dimension", None),
+        "vector_projection": store.projection.kind if getattr(store, "projection", None) else None,
+        "vector_index": {
+            **store.index_settings(),
+            "estimated_ram_mb": round(store.profile.ram_bytes(doc_count, store.dimension) / 1e6, 1),
+        } if hasattr(store, "index_settings") else None,
         "llm_model": os.getenv("LLM_MODEL", "llama3"),
         "num_ctx": int(os.getenv("LLM_NUM_CTX", "8192")),
         "score_threshold": SCORE_THRESHOLD,
+        "embedding_cache": embedding_cache.stats() if embedding_cache else None,
+        "query_embedding_cache": get_query_embedding_lru().stats(),
+        "embedding_dispatcher": dispatcher.stats() if dispatcher else None,
     }
 
 
@@ -93,8 +115,13 @@ async def hello():
 
 
 # ── Upload ────────────────────────────────────────────────────────────────────
-@router.post("/upload")
+@router.post("/upload", status_code=202)
 async def upload_document(file: UploadFile = File(...)):
+    """
+    Save the upload and queue it for background ingestion.
+    Returns a job ID immediately; poll GET /api/jobs/{job_id} (or stream
+    GET /api/jobs/{job_id}/events) for progress and the final result.
+    """
     allowed = {".pdf", ".docx", ".txt"}
     ext = os.path.splitext(file.filename or "")[-1].lower()
     if ext not in allowed:
@@ -103,55 +130,125 @@ async def upload_document(file: UploadFile = File(...)):
             detail=f"File type '{ext}' is not supported. Allowed: {', '.join(allowed)}"
         )
 
-    temp_path = os.path.join(tempfile.gettempdir(), file.filename)
-    with open(temp_path, "wb") as f:
-        f.write(await file.read())
+    try:
+        temp_dir, temp_path, file_hash, _ = await save_upload(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
     try:
-        from pipelines.ingestion_pipeline import run_ingestion
-        result = run_ingestion(temp_path)
-        if result["status"] == "error":
-            raise HTTPException(status_code=422, detail=result["error"])
-        return {
-            "status": "success",
-            "filename": result["filename"],
-            "chunks_indexed": result["chunks_indexed"],
-        }
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        job_id = get_job_manager().submit(
+            temp_path, cleanup_dir=temp_dir, store=_vector_store(), file_hash=file_hash
+        )
+    except QueueFullError as e:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise HTTPException(status_code=429, detail=f"Ingestion queue is full: {e}")
+    return {
+        "status": "queued",
+        "job_id": job_id,
+        "filename": os.path.basename(temp_path),
+        "sha256": file_hash,
+        "status_url": f"/api/jobs/{job_id}",
+    }
+
+
+# ── Ingestion jobs ────────────────────────────────────────────────────────────
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Status, progress counters and (once finished) the ingestion result of a job."""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'.")
+    return job
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent events: one `data:` line per job change until it finishes."""
+    manager = get_job_manager()
+    if manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'.")
+
+    async def _events():
+        version = -1
+        while True:
+            job = manager.get(job_id)
+            if job is None:
+                return
+            if job["version"] != version:
+                version = job["version"]
+                yield f"data: {json.dumps(job)}\n\n"
+            if job["status"] in TERMINAL_STATES:
+                return
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(_events(), media_type="text/event-stream")
 
 
 # ── Ask ───────────────────────────────────────────────────────────────────────
 class AskRequest(BaseModel):
     question: str
     history: Optional[List[dict]] = None
+    # Search effort: fast (chat), balanced, exact (recall-critical); default SEARCH_PROFILE
+    search_profile: Optional[Literal["fast", "balanced", "exact"]] = None
+    # Metadata conditions applied inside the vector search (src/retrieval/filters.py),
+    # e.g. {"source": "contract_x.pdf", "type": "ocr", "page": {"gte": 3}}
+    filters: Optional[Dict[str, Any]] = None
 
 
-@router.post("/ask")
-async def ask_question(
-    payload: Optional[AskRequest] = Body(None),
-    question: Optional[str] = Form(None),
-):
+@router.post(
+    "/ask",
+    openapi_extra={"requestBody": {"content": {"application/json": {"schema": AskRequest.model_json_schema()}}}},
+)
+async def ask_question(request: Request):
     """
     Answer a question based on indexed documents.
-    Accepts JSON body (preferred) or form-data 'question'.
+    Accepts JSON body (preferred) or form-data 'question' / 'search_profile' /
+    'filters' (a JSON object).
     """
-    if payload is not None and getattr(payload, "question", None):
-        q = payload.question
-        history = payload.history or []
-    elif question:
-        q = question
-        history = []
+    # The body is parsed by hand: FastAPI reads a mix of Body and Form
+    # parameters as form data only, which rejected every JSON request
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            data = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Request body is not valid JSON.")
     else:
+        data = dict(await request.form())
+        if isinstance(data.get("filters"), str):
+            try:
+                data["filters"] = json.loads(data["filters"]) if data["filters"].strip() else None
+            except ValueError:
+                raise HTTPException(status_code=422, detail="'filters' must be a JSON object.")
+    if not isinstance(data, dict) or not data.get("question"):
         raise HTTPException(status_code=422, detail="'question' is required.")
+    try:
+        payload = AskRequest.model_validate(data)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=json.loads(e.json()))
+    q = payload.question
+    history = payload.history or []
 
     if not q or not q.strip():
         raise HTTPException(status_code=422, detail="Question cannot be empty.")
 
+    store = _vector_store()
+    try:
+        if hasattr(store, "check_filters"):
+            filters = store.check_filters(payload.filters)
+        else:
+            from src.retrieval.filters import normalize_filters
+            filters = normalize_filters(payload.filters)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
     # ── Delegate to retrieval pipeline ───────────────────────────────────────
+    # Off the event loop: retrieval blocks (embedding, search, LLM call), and
+    # concurrent questions must overlap for query micro-batching to group them
     from pipelines.retrieval_pipeline import run_retrieval
-    result = run_retrieval(q, history=history, store=_vector_store())
+    result = await run_in_threadpool(
+        run_retrieval,
+        q, history=history, store=store, search_profile=payload.search_profile, filters=filters or None,
+    )
     return {
         "answer": result["answer"],
         "sources": result["sources"],
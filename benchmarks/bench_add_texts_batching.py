@@ -0,0 +1,102 @@
+"""
+benchmarks/bench_add_texts_batching.py
+Chunks/sec of the add_texts path before and after length-bucketed batching:
+
+  before: model.encode(all chunks) in input order with the default batch size,
+          .tolist() to nested lists, PointStruct per chunk, client.upsert
+  after:  encode_bucketed (token-length sorted, EMBED_ENCODE_BATCH /
+          EMBED_TOKEN_BUDGET batches) into one float32 array, upload_collection
+
+The corpus mixes short chunks (headings, table rows, tails of sections) with
+full-size ones, as real chunking produces. Uses an in-memory Qdrant.
+
+    python benchmarks/bench_add_texts_batching.py
+    python benchmarks/bench_add_texts_batching.py --embedding-model all-MiniLM-L6-v2 --chunks 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+_WORDS = (
+    "employees are entitled to annual leave of twenty five days per year the notice period "
+    "for contractors is thirty days travel expenses must be approved by a line manager payroll "
+    "is processed on the last working day of each month confidential information must not be "
+    "disclosed to third parties without written consent of the company data protection officer"
+).split()
+
+
+def make_chunks(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    chunks = []
+    for _ in range(n):
+        words = rng.randint(3, 30) if rng.random() < 0.4 else rng.randint(150, 350)
+        chunks.append(" ".join(rng.choice(_WORDS) for _ in range(words)))
+    return chunks
+
+
+def before(model, client, name, texts):
+    from qdrant_client.http.models import PointStruct
+    vectors = np.asarray(
+        model.encode(texts, normalize_embeddings=True, show_progress_bar=False), dtype=np.float32
+    ).tolist()
+    points = [PointStruct(id=i, vector=v, payload={"source": "bench"}) for i, v in enumerate(vectors)]
+    client.upsert(name, points)
+
+
+def after(model, client, name, texts):
+    from src.retrieval.embedding_cache import encode_bucketed
+    from src.retrieval.vector_store import QDRANT_UPLOAD_BATCH
+    vectors = encode_bucketed(model, texts)
+    client.upload_collection(
+        name, vectors=vectors, payload=[{"source": "bench"}] * len(texts),
+        ids=list(range(len(texts))), batch_size=QDRANT_UPLOAD_BATCH, wait=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embedding-model", default=os.getenv("EMBEDDING_MODEL", "BAAI/bge-large-en-v1.5"))
+    parser.add_argument("--chunks", type=int, default=1000)
+    args = parser.parse_args()
+
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import Distance, VectorParams
+    from sentence_transformers import SentenceTransformer
+    from src.retrieval.embedding_cache import EMBED_ENCODE_BATCH, EMBED_TOKEN_BUDGET
+
+    model = SentenceTransformer(args.embedding_model, device="cpu")
+    texts = make_chunks(args.chunks)
+    model.encode(texts[:8], normalize_embeddings=True)  # warm-up
+    lengths = [len(ids) for ids in model.tokenizer(texts, truncation=True, max_length=model.max_seq_length)["input_ids"]]
+    print(f"{args.embedding_model}: {len(texts)} chunks, tokens min {min(lengths)} / "
+          f"median {int(np.median(lengths))} / max {max(lengths)}")
+    print(f"after: EMBED_ENCODE_BATCH={EMBED_ENCODE_BATCH}, EMBED_TOKEN_BUDGET={EMBED_TOKEN_BUDGET}")
+
+    client = QdrantClient(":memory:")
+    rates = {}
+    for label, fn in (("before", before), ("after", after)):
+        client.create_collection(label, vectors_config=VectorParams(
+            size=model.get_sentence_embedding_dimension(), distance=Distance.COSINE))
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        fn(model, client, label, texts)
+        elapsed = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rates[label] = len(texts) / elapsed
+        print(f"  {label:>6}: {rates[label]:7.1f} chunks/s ({elapsed:.1f}s) | "
+              f"peak Python allocations {peak / 1e6:6.1f} MB")
+    print(f"  speedup: x{rates['after'] / rates['before']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
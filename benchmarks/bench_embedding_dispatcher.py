@@ -0,0 +1,92 @@
+"""
+benchmarks/bench_embedding_dispatcher.py
+Query-encoding throughput and latency under concurrent load: every client
+encodes its own 3 expanded queries directly on the shared model (today's
+behaviour without the dispatcher) vs through the EmbeddingDispatcher.
+
+    python benchmarks/bench_embedding_dispatcher.py --clients 16 --questions 40
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from src.retrieval.embedding_dispatcher import EmbeddingDispatcher
+
+_WORDS = (
+    "how many days of annual leave do employees get what is the notice period "
+    "for contractors who approves travel expenses when is payroll processed"
+).split()
+
+
+def make_questions(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(6, 14))) for _ in range(3)]
+        for _ in range(n)
+    ]
+
+
+def run(encoder, clients: int, questions_per_client: int):
+    latencies = []
+    lock = threading.Lock()
+    workload = [make_questions(questions_per_client, seed=c) for c in range(clients)]
+    barrier = threading.Barrier(clients + 1)
+
+    def _client(questions):
+        barrier.wait()
+        for variants in questions:
+            t0 = time.perf_counter()
+            encoder.encode(variants, normalize_embeddings=True, show_progress_bar=False)
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=_client, args=(w,)) for w in workload]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "qps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", "BAAI/bge-large-en-v1.5"))
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--questions", type=int, default=40, help="per client")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(args.model)
+    model.encode(["warm up"] * 4)
+
+    print(f"model={args.model} clients={args.clients} questions/client={args.questions} "
+          f"(3 queries each), max_batch={args.max_batch} wait={args.wait_ms}ms")
+    direct = run(model, args.clients, args.questions)
+    dispatcher = EmbeddingDispatcher(model, max_batch=args.max_batch, max_wait_ms=args.wait_ms)
+    batched = run(dispatcher, args.clients, args.questions)
+    dispatcher.close()
+    for name, r in (("direct", direct), ("dispatcher", batched)):
+        print(f"{name:>10}: {r['qps']:7.1f} questions/s | p50 {r['p50_ms']:7.1f} ms | p99 {r['p99_ms']:7.1f} ms")
+    print(f"dispatcher batches: {dispatcher.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+benchmarks/bench_fallback_index.py
+Durable fallback index (FALLBACK_INDEX=1): write, reopen and search cost of
+DurableVectorIndex against the in-memory MemoryVectorIndex it replaces.
+
+Reopening is what a restart pays; the in-memory index has nothing to reopen
+and would have to re-embed every chunk instead. Uses random vectors, so no
+embedding model is needed.
+
+    python benchmarks/bench_fallback_index.py
+    python benchmarks/bench_fallback_index.py --sizes 1000 10000 50000 --dim 1024
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from src.retrieval.fallback_index import DurableVectorIndex
+from src.retrieval.memory_index import MemoryVectorIndex
+
+
+def search_ms(index, queries, k):
+    t0 = time.perf_counter()
+    for q in queries:
+        index.search(q, k)
+    return (time.perf_counter() - t0) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=256, help="Points per add() call (one failed upsert)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    text = "employees are entitled to annual leave of twenty five days per year " * 8
+    print(f"dim={args.dim}, k={args.k}, {len(text)}-char chunks")
+    for n in args.sizes:
+        vecs = rng.normal(size=(n, args.dim)).astype(np.float32)
+        queries = rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+        ids = [f"p{i}" for i in range(n)]
+        metas = [{"source": "bench.pdf", "page": i} for i in range(n)]
+
+        memory = MemoryVectorIndex()
+        memory.add(ids, [text] * n, metas, vecs)
+        memory_ms = search_ms(memory, queries, args.k)
+        del memory
+
+        with tempfile.TemporaryDirectory() as path:
+            durable = DurableVectorIndex(path)
+            t0 = time.perf_counter()
+            for start in range(0, n, args.batch):
+                end = start + args.batch
+                durable.add(ids[start:end], [text] * len(ids[start:end]), metas[start:end], vecs[start:end])
+            write_s = time.perf_counter() - t0
+            del durable
+
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            durable = DurableVectorIndex(path)
+            reopen_ms = (time.perf_counter() - t0) * 1000
+            reopen_bytes, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            durable_ms = search_ms(durable, queries, args.k)
+            disk_mb = sum(f.stat().st_size for f in Path(path).iterdir()) / 1e6
+            del durable
+
+        print(f"  n={n:>6}: write {n / write_s:8,.0f} points/s | reopen {reopen_ms:7.1f} ms, "
+              f"{reopen_bytes / 1e6:5.1f} MB heap | search {durable_ms:6.2f} ms/query "
+              f"(in-memory {memory_ms:6.2f}) | {disk_mb:6.1f} MB on disk")
+
+
+if __name__ == "__main__":
+    main()
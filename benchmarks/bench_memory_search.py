@@ -0,0 +1,100 @@
+"""
+benchmarks/bench_memory_search.py
+In-memory fallback search (used while Qdrant is unavailable): the previous
+pure-Python cosine loop over lists of floats vs MemoryVectorIndex (float32
+matrix, one matrix product, argpartition top-k).
+
+Uses random vectors, so no embedding model is needed.
+
+    python benchmarks/bench_memory_search.py
+    python benchmarks/bench_memory_search.py --sizes 1000 5000 20000 --dim 1024
+"""
+import argparse
+import math
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from src.retrieval.memory_index import MemoryVectorIndex
+
+
+def legacy_search(memory, query_vec, k, score_threshold=0.0):
+    """The loop QdrantVectorStore._memory_search used to run."""
+    def _cos(a, b):
+        dot = sum(x * y for x, y in zip(a, b))
+        na = math.sqrt(sum(x * x for x in a))
+        nb = math.sqrt(sum(y * y for y in b))
+        return dot / (na * nb + 1e-8)
+
+    scored = [(_cos(query_vec, vec), pid, meta) for pid, _text, meta, vec in memory]
+    scored.sort(key=lambda t: t[0], reverse=True)
+    top = scored[:k]
+    if score_threshold > 0.0:
+        top = [item for item in top if item[0] >= score_threshold]
+    return [(pid, meta, score) for score, pid, meta in top]
+
+
+def measure(build):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    store = build()
+    elapsed = time.perf_counter() - t0
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return store, elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--legacy-queries", type=int, default=3, help="The old loop is slow; fewer queries")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"dim={args.dim}, k={args.k}")
+    for n in args.sizes:
+        vecs = rng.normal(size=(n, args.dim)).astype(np.float32)
+        queries = rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+        ids = [f"p{i}" for i in range(n)]
+        metas = [{"source": "bench.pdf", "page": i} for i in range(n)]
+
+        memory, _, legacy_bytes = measure(
+            lambda: [(pid, "", meta, vec.tolist()) for pid, meta, vec in zip(ids, metas, vecs)])
+        t0 = time.perf_counter()
+        for q in queries[:args.legacy_queries]:
+            legacy = legacy_search(memory, q.tolist(), args.k)
+        legacy_ms = (time.perf_counter() - t0) / args.legacy_queries * 1000
+        del memory
+
+        def build():
+            index = MemoryVectorIndex()
+            index.add(ids, [""] * n, metas, vecs)
+            return index
+        index, _, index_bytes = measure(build)
+        t0 = time.perf_counter()
+        for q in queries:
+            [hits] = index.search(q, args.k)
+        index_ms = (time.perf_counter() - t0) / args.queries * 1000
+        t0 = time.perf_counter()
+        for start in range(0, args.queries - 2, 3):  # one user question = 3 expanded queries
+            index.search(queries[start:start + 3], args.k)
+        batch_ms = (time.perf_counter() - t0) / (args.queries // 3) * 1000
+
+        [check] = index.search(queries[args.legacy_queries - 1], args.k)
+        same = [p for p, _, _ in check] == [p for p, _, _ in legacy]
+        print(f"  n={n:>6}: loop {legacy_ms:9.1f} ms/query, {legacy_bytes / 1e6:7.1f} MB | "
+              f"index {index_ms:6.2f} ms/query ({batch_ms:5.2f} ms per 3-query batch), "
+              f"{index_bytes / 1e6:6.1f} MB | x{legacy_ms / index_ms:,.0f} faster, same top-k: {same}")
+
+
+if __name__ == "__main__":
+    main()
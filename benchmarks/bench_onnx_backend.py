@@ -0,0 +1,126 @@
+"""
+benchmarks/bench_onnx_backend.py
+PyTorch fp32 vs int8 ONNX Runtime (EMBEDDING_BACKEND=onnx-int8) for the
+embedding model and the cross-encoder: latency, speedup, and how closely the
+int8 outputs agree with PyTorch on a sample corpus.
+
+    python benchmarks/bench_onnx_backend.py
+    python benchmarks/bench_onnx_backend.py --embedding-model all-MiniLM-L6-v2 --docs 500
+
+Agreement metrics:
+  cosine(torch, onnx) per document embedding (mean / min)
+  retrieval top-k overlap: |top-k(torch) ∩ top-k(onnx)| / k per query
+  reranker Spearman rank correlation and top-5 overlap per query
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+_WORDS = (
+    "employees are entitled to annual leave of twenty five days per year the notice period "
+    "for contractors is thirty days travel expenses must be approved by a line manager payroll "
+    "is processed on the last working day of each month confidential information must not be "
+    "disclosed to third parties without written consent of the company data protection officer"
+).split()
+
+
+def make_corpus(n_docs: int, n_queries: int, seed: int = 0):
+    rng = random.Random(seed)
+    docs = [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(40, 200))) for _ in range(n_docs)]
+    queries = [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(5, 12))) for _ in range(n_queries)]
+    return docs, queries
+
+
+def timed(fn, *args, repeat: int = 1, **kwargs):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+    return out, best
+
+
+def spearman(a: np.ndarray, b: np.ndarray) -> float:
+    ra, rb = np.argsort(np.argsort(a)), np.argsort(np.argsort(b))
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embedding-model", default=os.getenv("EMBEDDING_MODEL", "BAAI/bge-large-en-v1.5"))
+    parser.add_argument("--reranker-model", default=os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-12-v2"))
+    parser.add_argument("--docs", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--cache-dir", default=None, help="ONNX export cache (default: temp dir)")
+    args = parser.parse_args()
+
+    os.environ["ONNX_CACHE_DIR"] = args.cache_dir or tempfile.mkdtemp(prefix="onnx-bench-")
+    from sentence_transformers import CrossEncoder, SentenceTransformer
+    from src.retrieval.onnx_backend import load_onnx_model
+
+    docs, queries = make_corpus(args.docs, args.queries)
+    print(f"corpus: {len(docs)} docs, {len(queries)} queries")
+
+    # ── Embedding model ───────────────────────────────────────────────────────
+    torch_emb = SentenceTransformer(args.embedding_model, device="cpu")
+    (onnx_emb, export_s) = timed(load_onnx_model, "embedding", args.embedding_model)
+    print(f"\n[embedding] {args.embedding_model} (export + quantize {export_s:.1f}s)")
+    results = {}
+    for name, model in (("torch", torch_emb), ("onnx-int8", onnx_emb)):
+        model.encode(queries[:4], normalize_embeddings=True)
+        d_vecs, d_s = timed(model.encode, docs, batch_size=32, normalize_embeddings=True)
+        q_s = 0.0
+        q_vecs = []
+        for q in queries:  # single-query latency, as at /api/ask
+            v, s = timed(model.encode, [q], normalize_embeddings=True, repeat=3)
+            q_vecs.append(v[0])
+            q_s += s
+        results[name] = (np.asarray(d_vecs, dtype=np.float32), np.asarray(q_vecs, dtype=np.float32))
+        print(f"  {name:>9}: corpus {len(docs) / d_s:7.1f} docs/s | query p50-ish {q_s / len(queries) * 1000:6.1f} ms")
+        results[name + "_t"] = (d_s, q_s)
+    cos = np.sum(results["torch"][0] * results["onnx-int8"][0], axis=1)
+    top = lambda d, q: np.argsort(-(q @ d.T), axis=1)[:, :args.k]
+    t_top, o_top = top(*results["torch"]), top(*results["onnx-int8"])
+    overlap = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(t_top, o_top)])
+    (td, tq), (od, oq) = results["torch_t"], results["onnx-int8_t"]
+    print(f"  speedup: corpus x{td / od:.2f}, query x{tq / oq:.2f}")
+    print(f"  cosine(torch, onnx): mean {cos.mean():.4f}, min {cos.min():.4f}")
+    print(f"  retrieval top-{args.k} overlap: {overlap:.3f}")
+
+    # ── Cross-encoder ─────────────────────────────────────────────────────────
+    torch_ce = CrossEncoder(args.reranker_model, device="cpu")
+    (onnx_ce, export_s) = timed(load_onnx_model, "reranker", args.reranker_model)
+    print(f"\n[reranker] {args.reranker_model} (export + quantize {export_s:.1f}s)")
+    rng = random.Random(1)
+    groups = [[(q, d) for d in rng.sample(docs, 20)] for q in queries]  # 20 candidates per question
+    scores, times = {}, {}
+    for name, model in (("torch", torch_ce), ("onnx-int8", onnx_ce)):
+        model.predict(groups[0][:2])
+        out, total = [], 0.0
+        for pairs in groups:
+            s, t = timed(model.predict, pairs, repeat=2)
+            out.append(np.asarray(s, dtype=np.float32))
+            total += t
+        scores[name], times[name] = out, total
+        print(f"  {name:>9}: {total / len(groups) * 1000:6.1f} ms per question (20 pairs)")
+    rho = np.mean([spearman(a, b) for a, b in zip(scores["torch"], scores["onnx-int8"])])
+    top5 = np.mean([
+        len(set(np.argsort(-a)[:5]) & set(np.argsort(-b)[:5])) / 5
+        for a, b in zip(scores["torch"], scores["onnx-int8"])
+    ])
+    print(f"  speedup: x{times['torch'] / times['onnx-int8']:.2f}")
+    print(f"  Spearman rho: {rho:.4f} | top-5 overlap: {top5:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+benchmarks/bench_payload_size.py
+Search response size and resident payload with chunk text in the Qdrant
+payload vs in the chunk text store (QDRANT_PAYLOAD_FIELDS only in Qdrant).
+
+Uses random vectors and an in-memory Qdrant, so no embedding model is needed.
+
+    python benchmarks/bench_payload_size.py --chunks 20000
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+from src.retrieval.chunk_store import ChunkTextStore
+from src.retrieval.vector_store import QDRANT_PAYLOAD_FIELDS
+
+_WORDS = "policy employee leave payment contract notice term party shall data".split()
+DIM = 384
+
+
+def make_chunks(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    for i in range(n):
+        text = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(200, 300)))
+        meta = {
+            "source": f"docs/file{i // 40}.pdf", "page": i % 40 + 1,
+            "chunk_id": f"docs/file{i // 40}.pdf_p{i % 40 + 1}_c0", "chunk_index": 0,
+            "content_hash": f"{rng.getrandbits(256):064x}", "file_hash": f"{rng.getrandbits(256):064x}",
+            "token_count": 380,
+        }
+        yield str(i), text, meta
+
+
+def build(client, name, chunks, vectors, chunk_store=None):
+    client.create_collection(name, vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    points, stored = [], []
+    for (pid, text, meta), vec in zip(chunks, vectors):
+        if chunk_store is None:
+            payload = {"text": text, **meta}
+        else:
+            payload = {k: v for k, v in meta.items() if k in QDRANT_PAYLOAD_FIELDS}
+            stored.append((pid, text, {k: v for k, v in meta.items() if k not in QDRANT_PAYLOAD_FIELDS}))
+        points.append(PointStruct(id=int(pid), vector=vec.tolist(), payload=payload))
+    for i in range(0, len(points), 1000):
+        client.upsert(name, points[i:i + 1000])
+    if chunk_store is not None:
+        chunk_store.put(stored)
+
+
+def resident_bytes(client, name):
+    total, offset = 0, None
+    while True:
+        pts, offset = client.scroll(name, limit=2048, offset=offset, with_vectors=False)
+        total += sum(len(json.dumps(p.payload)) for p in pts)
+        if offset is None:
+            return total
+
+
+def run_queries(client, name, queries, k, chunk_store=None):
+    t0 = time.perf_counter()
+    response_bytes = 0
+    for group in queries:  # one user question = 3 expanded queries
+        hits = {}
+        for q in group:
+            for r in client.query_points(name, query=q.tolist(), limit=k).points:
+                response_bytes += len(json.dumps(r.payload))
+                hits.setdefault(str(r.id), r)
+        if chunk_store is not None:
+            chunk_store.get_many(list(hits))
+    return (time.perf_counter() - t0) / len(queries) * 1000, response_bytes / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--k", type=int, default=15)
+    args = parser.parse_args()
+
+    chunks = list(make_chunks(args.chunks))
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(len(chunks), DIM)).astype(np.float32)
+    queries = rng.normal(size=(args.questions, 3, DIM)).astype(np.float32)
+
+    client = QdrantClient(":memory:")
+    store = ChunkTextStore(str(Path(tempfile.mkdtemp()) / "chunks.sqlite3"))
+    build(client, "inline", chunks, vectors)
+    build(client, "slim", chunks, vectors, chunk_store=store)
+
+    print(f"{args.chunks} chunks, {args.questions} questions x 3 queries, k={args.k}")
+    for name, cs in (("inline", None), ("slim", store)):
+        ms, resp = run_queries(client, name, queries, args.k, cs)
+        print(f"{name:>6}: resident payload {resident_bytes(client, name) / 1e6:7.1f} MB | "
+              f"response payload {resp / 1e3:6.1f} KB/question | {ms:6.1f} ms/question"
+              + (" (incl. text fetch)" if cs else ""))
+    print(f"chunk text store on disk: {store.stats()['compressed_bytes'] / 1e6:.1f} MB compressed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+benchmarks/bench_projection.py
+Recall@k and vector memory of reduced-dimension search (VECTOR_PROJECTION)
+against full-dimension search.
+
+For each target dimension, truncation and PCA (fitted on a sample of the
+corpus, as pipelines/fit_projection.py does) are compared with exact
+full-dimension cosine search: recall@k = |top-k(projected) ∩ top-k(full)| / k,
+averaged over the queries. Memory is the float32 vector storage per
+collection; Qdrant's index memory scales with it.
+
+    python benchmarks/bench_projection.py
+    python benchmarks/bench_projection.py --texts chunks.txt --dims 128 256 512   # one chunk per line
+    python benchmarks/bench_projection.py --synthetic      # no model: 1024-d vectors, decaying spectrum
+
+Random-word corpora give unrepresentative embeddings; use --texts with real
+chunks for numbers that carry over to production.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+_WORDS = (
+    "employees are entitled to annual leave of twenty five days per year the notice period "
+    "for contractors is thirty days travel expenses must be approved by a line manager payroll "
+    "is processed on the last working day of each month confidential information must not be "
+    "disclosed to third parties without written consent of the company data protection officer"
+).split()
+
+
+def make_corpus(n_docs: int, n_queries: int, seed: int = 0):
+    rng = random.Random(seed)
+    docs = [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(20, 150))) for _ in range(n_docs)]
+    queries = [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(5, 12))) for _ in range(n_queries)]
+    return docs, queries
+
+
+def synthetic_vectors(n_docs: int, n_queries: int, dim: int = 1024, seed: int = 0):
+    """Unit vectors whose variance decays over a random basis (like real embeddings, not axis-aligned)."""
+    rng = np.random.default_rng(seed)
+    basis = np.linalg.qr(rng.normal(size=(dim, dim)))[0]
+    scales = 1 / np.arange(1, dim + 1) ** 0.7
+
+    def gen(n):
+        x = (rng.normal(size=(n, dim)) * scales) @ basis.T
+        return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+    return gen(n_docs), gen(n_queries)
+
+
+def top_k(docs: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    return np.argpartition(-(queries @ docs.T), k, axis=1)[:, :k]
+
+
+def recall(full: np.ndarray, approx: np.ndarray) -> float:
+    k = full.shape[1]
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(full, approx)]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embedding-model", default=os.getenv("EMBEDDING_MODEL", "BAAI/bge-large-en-v1.5"))
+    parser.add_argument("--texts", default=None, help="Corpus file, one chunk per line (default: random words)")
+    parser.add_argument("--synthetic", action="store_true", help="Synthetic vectors instead of a model")
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--fit-sample", type=int, default=2000, help="Chunks used to fit PCA")
+    parser.add_argument("--dims", type=int, nargs="+", default=[64, 128, 256, 512])
+    args = parser.parse_args()
+
+    from src.retrieval.projection import VectorProjection
+
+    if args.synthetic:
+        d_vecs, q_vecs = synthetic_vectors(args.docs, args.queries)
+        source = "synthetic"
+    elif args.texts:
+        lines = [l.strip() for l in Path(args.texts).read_text(encoding="utf-8").splitlines() if l.strip()]
+        random.Random(0).shuffle(lines)
+        queries = [" ".join(l.split()[:12]) for l in lines[:args.queries]]
+        docs = lines[args.queries:args.queries + args.docs]
+    else:
+        docs, queries = make_corpus(args.docs, args.queries)
+
+    if not args.synthetic:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(args.embedding_model, device="cpu")
+        t0 = time.perf_counter()
+        d_vecs = np.asarray(model.encode(docs, batch_size=64, normalize_embeddings=True), dtype=np.float32)
+        q_vecs = np.asarray(model.encode(queries, normalize_embeddings=True), dtype=np.float32)
+        source = f"{args.embedding_model} (encoded in {time.perf_counter() - t0:.0f}s)"
+    full_dim = d_vecs.shape[1]
+    print(f"{source}: {len(d_vecs)} docs, {len(q_vecs)} queries, {full_dim}-d, "
+          f"recall@{args.k} vs full-dimension exact search")
+
+    truth = top_k(d_vecs, q_vecs, args.k)
+    sample = d_vecs[np.random.default_rng(0).choice(len(d_vecs), min(args.fit_sample, len(d_vecs)), replace=False)]
+    full_mb = d_vecs.nbytes / 1e6
+    print(f"  {'full':>8} {full_dim:>5}-d: recall 1.000 | vectors {full_mb:7.1f} MB")
+    for dim in sorted(d for d in args.dims if d < full_dim):
+        projections = {
+            "truncate": VectorProjection("truncate", full_dim, dim),
+            "pca": VectorProjection.fit_pca(sample, dim),
+        }
+        for kind, projection in projections.items():
+            got = top_k(projection.apply(d_vecs), projection.apply(q_vecs), args.k)
+            mb = len(d_vecs) * dim * 4 / 1e6
+            print(f"  {kind:>8} {dim:>5}-d: recall {recall(truth, got):.3f} | vectors {mb:7.1f} MB "
+                  f"(-{1 - mb / full_mb:.0%})")
+
+
+if __name__ == "__main__":
+    main()
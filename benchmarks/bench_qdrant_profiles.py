@@ -0,0 +1,162 @@
+"""
+benchmarks/bench_qdrant_profiles.py
+RAM, search latency (p50/p95) and recall@k of each Qdrant storage profile
+(QDRANT_PROFILE, see src/retrieval/collection_profile.py) on a synthetic
+corpus, by default one million 1024-d vectors.
+
+Each profile gets its own collection, built with the profile's vector,
+quantization and payload settings and searched with its rescoring /
+oversampling parameters. Recall is measured against exact top-k computed
+with NumPy. RAM is the change in the server's resident memory
+(/metrics memory_resident_bytes) after indexing and a warm-up, next to the
+profile's own estimate.
+
+Needs a Qdrant server; the embedded client ignores quantization:
+
+    docker run -p 6333:6333 qdrant/qdrant
+    python benchmarks/bench_qdrant_profiles.py --url http://localhost:6333
+    python benchmarks/bench_qdrant_profiles.py --url http://localhost:6333 --n 200000 --profiles memory scalar
+
+Without --url it runs against an in-process client (a smoke test only: every
+profile then searches exactly and no RAM is measured).
+"""
+import argparse
+import os
+import re
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from src.retrieval.collection_profile import PRESETS, CollectionProfile
+
+
+def synthetic_chunks(n: int, dim: int, chunk: int, seed: int = 0):
+    """Unit vectors with a decaying spectrum over a random basis, yielded in chunks (same data every call)."""
+    rng = np.random.default_rng(seed)
+    basis = np.linalg.qr(rng.normal(size=(dim, dim)))[0].astype(np.float32)
+    scales = (1 / np.arange(1, dim + 1) ** 0.7).astype(np.float32)
+    for start in range(0, n, chunk):
+        x = (np.random.default_rng(seed + 1 + start).normal(size=(min(chunk, n - start), dim))
+             .astype(np.float32) * scales) @ basis.T
+        yield start, x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def queries(n: int, dim: int) -> np.ndarray:
+    # Perturbed corpus vectors, so every query has genuinely close neighbours
+    _, base = next(synthetic_chunks(n, dim, n, seed=0))
+    noise = np.random.default_rng(99).normal(size=base.shape).astype(np.float32) * 0.02
+    x = base + noise
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def exact_top_k(q: np.ndarray, n: int, dim: int, k: int, chunk: int) -> np.ndarray:
+    best_ids = np.zeros((len(q), 0), dtype=np.int64)
+    best_scores = np.zeros((len(q), 0), dtype=np.float32)
+    for start, x in synthetic_chunks(n, dim, chunk):
+        ids = np.concatenate([best_ids, np.broadcast_to(np.arange(start, start + len(x)), (len(q), len(x)))], axis=1)
+        scores = np.concatenate([best_scores, q @ x.T], axis=1)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_ids = np.take_along_axis(ids, top, axis=1)
+        best_scores = np.take_along_axis(scores, top, axis=1)
+    return best_ids
+
+
+def resident_bytes(url):
+    """Server RSS from the Prometheus endpoint, or None."""
+    if not url:
+        return None
+    try:
+        with urllib.request.urlopen(f"{url.rstrip('/')}/metrics", timeout=10) as r:
+            text = r.read().decode("utf-8")
+        match = re.search(r"^memory_resident_bytes\s+(\S+)", text, re.MULTILINE)
+        return float(match.group(1)) if match else None
+    except Exception:
+        return None
+
+
+def search(client, collection, vec, k, params):
+    if hasattr(client, "query_points"):
+        return [p.id for p in client.query_points(collection, query=vec, limit=k, search_params=params).points]
+    return [p.id for p in client.search(collection, query_vector=vec, limit=k, search_params=params)]
+
+
+def wait_indexed(client, collection, timeout=3600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if str(getattr(client.get_collection(collection).status, "value", "green")) == "green":
+            return
+        time.sleep(2)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="Qdrant server URL (default: in-process smoke test)")
+    parser.add_argument("--n", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--profiles", nargs="+", default=list(PRESETS), choices=list(PRESETS))
+    parser.add_argument("--batch", type=int, default=2048, help="Vectors generated / uploaded per batch")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark collections")
+    args = parser.parse_args()
+
+    from qdrant_client import QdrantClient
+
+    client = QdrantClient(url=args.url, api_key=os.getenv("QDRANT_API_KEY") or None) if args.url else QdrantClient(":memory:")
+    if not args.url:
+        print("No --url: in-process Qdrant searches exactly for every profile (smoke test only).")
+
+    q = queries(args.queries, args.dim)
+    t0 = time.perf_counter()
+    truth = exact_top_k(q, args.n, args.dim, args.k, args.batch)
+    print(f"{args.n:,} x {args.dim}-d vectors, {args.queries} queries, recall@{args.k} "
+          f"(exact top-k in {time.perf_counter() - t0:.0f}s)")
+
+    for name in args.profiles:
+        profile = CollectionProfile.preset(name)
+        collection = f"bench_profile_{name}"
+        if client.collection_exists(collection):
+            client.delete_collection(collection)
+        rss_before = resident_bytes(args.url)
+        client.create_collection(
+            collection_name=collection,
+            vectors_config=profile.vectors_config(args.dim),
+            quantization_config=profile.quantization_config(),
+            on_disk_payload=profile.on_disk_payload,
+        )
+        t0 = time.perf_counter()
+        for start, x in synthetic_chunks(args.n, args.dim, args.batch):
+            client.upload_collection(
+                collection_name=collection, vectors=x, ids=list(range(start, start + len(x))),
+                payload=[{"source": f"doc{i // 50}.pdf", "page": i % 50} for i in range(start, start + len(x))],
+                batch_size=args.batch, wait=True,
+            )
+        wait_indexed(client, collection)
+        build_s = time.perf_counter() - t0
+
+        params = profile.search_params()
+        for vec in q[:20]:  # warm-up: page in what the profile keeps hot
+            search(client, collection, vec.tolist(), args.k, params)
+        latencies, hits = [], []
+        for vec in q:
+            t0 = time.perf_counter()
+            hits.append(search(client, collection, vec.tolist(), args.k, params))
+            latencies.append((time.perf_counter() - t0) * 1000)
+        recall = np.mean([len(set(h) & set(t.tolist())) / args.k for h, t in zip(hits, truth)])
+        rss_after = resident_bytes(args.url)
+        measured = f"{(rss_after - rss_before) / 1e6:8,.0f} MB" if rss_before and rss_after else "     n/a"
+        print(f"  {profile.as_dict()['quantization']:>12}: RAM {measured} (est. {profile.ram_bytes(args.n, args.dim) / 1e6:7,.0f} MB) "
+              f"| p50 {np.percentile(latencies, 50):6.1f} ms, p95 {np.percentile(latencies, 95):6.1f} ms "
+              f"| recall@{args.k} {recall:.3f} | build {build_s:5.0f}s")
+        if not args.keep:
+            client.delete_collection(collection)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+benchmarks/bench_text_cleaner.py
+Throughput of clean_text (fast path) vs clean_text_reference on a synthetic
+corpus of PDF-like pages.
+
+    python benchmarks/bench_text_cleaner.py --mb 50
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from src.ingestion.text_cleaner import clean_text, clean_text_reference
+
+_WORDS = (
+    "agreement party shall obligations term termination notice confidential "
+    "information liability indemnify warranty payment invoice schedule services "
+    "inter-\noperability “Licensor” ‘Licensee’ – — data processing"
+).split(" ")
+
+
+def make_page(rng: random.Random, page_no: int, pages: int) -> str:
+    lines = [f"ACME Corp – Master Services Agreement", ""]
+    for _ in range(rng.randint(30, 45)):
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(6, 14))]
+        sep = "    " if rng.random() < 0.2 else " "
+        lines.append(sep.join(words) + ("  " if rng.random() < 0.3 else ""))
+        if rng.random() < 0.1:
+            lines.extend(["", "", ""])
+    lines.extend(["", "-" * 20, f"Page {page_no} of {pages}", f"  {page_no}  ", ""])
+    return "\n".join(lines)
+
+
+def make_corpus(target_mb: float, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    pages, size = [], 0
+    target = int(target_mb * 1024 * 1024)
+    while size < target:
+        page = make_page(rng, len(pages) + 1, 800)
+        pages.append(page)
+        size += len(page.encode("utf-8"))
+    return pages
+
+
+def bench(fn, pages: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            fn(page)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=20.0, help="corpus size in MB")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = make_corpus(args.mb)
+    mb = sum(len(p.encode("utf-8")) for p in pages) / (1024 * 1024)
+    mismatches = sum(1 for p in pages if clean_text(p) != clean_text_reference(p))
+    print(f"Corpus: {len(pages)} pages, {mb:.1f} MB — output mismatches: {mismatches}")
+
+    ref = bench(clean_text_reference, pages, args.repeat)
+    fast = bench(clean_text, pages, args.repeat)
+    print(f"clean_text_reference: {mb / ref:8.1f} MB/s  ({ref:.2f}s)")
+    print(f"clean_text (fast)   : {mb / fast:8.1f} MB/s  ({fast:.2f}s)")
+    print(f"speedup             : {ref / fast:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,17 @@
+import sys
+from pathlib import Path
+
 import streamlit as st
 from qdrant_client import QdrantClient
 from sentence_transformers import SentenceTransformer, CrossEncoder
 import yaml
 
+_root = Path(__file__).resolve().parent.parent
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from src.retrieval.chunk_store import ChunkTextStore
+
 st.title("Enterprise RAG Evaluation Dashboard")
 
 with open("../config/config.yaml") as f:
@@ -11,6 +20,7 @@ with open("../config/config.yaml") as f:
 client = QdrantClient(path="../data/qdrant_db")
 model = SentenceTransformer(config["embedding_model"])
 reranker = CrossEncoder(config["reranker_model"])
+chunks = ChunkTextStore(f"../data/chunk_text/{config['collection_name']}.sqlite3")
 
 query = st.text_input("Test Query")
 if st.button("Evaluate"):
@@ -19,7 +29,9 @@ if st.button("Evaluate"):
         query_vector=model.encode(query).tolist(),
         limit=10
     )
+    texts = chunks.get_many([str(hit.id) for hit in hits])
     for i, hit in enumerate(hits):
         st.write(f"**Rank {i+1}** | Score: {hit.score:.4f}")
-        st.write(hit.payload["text"][:500] + "...")
+        text = texts.get(str(hit.id), (hit.payload.get("text", ""), {}))[0]
+        st.write(text[:500] + "...")
         st.divider()
\ No newline at end of file
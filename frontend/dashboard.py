@@ -1,6 +1,9 @@
+import hashlib
 import os
+import shutil
 import sys
 import tempfile
+import time
 from pathlib import Path
 from typing import List, Dict
 
@@ -82,6 +85,8 @@ if "chat_history" not in st.session_state:
     st.session_state.chat_history: List[Dict[str, str]] = []
 if "documents_indexed" not in st.session_state:
     st.session_state.documents_indexed: List[str] = []
+if "indexed_hashes" not in st.session_state:
+    st.session_state.indexed_hashes: set = set()
 
 
 # ── Cached resources ────────────────────────────────────────────────────────
@@ -114,29 +119,37 @@ with col_upload:
     )
 
     if uploaded:
-        if uploaded.name not in st.session_state.documents_indexed:
+        # Dedup on content, not filename: a changed file with the same name is re-indexed
+        upload_hash = hashlib.sha256(uploaded.getvalue()).hexdigest()
+        if upload_hash not in st.session_state.indexed_hashes:
             with st.spinner(f"Indexing **{uploaded.name}**..."):
                 if DIRECT_MODE:
                     from pipelines.ingestion_pipeline import run_ingestion
 
-                    tmp_file = tempfile.NamedTemporaryFile(
-                        delete=False, suffix=os.path.splitext(uploaded.name)[-1]
-                    )
-                    tmp_file.write(uploaded.getvalue())
-                    tmp_file.flush()
-                    tmp = tmp_file.name
-                    tmp_file.close()
-
-                    result = run_ingestion(tmp, store=_cached_store())
-                    try:
-                        os.remove(tmp)
-                    except Exception:
-                        pass
-
-                    if result["status"] == "success" and result["chunks_indexed"] > 0:
-                        st.session_state.documents_indexed.append(uploaded.name)
+                    # Keep the original filename: it is the `source` that incremental
+                    # re-ingestion matches against
+                    tmp_dir = tempfile.mkdtemp()
+                    tmp = os.path.join(tmp_dir, os.path.basename(uploaded.name))
+                    with open(tmp, "wb") as tmp_file:
+                        tmp_file.write(uploaded.getvalue())
+
+                    result = run_ingestion(tmp, store=_cached_store(), file_hash=upload_hash)
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+                    if result["status"] == "success" and result.get("skipped"):
+                        st.session_state.indexed_hashes.add(upload_hash)
+                        if uploaded.name not in st.session_state.documents_indexed:
+                            st.session_state.documents_indexed.append(uploaded.name)
+                        st.info(f"`{uploaded.name}` is unchanged — already indexed.")
+                    elif result["status"] == "success":
+                        st.session_state.indexed_hashes.add(upload_hash)
+                        if uploaded.name not in st.session_state.documents_indexed:
+                            st.session_state.documents_indexed.append(uploaded.name)
                         st.success(
-                            f"✅ Indexed **{result['chunks_indexed']}** chunks from `{uploaded.name}`"
+                            f"✅ Indexed **{result['chunks_indexed']}** new chunks from `{uploaded.name}`"
+                            f" ({result.get('chunks_unchanged', 0)} unchanged,"
+                            f" {result.get('chunks_deleted', 0)} removed,"
+                            f" {result.get('tokens_saved', 0)} header/footer tokens dropped)"
                         )
                         st.balloons()
                     else:
@@ -144,14 +157,32 @@ with col_upload:
                 else:
                     files = {"file": (uploaded.name, uploaded.getvalue(), "application/octet-stream")}
                     r = requests.post(f"{API_URL}/upload", files=files)
-                    if r.status_code == 200:
-                        result = r.json()
-                        st.session_state.documents_indexed.append(uploaded.name)
-                        st.success(
-                            f"✅ Indexed **{result.get('chunks_indexed', '?')}** chunks "
-                            f"from `{uploaded.name}`"
-                        )
-                        st.balloons()
+                    if r.status_code == 202:
+                        # Ingestion runs as a background job — poll it until it finishes
+                        job_url = f"{API_URL}/jobs/{r.json()['job_id']}"
+                        progress = st.empty()
+                        job = r.json()
+                        while job.get("status") in ("queued", "running"):
+                            time.sleep(1)
+                            job = requests.get(job_url, timeout=10).json()
+                            p = job.get("progress", {})
+                            progress.caption(
+                                f"{job['status']}: {p.get('pages_extracted', 0)} pages extracted, "
+                                f"{p.get('chunks_upserted', 0)} chunks indexed"
+                            )
+                        progress.empty()
+                        result = job.get("result") or {}
+                        if job.get("status") == "success":
+                            st.session_state.indexed_hashes.add(upload_hash)
+                            if uploaded.name not in st.session_state.documents_indexed:
+                                st.session_state.documents_indexed.append(uploaded.name)
+                            st.success(
+                                f"✅ Indexed **{result.get('chunks_indexed', '?')}** chunks "
+                                f"from `{uploaded.name}`"
+                            )
+                            st.balloons()
+                        else:
+                            st.error(f"❌ {job.get('error') or 'Ingestion failed.'}")
                     else:
                         st.error(f"❌ Upload failed: {r.text}")
         else:
@@ -0,0 +1,341 @@
+"""
+pipelines/bulk_ingest.py
+Bulk ingestion of a directory tree of PDF/DOCX/TXT files.
+
+    python -m pipelines.bulk_ingest /mnt/knowledge-share --workers 8
+
+Extraction and chunking run in a process pool; the main process owns the
+embedding model and the vector store and embeds chunks from many files in
+large batches. Finished files are appended to a checkpoint, so re-running the
+same command after a crash skips everything already indexed.
+
+Chunks are stored under the file's path relative to the root directory
+(e.g. "hr/policies/leave.pdf"), so equal filenames in different folders do
+not overwrite each other.
+"""
+import argparse
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+BULK_WORKERS = int(os.getenv("BULK_INGEST_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+BULK_EMBED_BATCH = int(os.getenv("BULK_EMBED_BATCH", "256"))
+BULK_CHECKPOINT_DIR = os.getenv("BULK_CHECKPOINT_DIR", "./data/checkpoints")
+BULK_FILE_TIMEOUT = float(os.getenv("BULK_FILE_TIMEOUT", "1800"))
+
+# Worker side: queue on which each task reports (source, start time) to the driver
+_started = None
+
+
+# ── Worker side (module level so it can be pickled under spawn) ───────────────
+def _extract_and_chunk(full_path: str, source: str, file_hash: str) -> dict:
+    """Extract + chunk one file inside a pool worker; never raises."""
+    from pipelines.ingestion_pipeline import _iter_extracted
+    from src.ingestion.chunking import iter_chunk_documents
+    from src.ingestion.extract_text import TextExtractor
+    from src.ingestion.header_footer import strip_headers_footers
+
+    if _started is not None:
+        _started.put((source, time.time()))
+    out = {"path": source, "full_path": full_path, "chunks": [], "pages": 0,
+           "extract_s": 0.0, "chunk_s": 0.0, "saved": {}, "error": None, "file_hash": file_hash}
+    try:
+        # Pool workers are daemonic and cannot start their own page/OCR pools
+        extractor = TextExtractor(workers=1, ocr_workers=1)
+        t0 = time.perf_counter()
+        pages = []
+        extracted = _iter_extracted(full_path, extractor=extractor, file_hash=out["file_hash"])
+        for page in strip_headers_footers(extracted, out["saved"]):
+            page["metadata"]["source"] = source
+            pages.append(page)
+        t1 = time.perf_counter()
+        out["chunks"] = list(iter_chunk_documents(pages))
+        out["pages"] = len(pages)
+        out["extract_s"] = t1 - t0
+        out["chunk_s"] = time.perf_counter() - t1
+    except Exception as e:
+        out["error"] = f"{type(e).__name__}: {e}"
+    return out
+
+
+def _init_worker(started) -> None:
+    global _started
+    _started = started
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def _failed(rel: str, full: str, error: str) -> dict:
+    return {"path": rel, "full_path": full, "chunks": [], "pages": 0,
+            "extract_s": 0.0, "chunk_s": 0.0, "error": error}
+
+
+# ── Driver ────────────────────────────────────────────────────────────────────
+def iter_source_files(root: str) -> Iterator[Tuple[str, str]]:
+    """Yield (full_path, relative posix path) for supported files, in stable order."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.startswith(".") or not name.lower().endswith(SUPPORTED_EXTENSIONS):
+                continue
+            full = os.path.join(dirpath, name)
+            yield full, os.path.relpath(full, root).replace(os.sep, "/")
+
+
+def default_checkpoint_path(root: str) -> str:
+    root = os.path.abspath(root)
+    tag = hashlib.sha1(root.encode("utf-8")).hexdigest()[:10]
+    return os.path.join(BULK_CHECKPOINT_DIR, f"{os.path.basename(root) or 'root'}-{tag}.jsonl")
+
+
+def run_bulk_ingestion(
+    root: str,
+    store=None,
+    workers: int = BULK_WORKERS,
+    embed_batch: int = BULK_EMBED_BATCH,
+    checkpoint_path: Optional[str] = None,
+    restart: bool = False,
+    file_timeout: float = BULK_FILE_TIMEOUT,
+) -> Dict[str, Any]:
+    """
+    Ingest every supported file under `root`. Returns the summary stats dict
+    (also logged): docs, chunks, docs_per_sec, chunks_per_sec, utilisation.
+
+    Each file is hashed before it is dispatched; files whose stored chunks
+    already carry that hash are skipped without extraction. A file that takes
+    longer than `file_timeout` seconds in its worker is recorded as failed and
+    the pool is replaced, since the stuck worker cannot be cancelled.
+    """
+    from pipelines.ingestion_pipeline import _SourceSync
+    from pipelines.pipeline_utils import Checkpoint, StageStats
+    from src.ingestion.ingestion_utils import file_sha256
+    from src.ingestion.near_dedup import SignatureView
+
+    if store is None:
+        from src.retrieval.vector_store import get_vector_store
+        store = get_vector_store()
+
+    checkpoint_path = checkpoint_path or default_checkpoint_path(root)
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    checkpoint = Checkpoint(checkpoint_path)
+    stats = StageStats()
+    workers = max(1, workers)
+
+    # Chunks waiting for the next embedding batch, and the files they complete
+    buffer: List[dict] = []
+    buffer_ids: List[str] = []
+    pending: List[Tuple[dict, "_SourceSync"]] = []
+    # Near-duplicate signatures of buffered chunks, until their file is finished
+    view = SignatureView()
+
+    def _flush() -> None:
+        t0 = time.perf_counter()
+        if buffer:
+            store.add_documents(buffer, ids=buffer_ids)
+        records = []
+        for res, sync in pending:
+            sync.finish()
+            stats.incr("chunks_deduplicated", sync.deduplicated)
+            records.append(Checkpoint.file_record(
+                res["path"], res["full_path"], "done",
+                chunks=len(sync.seen), pages=res["pages"],
+            ))
+        stats.add_busy("embed", time.perf_counter() - t0)
+        stats.incr("chunks_embedded", len(buffer))
+        checkpoint.record(records)
+        buffer.clear()
+        buffer_ids.clear()
+        pending.clear()
+
+    def _handle(res: dict, sync: Optional["_SourceSync"]) -> None:
+        stats.add_busy("extract", res["extract_s"])
+        stats.add_busy("chunk", res["chunk_s"])
+        stats.incr("docs")
+        stats.incr("pages", res["pages"])
+        if res["error"] or not res["chunks"]:
+            stats.incr("errors")
+            error = res["error"] or "no text extracted"
+            logger.warning(f"[Bulk] {res['path']}: {error}")
+            checkpoint.record([Checkpoint.file_record(res["path"], res["full_path"], "error", error=error)])
+            return
+        stats.incr("chunks", len(res["chunks"]))
+        stats.incr("tokens_saved", res.get("saved", {}).get("tokens_removed", 0))
+        fresh, ids = sync.new_chunks(res["chunks"])
+        buffer.extend(fresh)
+        buffer_ids.extend(ids)
+        pending.append((res, sync))
+        if len(buffer) >= embed_batch:
+            _flush()
+
+    results: "queue.Queue" = queue.Queue()
+    ctx = multiprocessing.get_context("spawn")
+    started: Any = ctx.Queue()
+
+    def _new_pool():
+        return ctx.Pool(workers, initializer=_init_worker, initargs=(started,), maxtasksperchild=500)
+
+    def _submit(pool, rel: str) -> None:
+        job = in_flight[rel]
+        job["started"] = None
+        pool.apply_async(
+            _extract_and_chunk, (job["full"], rel, job["sync"].file_hash),
+            callback=results.put,
+            error_callback=lambda e, rel=rel, full=job["full"]: results.put(_failed(rel, full, str(e))),
+        )
+
+    def _drain_started() -> None:
+        while True:
+            try:
+                rel, t = started.get_nowait()
+            except queue.Empty:
+                return
+            if rel in in_flight:
+                in_flight[rel]["started"] = t
+
+    # rel path -> {"full", "sync", "started"} for files handed to the pool
+    in_flight: Dict[str, dict] = {}
+    pool = _new_pool()
+    skipped = 0
+    try:
+        files = iter_source_files(root)
+        exhausted = False
+        while True:
+            # Keep a bounded number of files in flight so results never pile up
+            while not exhausted and len(in_flight) < workers * 2:
+                try:
+                    full, rel = next(files)
+                except StopIteration:
+                    exhausted = True
+                    break
+                try:
+                    if checkpoint.is_done(rel, full):
+                        skipped += 1
+                        continue
+                    sync = _SourceSync(store, rel, file_sha256(full), view=view)
+                except OSError as e:
+                    # Deleted or unreadable since the directory was listed
+                    _handle(_failed(rel, full, f"{type(e).__name__}: {e}"), None)
+                    continue
+                if sync.unchanged:
+                    stats.incr("unchanged")
+                    checkpoint.record([Checkpoint.file_record(rel, full, "done", skipped=True)])
+                    continue
+                in_flight[rel] = {"full": full, "sync": sync}
+                _submit(pool, rel)
+            if not in_flight:
+                break
+            try:
+                res = results.get(timeout=1.0)
+            except queue.Empty:
+                res = None
+            if res is not None:
+                job = in_flight.pop(res["path"], None)
+                # None: late result of a file that already timed out or was resubmitted
+                if job is not None:
+                    _handle(res, job["sync"])
+                    if stats.counts["docs"] % 500 == 0:
+                        logger.info(
+                            f"[Bulk] {stats.counts['docs']} files, {stats.counts.get('chunks', 0)} chunks, "
+                            f"{stats.rate('docs'):.1f} docs/s."
+                        )
+            _drain_started()
+            now = time.time()
+            expired = [
+                rel for rel, job in in_flight.items()
+                if job["started"] is not None and now - job["started"] > file_timeout
+            ]
+            if expired:
+                for rel in expired:
+                    job = in_flight.pop(rel)
+                    _handle(_failed(rel, job["full"], f"timed out after {file_timeout:.0f}s"), None)
+                # The stuck workers cannot be cancelled: replace the pool, resubmit the rest
+                pool.terminate()
+                pool.join()
+                _drain_started()
+                pool = _new_pool()
+                for rel in in_flight:
+                    _submit(pool, rel)
+        _flush()
+    finally:
+        pool.terminate()
+        pool.join()
+        checkpoint.close()
+
+    elapsed = stats.elapsed
+    summary = {
+        "docs": stats.counts.get("docs", 0),
+        "docs_resumed": skipped,
+        "docs_unchanged": stats.counts.get("unchanged", 0),
+        "docs_failed": stats.counts.get("errors", 0),
+        "pages": stats.counts.get("pages", 0),
+        "chunks": stats.counts.get("chunks", 0),
+        "chunks_embedded": stats.counts.get("chunks_embedded", 0),
+        "chunks_deduplicated": stats.counts.get("chunks_deduplicated", 0),
+        "tokens_saved": stats.counts.get("tokens_saved", 0),
+        "elapsed_s": elapsed,
+        "docs_per_sec": stats.rate("docs", elapsed),
+        "chunks_per_sec": stats.rate("chunks", elapsed),
+        "extract_utilisation": stats.utilisation("extract", workers),
+        "chunk_utilisation": stats.utilisation("chunk", workers),
+        "embed_utilisation": stats.utilisation("embed"),
+        "checkpoint": checkpoint_path,
+    }
+    logger.info(f"[Bulk] Done: {summary}")
+    return summary
+
+
+def _print_summary(s: dict) -> None:
+    print(f"Files processed : {s['docs']}  (resumed/skipped {s['docs_resumed']}, "
+          f"unchanged {s['docs_unchanged']}, failed {s['docs_failed']})")
+    print(f"Pages / chunks  : {s['pages']} / {s['chunks']}  ({s['chunks_embedded']} embedded, "
+          f"{s['chunks_deduplicated']} near-duplicates referenced, "
+          f"{s['tokens_saved']} header/footer tokens dropped)")
+    print(f"Elapsed         : {s['elapsed_s']:.1f}s")
+    print(f"Throughput      : {s['docs_per_sec']:.2f} docs/sec, {s['chunks_per_sec']:.1f} chunks/sec")
+    print(f"Utilisation     : extract {s['extract_utilisation']:.0%}, "
+          f"chunk {s['chunk_utilisation']:.0%} (of the worker pool), "
+          f"embed+upsert {s['embed_utilisation']:.0%} (main process)")
+    print(f"Checkpoint      : {s['checkpoint']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Bulk-ingest a directory of PDF/DOCX/TXT files.")
+    parser.add_argument("root", help="Directory to crawl recursively")
+    parser.add_argument("--workers", type=int, default=BULK_WORKERS,
+                        help="Extraction/chunking processes (default: BULK_INGEST_WORKERS)")
+    parser.add_argument("--embed-batch", type=int, default=BULK_EMBED_BATCH,
+                        help="Chunks per embedding batch (default: BULK_EMBED_BATCH)")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Checkpoint file (default: under BULK_CHECKPOINT_DIR)")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore an existing checkpoint and start from scratch")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if not os.path.isdir(args.root):
+        parser.error(f"not a directory: {args.root}")
+
+    summary = run_bulk_ingestion(
+        args.root,
+        workers=args.workers,
+        embed_batch=args.embed_batch,
+        checkpoint_path=args.checkpoint,
+        restart=args.restart,
+    )
+    _print_summary(summary)
+    return 1 if summary["docs_failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
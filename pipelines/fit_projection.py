@@ -0,0 +1,79 @@
+"""
+pipelines/fit_projection.py
+Fit the reduced-dimension projection for the Qdrant collection and rebuild
+the collection with it (see src/retrieval/projection.py).
+
+    python -m pipelines.fit_projection                      # VECTOR_PROJECTION / VECTOR_DIM
+    python -m pipelines.fit_projection --kind pca --dim 256 --sample 20000
+    python -m pipelines.fit_projection --kind none          # back to full dimension
+
+PCA is fitted on the embeddings of a random sample of stored chunks and saved
+to PROJECTION_DIR/<collection>.npz. Every chunk is then re-embedded (from the
+embedding cache where possible), projected and re-uploaded. Run it after the
+initial ingestion, and again after switching embedding model or VECTOR_DIM.
+Set VECTOR_PROJECTION / VECTOR_DIM to the same values for new collections.
+"""
+import argparse
+import logging
+import os
+import sys
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    from src.retrieval import projection as proj
+
+    configured = proj.VECTOR_PROJECTION if proj.VECTOR_PROJECTION in ("truncate", "pca") else "pca"
+    parser = argparse.ArgumentParser(description="Fit a vector projection and rebuild the Qdrant collection.")
+    parser.add_argument("--kind", choices=("pca", "truncate", "none"), default=configured,
+                        help="Projection to apply (default: VECTOR_PROJECTION, else pca)")
+    parser.add_argument("--dim", type=int, default=proj.VECTOR_DIM,
+                        help="Target dimension (default: VECTOR_DIM)")
+    parser.add_argument("--sample", type=int, default=proj.PCA_FIT_SAMPLE,
+                        help="Chunks sampled to fit PCA (default: PCA_FIT_SAMPLE)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if os.getenv("VECTOR_STORE_TYPE", "qdrant").lower() != "qdrant":
+        parser.error("projections are only supported for VECTOR_STORE_TYPE=qdrant")
+
+    from src.retrieval.embedding_cache import encode_documents
+    from src.retrieval.models import get_embedding_model_id, get_embedding_model_name
+    from src.retrieval.vector_store import QdrantVectorStore
+
+    # rebuild=True: also opens a collection whose saved projection was lost
+    store = QdrantVectorStore(rebuild=True)
+    model_name = get_embedding_model_name()
+    path = proj.projection_path(store.collection_name)
+    projection = None
+    if args.kind == "truncate":
+        projection = proj.VectorProjection("truncate", store.model_dimension, args.dim, model_name)
+    elif args.kind == "pca":
+        texts = store.sample_texts(args.sample)
+        if len(texts) < args.dim:
+            parser.error(f"need at least {args.dim} stored chunks to fit PCA, found {len(texts)}")
+        logger.info(f"Fitting PCA {store.model_dimension} → {args.dim} on {len(texts)} chunks...")
+        projection = proj.VectorProjection.fit_pca(
+            encode_documents(store.model, texts, get_embedding_model_id()), args.dim, model_name
+        )
+    elif os.path.exists(path):
+        os.remove(path)
+
+    # reproject() recreates the collection, which saves the projection with it
+    count = store.reproject(projection)
+    full_mb = count * store.model_dimension * 4 / 1e6
+    print(f"Collection      : {store.collection_name} ({count} points)")
+    print(f"Vectors         : {store.model_dimension} → {store.dimension} dims "
+          f"({full_mb:.1f} → {count * store.dimension * 4 / 1e6:.1f} MB float32)")
+    if (args.kind, args.dim) != (proj.VECTOR_PROJECTION, proj.VECTOR_DIM) and args.kind != "none":
+        print(f"Set VECTOR_PROJECTION={args.kind} VECTOR_DIM={args.dim} to use it for new collections too.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
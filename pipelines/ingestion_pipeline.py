@@ -1,47 +1,84 @@
 import os
 import logging
-from typing import Dict, Any, Optional
+import queue
+import threading
+import time
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Streaming mode: pages → chunks → fixed-size embed/upsert batches, so peak memory
+# is bounded by EMBED_BATCH_SIZE * (INGEST_MAX_PENDING_BATCHES + 1) chunks.
+INGEST_STREAMING = os.getenv("INGEST_STREAMING", "1") == "1"
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+INGEST_MAX_PENDING_BATCHES = int(os.getenv("INGEST_MAX_PENDING_BATCHES", "2"))
 
-def run_ingestion(file_path: str, store=None) -> Dict[str, Any]:
+
+def run_ingestion(
+    file_path: str,
+    store=None,
+    streaming: Optional[bool] = None,
+    file_hash: Optional[str] = None,
+    progress: Optional[Callable[..., None]] = None,
+) -> Dict[str, Any]:
     """
     Run the complete ingestion pipeline for a single file.
 
+    Ingestion is incremental: if the file's content hash matches what is already
+    stored for this filename, nothing is re-extracted or re-embedded. Otherwise
+    only chunks whose content hash is new get embedded, and chunks from the
+    previous version that no longer exist are deleted.
+
     Args:
         file_path: Absolute path to the PDF/DOCX/TXT file on disk.
         store:     Optional pre-initialised vector store. Pass the
                    Streamlit-cached store here to avoid Qdrant file-lock
                    conflicts between multiple QdrantClient instances.
+        streaming: Use run_ingestion_streaming() (default: INGEST_STREAMING env).
+        file_hash: SHA-256 of the file if the caller already computed it.
+        progress:  Optional callback, called with keyword counters
+                   pages_extracted / chunks_embedded / chunks_upserted as they
+                   advance (may be called from a background thread).
 
     Returns:
         {
           "status": "success" | "error",
           "filename": str,
-          "chunks_indexed": int,
+          "chunks_indexed": int,      # newly embedded chunks
+          "chunks_unchanged": int,    # chunks kept from the previous version
+          "chunks_deleted": int,      # stale chunks removed
+          "skipped": bool,            # True if the file was unchanged
+          "chars_saved": int,         # header/footer text removed before chunking
+          "tokens_saved": int,        # ... and its size in embedding tokens
           "error": str | None
         }
     """
+    if INGEST_STREAMING if streaming is None else streaming:
+        return run_ingestion_streaming(
+            file_path, store=store, file_hash=file_hash, progress=progress
+        )
+
     filename = os.path.basename(file_path)
     logger.info(f"[Ingestion] Starting: {filename}")
 
-    # ── Step 1: Extract text ──────────────────────────────────────────────────
-    from src.ingestion.extract_text import TextExtractor
-    extractor = TextExtractor()
-    ext = os.path.splitext(filename)[-1].lower()
+    if store is None:
+        from src.retrieval.vector_store import get_vector_store
+        store = get_vector_store()
+
+    # ── Step 0: Skip unchanged files ──────────────────────────────────────────
+    sync = _SourceSync(store, filename, file_hash or _file_hash(file_path))
+    if sync.unchanged:
+        return sync.result(0)
 
+    # ── Step 1: Extract text (or reuse a cached extraction) ──────────────────
+    from src.ingestion.header_footer import strip_headers_footers
+    saved: Dict[str, int] = {}
     try:
-        if ext == ".pdf":
-            docs = extractor.extract_from_pdf_advanced(file_path)
-        elif ext in (".docx", ".doc"):
-            docs = extractor.extract_from_docx(file_path)
-        else:
-            # Plain text
-            with open(file_path, "r", encoding="utf-8", errors="replace") as f:
-                text = f.read()
-            from src.ingestion.text_cleaner import clean_text
-            docs = [{"page_content": clean_text(text), "metadata": {"source": filename, "page": 1}}]
+        docs = sorted(
+            _iter_extracted(file_path, file_hash=sync.file_hash),
+            key=lambda d: d["metadata"].get("page", 0),
+        )
+        docs = [d for d in strip_headers_footers(docs, saved) if d["page_content"]]
     except Exception as e:
         logger.error(f"[Ingestion] Extraction failed: {e}")
         return {"status": "error", "filename": filename, "chunks_indexed": 0, "error": str(e)}
@@ -55,6 +92,8 @@ def run_ingestion(file_path: str, store=None) -> Dict[str, Any]:
         }
 
     logger.info(f"[Ingestion] Extracted {len(docs)} pages from {filename}")
+    if progress:
+        progress(pages_extracted=len(docs))
 
     # ── Step 2: Chunk ─────────────────────────────────────────────────────────
     from src.ingestion.chunking import semantic_chunk_documents
@@ -70,18 +109,419 @@ def run_ingestion(file_path: str, store=None) -> Dict[str, Any]:
 
     logger.info(f"[Ingestion] Produced {len(chunks)} chunks.")
 
-    # ── Step 3: Store in vector DB ────────────────────────────────────────────
-    # Use the provided store if available (avoids Qdrant file-lock conflict
-    # when Streamlit already holds the lock via _cached_store()).
+    # ── Step 3: Store new chunks in vector DB, drop stale ones ────────────────
+    new_chunks, ids = sync.new_chunks(chunks)
+    if new_chunks:
+        store.add_documents(new_chunks, ids=ids)
+        if progress:
+            progress(chunks_embedded=len(new_chunks), chunks_upserted=len(new_chunks))
+    sync.finish()
+
+    logger.info(f"[Ingestion] Indexed {len(new_chunks)} new chunks from {filename}.")
+    return {**sync.result(len(new_chunks)), **_saved(saved)}
+
+
+def run_ingestion_streaming(
+    file_path: str,
+    store=None,
+    batch_size: int = EMBED_BATCH_SIZE,
+    file_hash: Optional[str] = None,
+    progress: Optional[Callable[..., None]] = None,
+) -> Dict[str, Any]:
+    """
+    Streaming variant of run_ingestion() with bounded memory.
+
+    A producer thread pulls pages from the extractor, chunks each page as it
+    arrives and groups the chunks into batches of `batch_size`. The calling
+    thread embeds + upserts one batch at a time. The hand-off queue holds at most
+    INGEST_MAX_PENDING_BATCHES batches, so a slow encoder blocks extraction
+    (backpressure) instead of letting chunks pile up. The first batch is
+    searchable as soon as it is upserted.
+
+    Returns the same dict as run_ingestion(), plus "pages_extracted".
+    """
+    filename = os.path.basename(file_path)
+    logger.info(f"[Ingestion] Streaming: {filename}")
+    started = time.perf_counter()
+
     if store is None:
         from src.retrieval.vector_store import get_vector_store
         store = get_vector_store()
-    store.add_documents(chunks)
 
-    logger.info(f"[Ingestion] Indexed {len(chunks)} chunks from {filename}.")
+    sync = _SourceSync(store, filename, file_hash or _file_hash(file_path))
+    if sync.unchanged:
+        return {**sync.result(0), "pages_extracted": 0}
+
+    batches: "queue.Queue" = queue.Queue(maxsize=max(1, INGEST_MAX_PENDING_BATCHES))
+    done = object()
+    stop = threading.Event()
+    counts = {"pages": 0}
+    saved: Dict[str, int] = {}
+
+    def _pages() -> Iterator[dict]:
+        from src.ingestion.header_footer import strip_headers_footers
+        pages = _iter_extracted(file_path, file_hash=sync.file_hash)
+        for page in strip_headers_footers(pages, saved):
+            counts["pages"] += 1
+            if progress:
+                progress(pages_extracted=counts["pages"])
+            yield page
+
+    def _put(item) -> bool:
+        # Blocks while the consumer is busy; gives up if the consumer has stopped
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce():
+        from src.ingestion.chunking import iter_chunk_documents
+        try:
+            batch: List[dict] = []
+            for chunk in iter_chunk_documents(_pages()):
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    if not _put(batch):
+                        return
+                    batch = []
+            if batch:
+                _put(batch)
+            _put(done)
+        except Exception as e:
+            _put(e)
+
+    producer = threading.Thread(target=_produce, name=f"ingest-{filename}", daemon=True)
+    producer.start()
+
+    indexed = 0
+    error: Optional[str] = None
+    try:
+        while True:
+            item = batches.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                logger.error(f"[Ingestion] Extraction failed: {item}")
+                error = str(item)
+                break
+            new_chunks, ids = sync.new_chunks(item)
+            if new_chunks:
+                store.add_documents(new_chunks, ids=ids)
+            indexed += len(new_chunks)
+            if progress and new_chunks:
+                # add_documents() embeds and upserts the batch in one call
+                progress(chunks_embedded=indexed, chunks_upserted=indexed)
+            logger.debug(f"[Ingestion] {filename}: {indexed} chunks indexed so far.")
+    except Exception as e:
+        logger.error(f"[Ingestion] Indexing failed after {indexed} chunks: {e}")
+        error = str(e)
+    finally:
+        stop.set()
+        producer.join(timeout=5)
+
+    if error is None and not sync.seen:
+        error = (
+            "No text could be extracted. The file may be image-only or corrupt."
+            if counts["pages"] == 0
+            else "Chunking produced no results. Text may be too short."
+        )
+    if error is None:
+        # Only prune the previous version once the new one is fully indexed
+        sync.finish()
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"[Ingestion] Indexed {indexed} chunks from {counts['pages']} pages of {filename} "
+        f"in {elapsed:.1f}s."
+    )
+    result = sync.result(indexed)
+    result.update({
+        "status": "error" if error else "success",
+        "pages_extracted": counts["pages"],
+        "error": error,
+        **_saved(saved),
+    })
+    return result
+
+
+def _iter_extracted(
+    file_path: str, extractor=None, file_hash: Optional[str] = None
+) -> Iterator[dict]:
+    """
+    Yield cleaned page dicts for a PDF/DOCX/TXT file, one page at a time.
+
+    With a `file_hash`, pages come from the extraction cache when this content
+    was extracted before (by the same extraction_cache_version()). Otherwise pages are
+    streamed into a new cache entry as they are yielded, which is published
+    only once the extraction completes.
+    """
+    from src.ingestion.extract_text import TextExtractor, extraction_cache_version
+    from src.ingestion.extraction_cache import get_extraction_cache
+
+    filename = os.path.basename(file_path)
+    cache = get_extraction_cache() if file_hash else None
+    version = extraction_cache_version()
+    if cache is not None:
+        cached = cache.get(file_hash, version)
+        if cached is not None:
+            served = 0
+            try:
+                for page in cached:
+                    page["metadata"]["source"] = filename
+                    served += 1
+                    yield page
+            except Exception:
+                if served:
+                    raise
+                # Unreadable entry (now removed): extract afresh below
+            else:
+                logger.info(f"[Ingestion] {filename}: {served} pages from extraction cache.")
+                return
+
+    writer = None
+    if cache is not None:
+        try:
+            writer = cache.writer(file_hash, version)
+        except Exception as e:
+            logger.warning(f"[Ingestion] Could not cache extraction of {filename}: {e}")
+    try:
+        for page in _extract_pages(file_path, extractor or TextExtractor()):
+            if writer is not None:
+                # Serialised before the page is handed on (and mutated downstream)
+                try:
+                    writer.add(page)
+                except Exception as e:
+                    logger.warning(f"[Ingestion] Could not cache extraction of {filename}: {e}")
+                    writer.abort()
+                    writer = None
+            yield page
+        if writer is not None and writer.pages:
+            try:
+                writer.commit()
+            except Exception as e:
+                logger.warning(f"[Ingestion] Could not cache extraction of {filename}: {e}")
+    finally:
+        # A failed or abandoned extraction leaves no entry behind
+        if writer is not None:
+            writer.abort()
+
+
+def _extract_pages(file_path: str, extractor) -> Iterator[dict]:
+    filename = os.path.basename(file_path)
+    ext = os.path.splitext(filename)[-1].lower()
+    if ext == ".pdf":
+        yield from extractor.iter_pdf_pages(file_path)
+    elif ext in (".docx", ".doc"):
+        yield from extractor.iter_docx_pages(file_path)
+    else:
+        # Plain text
+        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        from src.ingestion.text_cleaner import clean_text
+        yield {"page_content": clean_text(text), "metadata": {"source": filename, "page": 1}}
+
+
+def _saved(stats: Dict[str, int]) -> Dict[str, int]:
+    """Header/footer savings for the result dict."""
     return {
-        "status": "success",
-        "filename": filename,
-        "chunks_indexed": len(chunks),
-        "error": None,
+        "chars_saved": stats.get("chars_removed", 0),
+        "tokens_saved": stats.get("tokens_removed", 0),
     }
+
+
+def _file_hash(file_path: str) -> str:
+    from src.ingestion.ingestion_utils import file_sha256
+    return file_sha256(file_path)
+
+
+class _SourceSync:
+    """
+    Content-addressed bookkeeping for (re-)ingesting one source file.
+
+    Chunks get deterministic point IDs from (source, chunk hash). Chunks whose ID
+    is already stored are not re-embedded; stored chunks that do not appear in the
+    new version are deleted by finish().
+
+    The file hash is the completion marker: finish() stamps it on every chunk of
+    the new version, so chunks upserted by a run that failed part-way carry no
+    hash (or the previous one) and the retry does not treat the file as
+    unchanged. Stores without set_file_hash() get it with each chunk instead.
+
+    New chunks that near-duplicate a stored chunk of another source (see
+    src/ingestion/near_dedup.py) are not embedded either: they become references,
+    listed in the stored chunk's `also_in` payload. Chunks not yet finished are
+    matched through `view`, shared by the sources of one bulk run; a near-repeat
+    of a chunk of this same source is dropped like an exact repeat.
+    """
+
+    def __init__(self, store, source: str, file_hash: str, view=None):
+        self.store = store
+        self.source = source
+        self.file_hash = file_hash
+        get_state = getattr(store, "get_source_state", None)
+        self.existing: Dict[str, Optional[str]] = get_state(source) if get_state else {}
+        self.seen: set = set()
+        self.unchanged_count = 0
+        self.deleted_count = 0
+        self.stamp_on_finish = hasattr(store, "set_file_hash")
+        self.added: List[str] = []  # point IDs upserted by this run
+        from src.ingestion.near_dedup import SignatureView, get_fingerprint_index, index_scope
+        # References live in the canonical chunk's payload: no dedup without update_payload()
+        self.index = get_fingerprint_index(index_scope(store)) if hasattr(store, "update_payload") else None
+        self.view = view if view is not None else SignatureView()
+        self.refs: List[Tuple[str, str]] = []  # (canonical point ID, our content hash)
+        self.near_repeats = 0  # near-duplicates of another chunk of this source
+        self.signatures: List[tuple] = []  # (point ID, source, MinHash) of fresh chunks
+
+    @property
+    def unchanged(self) -> bool:
+        """True when every stored chunk of this source came from the same file content."""
+        if self.existing and all(h == self.file_hash for h in self.existing.values()):
+            logger.info(f"[Ingestion] {self.source} is unchanged (sha256 {self.file_hash[:12]}); skipping.")
+            self.unchanged_count = len(self.existing)
+            return True
+        return False
+
+    def new_chunks(self, chunks: List[dict]) -> Tuple[List[dict], List[str]]:
+        """Return the chunks that still need embedding, with their point IDs."""
+        from src.ingestion.ingestion_utils import content_hash, point_id
+
+        fresh: List[dict] = []
+        ids: List[str] = []
+        for chunk in chunks:
+            chash = content_hash(chunk["page_content"])
+            pid = point_id(self.source, chash)
+            if pid in self.seen:
+                continue  # identical chunk repeated within this file
+            self.seen.add(pid)
+            if pid in self.existing:
+                self.unchanged_count += 1
+                if self.index is not None and self.existing[pid] is None:
+                    # Upserted by an interrupted run, whose finish() never indexed it
+                    self._signature(pid, chunk["page_content"])
+                continue
+            if self.index is not None:
+                from src.ingestion.near_dedup import minhash
+                sig = minhash(chunk["page_content"])
+                if sig is not None:
+                    match = self._near_duplicate(sig)
+                    if match is not None:
+                        if match[1] == self.source:
+                            self.near_repeats += 1
+                        else:
+                            self.refs.append((match[0], chash))
+                        continue
+                    self.signatures.append((pid, self.source, sig))
+                    self.view.add(pid, self.source, sig)
+            chunk["metadata"]["content_hash"] = chash
+            if not self.stamp_on_finish:
+                chunk["metadata"]["file_hash"] = self.file_hash
+            fresh.append(chunk)
+            ids.append(pid)
+        self.added.extend(ids)
+        return fresh, ids
+
+    @property
+    def deduplicated(self) -> int:
+        return len(self.refs) + self.near_repeats
+
+    def _near_duplicate(self, sig) -> Optional[Tuple[str, str]]:
+        """
+        (point ID, source) of a chunk `sig` near-duplicates: one upserted by this
+        run, else a stored one of another source or of this file's new version.
+        """
+        match = self.view.find(sig)
+        if match is not None:
+            return match
+        match = self.index.find(sig, exclude_source=self.source, include=self.seen)
+        if match is not None and self._canonical_exists(match[0]):
+            return match
+        return None
+
+    def _canonical_exists(self, pid: str) -> bool:
+        """Whether a near-duplicate match is still stored; a stale one is dropped from the index."""
+        check = getattr(self.store, "existing_points", None)
+        if check is None:
+            return True
+        try:
+            if pid in check([pid]):
+                return True
+        except Exception as e:
+            logger.warning(f"[Ingestion] Could not look up near-duplicate {pid}: {e}; embedding the chunk.")
+            return False
+        logger.warning(f"[Ingestion] Near-duplicate {pid} is no longer stored; dropping it from the index.")
+        self.index.remove([pid])
+        return False
+
+    def _signature(self, pid: str, text: str) -> None:
+        from src.ingestion.near_dedup import minhash
+        sig = minhash(text)
+        if sig is not None:
+            self.signatures.append((pid, self.source, sig))
+
+    def finish(self) -> None:
+        """Delete stale chunks, re-stamp kept ones and record near-duplicate references."""
+        stale = [pid for pid in self.existing if pid not in self.seen]
+        kept = [
+            pid for pid, h in self.existing.items()
+            if pid in self.seen and h != self.file_hash
+        ]
+        if self.index is not None:
+            stale = self._sync_references(stale)
+            self.view.discard(pid for pid, _, _ in self.signatures)
+        if stale and hasattr(self.store, "delete_points"):
+            self.store.delete_points(stale)
+            self.deleted_count = len(stale)
+        if self.stamp_on_finish and (kept or self.added):
+            # Last step: the stamped hash marks this version as completely indexed
+            self.store.set_file_hash(kept + self.added, self.file_hash)
+        if self.existing:
+            logger.info(
+                f"[Ingestion] {self.source}: {self.unchanged_count} chunks unchanged, "
+                f"{self.deleted_count} stale chunks deleted."
+            )
+
+    def _sync_references(self, stale: List[str]) -> List[str]:
+        """
+        Update the fingerprint index after this source was (re-)ingested and
+        return the stale point IDs that can really be deleted. A stale chunk
+        that other sources still reference is handed over to one of them.
+        """
+        index = self.index
+        index.add(self.signatures)
+        changed = set(index.replace_refs(self.source, self.refs, self.file_hash))
+        deletable = []
+        for pid in stale:
+            referrers = index.ref_sources(pid)
+            if not referrers:
+                deletable.append(pid)
+                continue
+            # Stamped with the new owner's file hash, the point is one of its chunks:
+            # unchanged content is still skipped, a new version drops it as stale
+            owner_hash = index.transfer(pid, referrers[0])
+            self.store.update_payload([pid], {"source": referrers[0], "file_hash": owner_hash})
+            changed.add(pid)
+        index.remove(deletable)
+        for pid in sorted(changed - set(deletable)):
+            self.store.update_payload([pid], {"also_in": index.ref_sources(pid)})
+        if self.deduplicated:
+            logger.info(
+                f"[Ingestion] {self.source}: {self.deduplicated} near-duplicate chunks "
+                f"not embedded ({len(self.refs)} stored as references)."
+            )
+        return deletable
+
+    def result(self, indexed: int) -> Dict[str, Any]:
+        return {
+            "status": "success",
+            "filename": self.source,
+            "chunks_indexed": indexed,
+            "chunks_unchanged": self.unchanged_count,
+            "chunks_deleted": self.deleted_count,
+            "chunks_deduplicated": self.deduplicated,
+            "skipped": indexed == 0 and not self.seen and self.unchanged_count > 0,
+            "error": None,
+        }
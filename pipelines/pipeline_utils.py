@@ -0,0 +1,104 @@
+"""
+pipelines/pipeline_utils.py
+Shared helpers for the batch pipelines: resumable checkpoints and stage timing.
+"""
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    """
+    Append-only JSONL record of files a batch job has finished.
+
+    Each line is {"path", "size", "mtime_ns", "status", ...}. A file counts as
+    done on resume only if its last record says "done" and its size and mtime
+    are unchanged, so edited files and failures are retried. Lines are flushed
+    as they are written; a torn last line after a crash is ignored.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._done: Dict[str, tuple] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if rec.get("status") == "done":
+                        self._done[rec["path"]] = (rec.get("size"), rec.get("mtime_ns"))
+                    else:
+                        self._done.pop(rec.get("path"), None)
+            logger.info(f"[Checkpoint] {len(self._done)} files already done in {path}.")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._fh = open(path, "a", encoding="utf-8")
+
+    def is_done(self, rel_path: str, full_path: str) -> bool:
+        if rel_path not in self._done:
+            return False
+        try:
+            st = os.stat(full_path)
+        except OSError:
+            return False
+        return self._done[rel_path] == (st.st_size, st.st_mtime_ns)
+
+    def record(self, records: Iterable[dict]) -> None:
+        for rec in records:
+            self._fh.write(json.dumps(rec) + "\n")
+            if rec.get("status") == "done":
+                self._done[rec["path"]] = (rec.get("size"), rec.get("mtime_ns"))
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def close(self) -> None:
+        self._fh.close()
+
+    @staticmethod
+    def file_record(rel_path: str, full_path: str, status: str, **extra) -> dict:
+        # size/mtime are None for a file deleted mid-run; it never matches on resume
+        try:
+            st = os.stat(full_path)
+            size, mtime_ns = st.st_size, st.st_mtime_ns
+        except OSError:
+            size = mtime_ns = None
+        return {
+            "path": rel_path,
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "status": status,
+            **extra,
+        }
+
+
+class StageStats:
+    """Busy-time accounting per pipeline stage, for throughput/utilisation reports."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.busy: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add_busy(self, stage: str, seconds: float) -> None:
+        self.busy[stage] = self.busy.get(stage, 0.0) + seconds
+
+    def incr(self, name: str, n: int = 1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def utilisation(self, stage: str, capacity: int = 1) -> float:
+        """Fraction of wall-clock time `capacity` workers spent busy in `stage`."""
+        wall = self.elapsed * max(1, capacity)
+        return self.busy.get(stage, 0.0) / wall if wall else 0.0
+
+    def rate(self, name: str, elapsed: Optional[float] = None) -> float:
+        elapsed = self.elapsed if elapsed is None else elapsed
+        return self.counts.get(name, 0) / elapsed if elapsed else 0.0
@@ -19,6 +19,8 @@ def run_retrieval(
     question: str,
     history: Optional[List[Dict[str, str]]] = None,
     store=None,
+    search_profile: Optional[str] = None,
+    filters: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     """
     Run the complete retrieval + generation pipeline.
@@ -27,6 +29,10 @@ def run_retrieval(
         question: The user's raw question string.
         history:  Prior conversation turns for context.
         store:    Optional pre-initialised vector store (avoids re-loading).
+        search_profile: "fast" | "balanced" | "exact" search effort
+                  (default SEARCH_PROFILE).
+        filters:  Metadata conditions applied inside the vector search,
+                  e.g. {"source": "contract_x.pdf", "type": "ocr"}.
 
     Returns:
         {
@@ -63,13 +69,11 @@ def run_retrieval(
     candidate_texts: List[str] = []
     text_to_meta: Dict[str, dict] = {}  # text → metadata mapping
 
-    for q in queries:
-        results = store.similarity_search(q, k=RETRIEVAL_K)
-        for text, meta, score in results:
-            if text and text not in seen_texts:
-                seen_texts.add(text)
-                candidate_texts.append(text)
-                text_to_meta[text] = meta  # preserves the correct metadata for each unique text
+    for text, meta, score in _search_all(store, queries, search_profile, filters):
+        if text and text not in seen_texts:
+            seen_texts.add(text)
+            candidate_texts.append(text)
+            text_to_meta[text] = meta  # preserves the correct metadata for each unique text
 
     logger.info(f"[Retrieval] Retrieved {len(candidate_texts)} unique candidate chunks.")
 
@@ -120,3 +124,29 @@ def run_retrieval(
         "context_preview": context[:1000] + ("..." if len(context) > 1000 else ""),
         "chunks_retrieved": len(top_texts),
     }
+
+
+def _search_all(
+    store, queries: List[str], search_profile: Optional[str] = None, filters: Optional[Dict[str, Any]] = None
+) -> List[tuple]:
+    """
+    (text, metadata, score) for every hit of every query variant. All variants
+    are embedded together in one forward pass. Stores that keep chunk text
+    outside the index return point IDs first, so the text of a chunk found by
+    several variants is fetched only once.
+    """
+    # Only passed when set, so stores without search profiles / filters keep working
+    options: Dict[str, Any] = {}
+    if search_profile:
+        options["search_profile"] = search_profile
+    if filters:
+        options["filters"] = filters
+    if hasattr(store, "search_points_many"):
+        hits: Dict[str, tuple] = {}
+        for results in store.search_points_many(queries, k=RETRIEVAL_K, **options):
+            for pid, payload, score in results:
+                hits.setdefault(pid, (pid, payload, score))
+        return store.materialize(list(hits.values()))
+    if hasattr(store, "similarity_search_many"):
+        return [hit for results in store.similarity_search_many(queries, k=RETRIEVAL_K, **options) for hit in results]
+    return [hit for q in queries for hit in store.similarity_search(q, k=RETRIEVAL_K, **options)]
@@ -0,0 +1,78 @@
+"""
+src/api/api_utils.py
+Helpers shared by the API endpoints.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from typing import Tuple
+
+logger = logging.getLogger(__name__)
+
+# Uploads larger than this are rejected (HTTP 413) as soon as the limit is crossed
+UPLOAD_MAX_MB = int(os.getenv("UPLOAD_MAX_MB", "200"))
+# Bytes copied per read; bounds the per-request memory used for an upload
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+
+class UploadTooLargeError(ValueError):
+    """The upload exceeded UPLOAD_MAX_MB."""
+
+
+async def save_upload(
+    upload,
+    max_bytes: int = UPLOAD_MAX_MB * 1024 * 1024,
+    chunk_bytes: int = UPLOAD_CHUNK_BYTES,
+) -> Tuple[str, str, str, int]:
+    """
+    Stream a FastAPI UploadFile to a unique temp directory in fixed-size chunks.
+
+    The SHA-256 is computed while copying, so incremental ingestion does not
+    read the file a second time. The original filename is kept (it becomes the
+    chunks' source) inside a per-upload directory, so concurrent uploads of the
+    same filename never overwrite each other.
+
+    Hashing and writing run in the threadpool, so a large upload does not
+    hold the event loop between reads.
+
+    Returns (temp_dir, path, sha256_hex, size_bytes). The caller owns temp_dir.
+    Raises UploadTooLargeError (after removing the partial file) if the upload
+    is bigger than `max_bytes`.
+    """
+    from starlette.concurrency import run_in_threadpool
+
+    declared = getattr(upload, "size", None)
+    if declared is not None and declared > max_bytes:
+        raise UploadTooLargeError(_too_large(max_bytes))
+
+    temp_dir = tempfile.mkdtemp(prefix="upload-")
+    path = os.path.join(temp_dir, os.path.basename(upload.filename or "upload"))
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(path, "wb") as out:
+            while True:
+                block = await upload.read(chunk_bytes)
+                if not block:
+                    break
+                size += len(block)
+                if size > max_bytes:
+                    raise UploadTooLargeError(_too_large(max_bytes))
+                await run_in_threadpool(_append, out, digest, block)
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    logger.info(f"[Upload] Saved {os.path.basename(path)} ({size / 1e6:.1f} MB).")
+    return temp_dir, path, digest.hexdigest(), size
+
+
+def _append(out, digest, block: bytes) -> None:
+    digest.update(block)
+    out.write(block)
+
+
+def _too_large(max_bytes: int) -> str:
+    return f"File exceeds the {max_bytes / (1024 * 1024):.0f} MB upload limit."
@@ -1,9 +1,15 @@
 """
 src/ingestion/chunking.py
-Semantic-aware chunking with proper LangChain Document conversion and chunk metadata.
+Token-aware recursive chunking with chunk metadata.
+
+Chunk lengths are measured in embedding-tokenizer tokens (CHUNK_SIZE /
+CHUNK_OVERLAP are token counts), so chunks fill but never exceed the encoder's
+input window instead of being silently truncated.
 """
+import bisect
 import logging
-from typing import List, Dict, Any
+import re
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 import os
 
 logger = logging.getLogger(__name__)
@@ -11,108 +17,213 @@ logger = logging.getLogger(__name__)
 # Minimum chunk length — chunks shorter than this are noise (headers, dates, etc.)
 MIN_CHUNK_CHARS = int(os.getenv("MIN_CHUNK_CHARS", "50"))
 
+# Chunk size / overlap in embedding tokens. bge-large-en-v1.5 accepts 512 tokens
+# including [CLS]/[SEP]; chunk_size is clamped to that window in any case.
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "384"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "64"))
+
+# Order matters: prefer logical boundaries. "" = split between any two tokens.
+SEPARATORS = ["\n\n", "\n", "---", ". ", "! ", "? ", "; ", ", ", " ", ""]
+
+# Used when the embedding tokenizer cannot be loaded (e.g. offline): words and
+# punctuation marks, which approximates WordPiece counts from below.
+_APPROX_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+Span = Tuple[int, int]
+
 
 def semantic_chunk_documents(
     documents: list,
-    chunk_size: int = int(os.getenv("CHUNK_SIZE", "512")),
-    chunk_overlap: int = int(os.getenv("CHUNK_OVERLAP", "128")),
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+    tokenizer=None,
 ) -> List[Dict[str, Any]]:
     """
     Split a list of page documents (dicts OR LangChain Documents) into
     overlapping text chunks suitable for embedding.
 
     Key behaviours:
-    - Converts dicts to langchain_core.documents.Document objects BEFORE
-      calling split_documents (raw dicts caused silent crashes in old version).
-    - Adds chunk_id + chunk_index to every chunk's metadata.
+    - chunk_size / chunk_overlap are measured in embedding tokens, using one
+      tokenizer call per page (offset mappings give the token count of any span).
+    - Adds chunk_id, chunk_index and token_count to every chunk's metadata.
     - Uses sentence-friendly separators with overlap to preserve context.
     - Skips chunks shorter than MIN_CHUNK_CHARS (noise filtering).
     """
-    # ── Normalise input to LangChain Document objects ────────────────────────
-    from langchain_core.documents import Document
+    result = list(iter_chunk_documents(documents, chunk_size, chunk_overlap, tokenizer))
+    logger.info(f"Chunking produced {len(result)} valid chunks (min_chars={MIN_CHUNK_CHARS}).")
+    return result
 
-    lc_docs: List[Document] = []
+
+def iter_chunk_documents(
+    documents: Iterable,
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+    tokenizer=None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Generator form of semantic_chunk_documents(): pulls one page at a time from
+    `documents` (any iterable, e.g. TextExtractor.iter_pdf_pages) and yields its
+    chunks immediately. chunk_index / chunk_id keep counting across pages, so the
+    output is identical to the list version.
+
+    `tokenizer` is any HuggingFace-style fast tokenizer; defaults to the
+    embedding model's (src.retrieval.models.get_tokenizer).
+    """
+    if tokenizer is None:
+        from src.retrieval.models import get_tokenizer
+        tokenizer = get_tokenizer()
+        if tokenizer is None:
+            logger.warning("Embedding tokenizer unavailable; approximating token counts.")
+    chunk_size, chunk_overlap = _clamp_sizes(tokenizer, chunk_size, chunk_overlap)
+
+    idx = 0
     for d in documents:
-        if isinstance(d, Document):
-            lc_docs.append(d)
-        elif isinstance(d, dict):
-            page_content = d.get("page_content", "")
+        # ── Normalise input (dict, LangChain Document or plain string) ───────
+        if isinstance(d, dict):
+            text = d.get("page_content", "")
             metadata = d.get("metadata", {})
-            if page_content and page_content.strip():
-                lc_docs.append(Document(page_content=page_content, metadata=metadata))
+        elif hasattr(d, "page_content"):
+            text = d.page_content
+            metadata = getattr(d, "metadata", {}) or {}
         else:
             text = str(d)
-            if text.strip():
-                lc_docs.append(Document(page_content=text, metadata={}))
-
-    if not lc_docs:
-        return []
-
-    # ── Chunk with RecursiveCharacterTextSplitter ────────────────────────────
-    try:
-        from langchain_text_splitters import RecursiveCharacterTextSplitter
-
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            # Order matters: prefer logical boundaries
-            separators=["\n\n", "\n", "---", ". ", "! ", "? ", "; ", ", ", " ", ""],
-            keep_separator=True,
-            is_separator_regex=False,
-        )
-        split_docs = splitter.split_documents(lc_docs)
-    except Exception as e:
-        logger.warning(f"LangChain splitter failed ({e}), using pure-Python fallback.")
-        # Pure-Python fallback (no LangChain) — also correct now
-        split_docs = _fallback_split(lc_docs, chunk_size, chunk_overlap)
-
-    # ── Add chunk metadata + filter noise chunks ─────────────────────────────
-    result: List[Dict[str, Any]] = []
-    idx = 0
-    for doc in split_docs:
-        content = doc.page_content.strip()
-        # Bug 15 Fix: Skip very short chunks — they are PDF noise, not content
-        if len(content) < MIN_CHUNK_CHARS:
-            logger.debug(f"Skipping noise chunk ({len(content)} chars): {content[:40]!r}")
+            metadata = {}
+        if not text or not text.strip():
             continue
-        meta = dict(doc.metadata)
-        meta["chunk_index"] = idx
-        # Unique ID combining source + index for deduplication
-        source = meta.get("source", "unknown")
-        page = meta.get("page", "0")
-        meta["chunk_id"] = f"{source}::p{page}::c{idx}"
-        result.append({"page_content": content, "metadata": meta})
-        idx += 1
 
-    logger.info(f"Chunking produced {len(result)} valid chunks (min_chars={MIN_CHUNK_CHARS}).")
-    return result
+        # ── Chunk on token-counted spans of the page ─────────────────────────
+        starts = _token_starts(text, tokenizer)
+
+        def count(a: int, b: int) -> int:
+            return bisect.bisect_left(starts, b) - bisect.bisect_left(starts, a)
 
+        spans = _split_span(text, 0, len(text), SEPARATORS, starts, count,
+                            chunk_size, chunk_overlap)
 
-def _fallback_split(
-    docs: list, chunk_size: int, chunk_overlap: int
-) -> list:
-    """Pure-Python fallback splitter when LangChain is not available."""
-    from langchain_core.documents import Document
-
-    chunks = []
-    for doc in docs:
-        text = doc.page_content
-        meta = doc.metadata
-        start = 0
-        while start < len(text):
-            end = min(len(text), start + chunk_size)
-            # Try to end on a sentence boundary
-            if end < len(text):
-                for sep in (". ", ".\n", "\n\n", "\n", " "):
-                    pos = text.rfind(sep, start, end)
-                    if pos != -1 and pos > start:
-                        end = pos + len(sep)
-                        break
-            chunk_text = text[start:end].strip()
-            if chunk_text:
-                chunks.append(Document(page_content=chunk_text, metadata=meta))
-            if end >= len(text):
-                break
-            start = max(0, end - chunk_overlap)
+        # ── Add chunk metadata + filter noise chunks ─────────────────────────
+        for a, b in spans:
+            content = text[a:b].strip()
+            # Bug 15 Fix: Skip very short chunks — they are PDF noise, not content
+            if len(content) < MIN_CHUNK_CHARS:
+                logger.debug(f"Skipping noise chunk ({len(content)} chars): {content[:40]!r}")
+                continue
+            meta = dict(metadata)
+            meta["chunk_index"] = idx
+            meta["token_count"] = count(a, b)
+            # Unique ID combining source + index for deduplication
+            source = meta.get("source", "unknown")
+            page = meta.get("page", "0")
+            meta["chunk_id"] = f"{source}::p{page}::c{idx}"
+            yield {"page_content": content, "metadata": meta}
+            idx += 1
+
+
+def count_tokens(texts: Iterable[str], tokenizer=None) -> int:
+    """Total embedding-token count of `texts` (approximate if no tokenizer is available)."""
+    if tokenizer is None:
+        from src.retrieval.models import get_tokenizer
+        tokenizer = get_tokenizer()
+    # Tokens never span a newline, so one call over the joined text is exact
+    return len(_token_starts("\n".join(texts), tokenizer))
+
+
+def _clamp_sizes(tokenizer, chunk_size: int, chunk_overlap: int) -> Tuple[int, int]:
+    """Keep chunks inside the encoder window and the overlap below the chunk size."""
+    max_len = getattr(tokenizer, "model_max_length", None)
+    if isinstance(max_len, int) and 2 < max_len < 100_000:
+        # Leave room for the [CLS]/[SEP] special tokens
+        chunk_size = min(chunk_size, max_len - 2)
+    chunk_size = max(1, chunk_size)
+    return chunk_size, max(0, min(chunk_overlap, chunk_size - 1))
+
+
+def _token_starts(text: str, tokenizer) -> List[int]:
+    """Sorted character offsets at which each token of `text` starts."""
+    if tokenizer is not None:
+        try:
+            enc = tokenizer(
+                [text],
+                add_special_tokens=False,
+                return_offsets_mapping=True,
+                verbose=False,
+            )
+            return [s for s, e in enc["offset_mapping"][0] if e > s]
+        except Exception as e:
+            logger.warning(f"Tokenizer call failed ({e}); approximating token counts.")
+    return [m.start() for m in _APPROX_TOKEN.finditer(text)]
+
+
+def _split_span(
+    text: str,
+    a: int,
+    b: int,
+    separators: List[str],
+    starts: List[int],
+    count,
+    chunk_size: int,
+    chunk_overlap: int,
+) -> List[Span]:
+    """
+    Recursive splitter over text[a:b]: split on the first separator present,
+    merge the pieces up to chunk_size tokens and recurse into pieces that are
+    still too long with the remaining separators. Separators stay attached to
+    the end of the preceding piece (sentences keep their full stop), so every
+    piece (and chunk) is a contiguous span of the page and its token count is
+    a bisect away.
+    """
+    sep, rest = "", []
+    for i, s in enumerate(separators):
+        if s == "" or text.find(s, a, b) != -1:
+            sep, rest = s, separators[i + 1:]
+            break
+
+    # ── Cut points ───────────────────────────────────────────────────────────
+    if sep:
+        cuts = []
+        pos = text.find(sep, a, b)
+        while pos != -1:
+            cuts.append(pos + len(sep))
+            pos = text.find(sep, pos + len(sep), b)
+    else:
+        lo = bisect.bisect_right(starts, a)
+        hi = bisect.bisect_left(starts, b)
+        cuts = starts[lo:hi]
+    bounds = [a] + cuts + [b]
+    pieces = [(s, e) for s, e in zip(bounds, bounds[1:]) if e > s]
+
+    # ── Merge small pieces, recurse into oversized ones ──────────────────────
+    chunks: List[Span] = []
+    good: List[Span] = []
+    for s, e in pieces:
+        if count(s, e) <= chunk_size:
+            good.append((s, e))
+            continue
+        if good:
+            chunks.extend(_merge_spans(good, count, chunk_size, chunk_overlap))
+            good = []
+        if sep:
+            chunks.extend(_split_span(text, s, e, rest, starts, count, chunk_size, chunk_overlap))
+        else:
+            chunks.append((s, e))  # cannot happen for chunk_size >= 1; keep text anyway
+    if good:
+        chunks.extend(_merge_spans(good, count, chunk_size, chunk_overlap))
     return chunks
+
+
+def _merge_spans(pieces: List[Span], count, chunk_size: int, chunk_overlap: int) -> List[Span]:
+    """Greedily merge adjacent pieces into chunks of <= chunk_size tokens with overlap."""
+    merged: List[Span] = []
+    current: List[Span] = []
+    for piece in pieces:
+        if current and count(current[0][0], piece[1]) > chunk_size:
+            merged.append((current[0][0], current[-1][1]))
+            # Keep a tail of up to chunk_overlap tokens as the start of the next chunk
+            while current and (
+                count(current[0][0], current[-1][1]) > chunk_overlap
+                or count(current[0][0], piece[1]) > chunk_size
+            ):
+                current.pop(0)
+        current.append(piece)
+    if current:
+        merged.append((current[0][0], current[-1][1]))
+    return merged
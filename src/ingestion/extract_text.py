@@ -2,185 +2,685 @@
 src/ingestion/extract_text.py
 PDF / DOCX / TXT text extraction with OCR fallback and text cleaning.
 """
+import hashlib
+import json
 import logging
 import os
-from typing import List
+import time
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from src.ingestion.text_cleaner import clean_text
 
 logger = logging.getLogger(__name__)
 
+# Parallel page extraction — only used for PDFs with at least PDF_PARALLEL_MIN_PAGES
+# pages, because spawning worker processes costs more than it saves on short files.
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+PDF_PAGE_TIMEOUT = float(os.getenv("PDF_PAGE_TIMEOUT", "20"))
+PDF_WORKER_MAX_MB = int(os.getenv("PDF_WORKER_MAX_MB", "1024"))
 
-class TextExtractor:
-    def __init__(self):
+# Per-page OCR — pages whose text layer is empty or garbage are re-read with
+# pdfplumber, and OCR'd only if that fails too.
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+OCR_PAGE_TIMEOUT = float(os.getenv("OCR_PAGE_TIMEOUT", "60"))
+OCR_MIN_DPI = int(os.getenv("OCR_MIN_DPI", "150"))
+OCR_MAX_DPI = int(os.getenv("OCR_MAX_DPI", "300"))
+OCR_DEFAULT_DPI = int(os.getenv("OCR_DEFAULT_DPI", "200"))
+MIN_PAGE_TEXT_CHARS = int(os.getenv("MIN_PAGE_TEXT_CHARS", "25"))
+
+# Streaming DOCX: pieces are cut at page/section breaks, or at the first
+# paragraph boundary past this many characters when the file has none.
+DOCX_MAX_PIECE_CHARS = int(os.getenv("DOCX_MAX_PIECE_CHARS", "8000"))
+
+# Part of the extraction-cache key: bump whenever a change here or in
+# text_cleaner alters the extracted pages, so stale cache entries are ignored.
+EXTRACTOR_VERSION = "4"
+
+
+def extraction_cache_version() -> str:
+    """
+    EXTRACTOR_VERSION plus a digest of the settings that shape the extracted
+    pages, so changing one misses the extraction cache instead of serving stale
+    pages. Header/footer removal runs on the cached pages and is not included.
+    """
+    settings = json.dumps([
+        DOCX_MAX_PIECE_CHARS, MIN_PAGE_TEXT_CHARS, OCR_MIN_DPI, OCR_MAX_DPI, OCR_DEFAULT_DPI,
+    ])
+    return f"{EXTRACTOR_VERSION}-{hashlib.sha1(settings.encode('utf-8')).hexdigest()[:10]}"
+
+
+def _is_garbage_text(text: str) -> bool:
+    """Mostly symbols / replacement characters — typical of broken font encodings."""
+    sample = text[:2000]
+    if sample.count("\ufffd") > len(sample) * 0.02:
+        return True
+    wordlike = sum(1 for ch in sample if ch.isalnum() or ch.isspace())
+    return wordlike < len(sample) * 0.6
+
+
+def _image_coverage(page) -> float:
+    """Fraction of the page area covered by raster images (≈1.0 for a scanned page)."""
+    area = abs(page.rect) or 1.0
+    covered = 0.0
+    try:
+        for info in page.get_image_info():
+            x0, y0, x1, y1 = info["bbox"]
+            covered += max(0.0, x1 - x0) * max(0.0, y1 - y0)
+    except Exception:
+        return 0.0
+    return min(1.0, covered / area)
+
+
+def _needs_fallback(page, text: str) -> bool:
+    """
+    Per-page decision: does this page's text layer need pdfplumber / OCR?
+    - garbage text → yes
+    - empty or very short text on a page that is mostly a raster image
+      (scanned page, possibly with a thin text-layer header) → yes
+    - short text without images (title / blank pages) → no, keep it as is
+    """
+    if text and _is_garbage_text(text):
+        return True
+    if len(text) >= MIN_PAGE_TEXT_CHARS:
+        return False
+    return _image_coverage(page) >= 0.3
+
+
+# ── Process-pool workers (module level so they can be pickled under spawn) ────
+def _limit_worker_memory(max_mb: int) -> None:
+    """Cap the address space of a pool worker so one pathological PDF cannot OOM the host."""
+    if max_mb <= 0:
+        return
+    try:
+        import resource
+        limit = max_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        # Windows has no `resource`; some containers forbid lowering limits.
+        pass
+
+
+def _pymupdf_page_range(pdf_path: str, pages: List[int]) -> List[Tuple[int, str, bool]]:
+    """
+    Extract and clean the given 0-based pages.
+    Returns (page_number, text, needs_fallback) triples.
+    """
+    import fitz  # PyMuPDF
+    out: List[Tuple[int, str, bool]] = []
+    doc = fitz.open(pdf_path)
+    try:
+        for i in pages:
+            page = doc[i]
+            text = clean_text(page.get_text("text"))
+            out.append((i + 1, text, _needs_fallback(page, text)))
+    finally:
+        doc.close()
+    return out
+
+
+def _configure_tesseract() -> None:
+    """Set tesseract binary on Windows if not on PATH."""
+    try:
+        import shutil as _sh
+        import pytesseract
+        if _sh.which("tesseract") is None:
+            candidate = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+            if os.path.exists(candidate):
+                pytesseract.pytesseract.tesseract_cmd = candidate
+    except Exception:
+        pass
+
+
+def _init_ocr_worker(max_mb: int) -> None:
+    _limit_worker_memory(max_mb)
+    _configure_tesseract()
+
+
+def _ocr_dpi(page) -> int:
+    """
+    Adaptive render resolution: match the effective DPI of the largest embedded
+    scan (rendering above it only adds pixels), clamped to [OCR_MIN_DPI, OCR_MAX_DPI].
+    Pages without raster images use OCR_DEFAULT_DPI.
+    """
+    best = 0.0
+    try:
+        for info in page.get_image_info():
+            x0, y0, x1, y1 = info["bbox"]
+            width_in = (x1 - x0) / 72.0
+            if width_in > 0.5:
+                best = max(best, info["width"] / width_in)
+    except Exception:
         pass
+    if best <= 0:
+        return OCR_DEFAULT_DPI
+    return int(min(OCR_MAX_DPI, max(OCR_MIN_DPI, best)))
+
+
+def _ocr_page(pdf_path: str, page_index: int, timeout: float) -> Tuple[int, str, int]:
+    """OCR one 0-based page. Returns (page_number, cleaned text, dpi used)."""
+    import fitz
+    from PIL import Image
+    import pytesseract
+
+    doc = fitz.open(pdf_path)
+    try:
+        page = doc[page_index]
+        dpi = _ocr_dpi(page)
+        pix = page.get_pixmap(alpha=False, dpi=dpi)
+        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    finally:
+        doc.close()
+    raw = pytesseract.image_to_string(img, config="--psm 6", timeout=timeout)
+    return page_index + 1, clean_text(raw), dpi
+
+
+def _ocr_page_range(pdf_path: str, pages: List[int], timeout: float) -> List[Tuple[int, str, int]]:
+    """OCR a list of 0-based pages: a _run_page_tasks task."""
+    return [_ocr_page(pdf_path, i, timeout) for i in pages]
+
+
+# ── Streaming DOCX reader ────────────────────────────────────────────────────
+def _local(tag: str) -> str:
+    # Works for both transitional and strict OOXML namespaces
+    return tag.rsplit("}", 1)[-1]
+
+
+def _docx_paragraph(p) -> Tuple[str, bool, bool]:
+    """(text, break_before, break_after) for a <w:p> element, text boxes included."""
+    parts: List[str] = []
+    break_before = break_after = False
+    for node in p.iter():
+        tag = _local(node.tag)
+        if tag == "t":
+            parts.append(node.text or "")
+        elif tag == "tab":
+            parts.append("\t")
+        elif tag in ("br", "cr"):
+            if any(_local(k) == "type" and v == "page" for k, v in node.attrib.items()):
+                break_after = True
+            else:
+                parts.append("\n")
+        elif tag == "lastRenderedPageBreak":
+            # Page boundary as Word last laid the document out
+            if "".join(parts).strip():
+                break_after = True
+            else:
+                break_before = True
+        elif tag == "sectPr":
+            break_after = True
+    return "".join(parts), break_before, break_after
+
+
+def _iter_docx_blocks(docx_path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Yield ("text", line) for paragraphs / table rows in document order and
+    ("page" | "section", "") at breaks, reading word/document.xml incrementally.
+    """
+    import zipfile
+    import xml.etree.ElementTree as ET
+
+    with zipfile.ZipFile(docx_path) as zf, zf.open("word/document.xml") as xml:
+        body = None
+        p_depth = tbl_depth = 0
+        cell: List[str] = []
+        row: List[str] = []
+        for event, elem in ET.iterparse(xml, events=("start", "end")):
+            tag = _local(elem.tag)
+            if event == "start":
+                if tag == "body":
+                    body = elem
+                elif tag == "p":
+                    p_depth += 1
+                elif tag == "tbl":
+                    tbl_depth += 1
+                continue
+
+            if tag == "p":
+                p_depth -= 1
+                if p_depth:
+                    continue  # paragraph inside a text box; read with its parent
+                text, before, after = _docx_paragraph(elem)
+                if tbl_depth:
+                    if text.strip():
+                        cell.append(text.strip())
+                    continue
+                if before:
+                    yield "page", ""
+                if text.strip():
+                    yield "text", text
+                if after:
+                    sect = any(_local(n.tag) == "sectPr" for n in elem.iter())
+                    yield ("section" if sect else "page"), ""
+            elif tag == "tc" and tbl_depth == 1:
+                if cell:
+                    row.append(" ".join(cell))
+                cell = []
+            elif tag == "tr" and tbl_depth == 1:
+                if row:
+                    yield "text", " | ".join(row)
+                row = []
+            elif tag == "tbl":
+                tbl_depth -= 1
+            else:
+                continue
+
+            # Drop finished top-level blocks so the tree never holds the document
+            if body is not None and not p_depth and not tbl_depth and tag in ("p", "tbl"):
+                elem.clear()
+                try:
+                    body.remove(elem)
+                except ValueError:
+                    pass
+
+
+class TextExtractor:
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        page_timeout: Optional[float] = None,
+        max_worker_memory_mb: Optional[int] = None,
+        ocr_workers: Optional[int] = None,
+    ):
+        self.workers = PDF_EXTRACT_WORKERS if workers is None else workers
+        self.page_timeout = PDF_PAGE_TIMEOUT if page_timeout is None else page_timeout
+        self.max_worker_memory_mb = (
+            PDF_WORKER_MAX_MB if max_worker_memory_mb is None else max_worker_memory_mb
+        )
+        self.ocr_workers = OCR_WORKERS if ocr_workers is None else ocr_workers
+        # Timing / throughput / per-path page counts of the last PDF extraction
+        self.last_stats: dict = {}
 
     # ── Primary PDF extractor ─────────────────────────────────────────────────
     def extract_from_pdf_advanced(self, pdf_path: str) -> List[dict]:
         """
-        Extract text from each page of a PDF.
-        Tries PyMuPDF (fitz) first; falls back to pdfplumber for better table support,
-        then finally OCR for image-only PDFs.
+        Extract text from each page of a PDF, in page order.
+        Every page is read with PyMuPDF (fitz) first. Pages whose text layer is
+        empty or garbage are retried with pdfplumber, and OCR'd in a process pool
+        only if that fails too — so mixed PDFs keep their scanned pages.
+        PDFs with >= PDF_PARALLEL_MIN_PAGES pages are split across a process pool
+        (`workers`); throughput and per-path counts are in `self.last_stats`.
+        """
+        docs = list(self.iter_pdf_pages(pdf_path))
+        docs.sort(key=lambda d: d["metadata"]["page"])
+        return docs
+
+    def iter_pdf_pages(self, pdf_path: str) -> Iterator[dict]:
+        """
+        Streaming variant of extract_from_pdf_advanced(). Text-layer pages are
+        yielded as PyMuPDF produces them; pages that need pdfplumber/OCR are
+        yielded after the text pass, so they may come out of page order.
         """
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF not found: {pdf_path}")
 
-        # 1. Try PyMuPDF (Fast, preserves some layout)
-        docs = self._extract_with_pymupdf(pdf_path)
+        source = os.path.basename(pdf_path)
+        started = time.perf_counter()
+        paths = {"text": 0, "pdfplumber": 0, "ocr": 0, "empty": 0}
+        self.last_stats = {"pages_failed": [], "paths": paths}
+        page_count = self._page_count(pdf_path)
 
-        # 2. Try pdfplumber if PyMuPDF yields too little text
-        if not docs or len("".join([d["page_content"] for d in docs])) < 100:
-            logger.info(f"PyMuPDF extracted minimal text from {os.path.basename(pdf_path)}; trying pdfplumber.")
-            plumber_docs = self._extract_with_pdfplumber(pdf_path)
-            if plumber_docs:
-                docs = plumber_docs
+        # 1. PyMuPDF (Fast, preserves some layout) — page-parallel for long PDFs
+        weak: Dict[int, str] = {}
+        plumber: Optional[Dict[int, str]] = None
+        if page_count == 0:
+            # PyMuPDF missing or cannot open the file: every page goes to pdfplumber
+            logger.warning(f"PyMuPDF cannot read {source}; extracting every page with pdfplumber.")
+            plumber = self._extract_with_pdfplumber(pdf_path)
+            weak = dict.fromkeys(plumber, "")
+        else:
+            for page, text, needs_fallback in self._iter_pymupdf(pdf_path, page_count):
+                if needs_fallback:
+                    weak[page] = text
+                elif text:
+                    paths["text"] += 1
+                    yield self._page_doc(text, "text", source, page)
+                else:
+                    paths["empty"] += 1
+        self._record_stats(pdf_path, page_count, started)
+        if not weak:
+            return
 
-        if docs:
-            return docs
+        # 2. pdfplumber for just those pages (better at tables / odd encodings)
+        still_bad: List[int] = []
+        if plumber is None:
+            logger.info(f"{len(weak)} pages of {source} have no usable text layer; trying pdfplumber.")
+            plumber = self._extract_with_pdfplumber(pdf_path, pages=sorted(weak))
+        for page in sorted(weak):
+            text = plumber.get(page, "")
+            if len(text) >= MIN_PAGE_TEXT_CHARS and not _is_garbage_text(text):
+                paths["pdfplumber"] += 1
+                yield self._page_doc(text, "text_pdfplumber", source, page)
+            else:
+                still_bad.append(page)
 
-        # 3. Last resort: OCR
-        logger.info(f"No text extracted by standard methods; attempting OCR on {os.path.basename(pdf_path)}.")
-        return self._ocr_fallback(pdf_path)
+        # 3. OCR the rest (scanned pages) in a bounded process pool
+        if still_bad:
+            logger.info(f"OCR'ing {len(still_bad)} pages of {source}.")
+        for page, text in self._ocr_pages(pdf_path, still_bad):
+            if text:
+                paths["ocr"] += 1
+                yield self._page_doc(text, "ocr", source, page)
+            elif weak[page] and not _is_garbage_text(weak[page]):
+                # OCR found nothing: keep the thin text layer rather than drop the page
+                paths["text"] += 1
+                yield self._page_doc(weak[page], "text", source, page)
+            else:
+                paths["empty"] += 1
+
+        logger.info(
+            f"{source}: {paths['text']} text-layer pages, {paths['pdfplumber']} pdfplumber, "
+            f"{paths['ocr']} OCR, {paths['empty']} empty "
+            f"({time.perf_counter() - started:.1f}s total)."
+        )
 
     def extract_from_docx(self, docx_path: str) -> List[dict]:
         """
         Extract text from DOCX files — paragraphs AND table cells.
-        Preserves table content that was previously silently ignored.
+        List form of iter_docx_pages().
         """
-        try:
-            import docx
-            doc = docx.Document(docx_path)
-            full_text: List[str] = []
-
-            # Extract paragraphs
-            for para in doc.paragraphs:
-                if para.text.strip():
-                    full_text.append(para.text)
-
-            # Bug 13 Fix: Also extract table cell content (was ignored before)
-            for table in doc.tables:
-                for row in table.rows:
-                    row_texts = [cell.text.strip() for cell in row.cells if cell.text.strip()]
-                    if row_texts:
-                        full_text.append(" | ".join(row_texts))
-
-            text = "\n".join(full_text)
-            text = clean_text(text)
+        return list(self.iter_docx_pages(docx_path))
+
+    def iter_docx_pages(self, docx_path: str) -> Iterator[dict]:
+        """
+        Stream a DOCX file as page/section-delimited pieces.
+
+        word/document.xml is parsed incrementally (iterparse straight from the
+        zip member) and each finished body element is dropped, so memory stays
+        flat for very large documents. Tables are emitted where they occur,
+        one " | "-joined line per row. A piece ends at an explicit page break,
+        a page break Word recorded when it last rendered the document, a
+        section break, or after DOCX_MAX_PIECE_CHARS characters (at a paragraph
+        boundary) for files that carry no break information.
+        """
+        source = os.path.basename(docx_path)
+        page = 1
+        lines: List[str] = []
+        size = 0
+
+        def _piece(kind: str) -> Optional[dict]:
+            text = clean_text("\n".join(lines))
             if not text:
+                return None
+            doc = self._page_doc(text, "docx", source, page)
+            doc["metadata"]["break"] = kind
+            return doc
+
+        try:
+            for kind, text in _iter_docx_blocks(docx_path):
+                if kind == "text":
+                    lines.append(text)
+                    size += len(text) + 1
+                    if size < DOCX_MAX_PIECE_CHARS:
+                        continue
+                    kind = "size"
+                piece = _piece(kind)
+                if piece:
+                    yield piece
+                lines, size = [], 0
+                page += 1
+            piece = _piece("end")
+            if piece:
+                yield piece
+            elif page == 1:
                 logger.warning(f"DOCX extraction yielded empty text: {docx_path}")
-                return []
-
-            return [{
-                "page_content": text,
-                "metadata": {
-                    "type": "docx",
-                    "source": os.path.basename(docx_path),
-                    "page": 1,
-                }
-            }]
         except Exception as e:
+            # Re-raise like the PDF path: a partial document must fail the ingestion
             logger.error(f"DOCX extraction error for {docx_path}: {e}")
-            return []
+            raise
 
     # ── PyMuPDF ──────────────────────────────────────────────────────────────
-    def _extract_with_pymupdf(self, pdf_path: str) -> List[dict]:
+    @staticmethod
+    def _page_doc(text: str, kind: str, source: str, page: int) -> dict:
+        return {
+            "page_content": text,
+            "metadata": {"type": kind, "source": source, "page": page},
+        }
+
+    def _iter_pymupdf(
+        self, pdf_path: str, page_count: int, first_page: int = 0
+    ) -> Iterable[Tuple[int, str, bool]]:
+        """
+        Yield (page_number, cleaned text, needs_fallback) for every page, in order;
+        page-parallel for long PDFs.
+        """
+        if self.workers > 1 and page_count - first_page >= PDF_PARALLEL_MIN_PAGES:
+            last = first_page - 1
+            try:
+                for item in self._iter_pymupdf_parallel(pdf_path, page_count, first_page):
+                    last = item[0] - 1
+                    yield item
+                return
+            except Exception as e:
+                logger.warning(f"Parallel extraction failed ({e}); continuing with serial PyMuPDF.")
+                first_page = last + 1
+
         try:
             import fitz  # PyMuPDF
         except ImportError:
             logger.warning("PyMuPDF (fitz) not installed — skipping.")
-            return []
+            return
         try:
             doc = fitz.open(pdf_path)
-            docs = []
-            for i, page in enumerate(doc):
+        except Exception as e:
+            logger.warning(f"PyMuPDF extraction failed for {pdf_path}: {e}")
+            return
+        try:
+            for i in range(first_page, doc.page_count):
+                page = doc[i]
                 raw = page.get_text("text")  # "text" mode preserves layout better
                 text = clean_text(raw)
-                if text:
-                    docs.append({
-                        "page_content": text,
-                        "metadata": {
-                            "type": "text",
-                            "source": os.path.basename(pdf_path),
-                            "page": i + 1,
-                        },
-                    })
-            doc.close()
-            return docs
+                yield i + 1, text, _needs_fallback(page, text)
         except Exception as e:
             logger.warning(f"PyMuPDF extraction failed for {pdf_path}: {e}")
-            return []
+        finally:
+            doc.close()
+
+    def _iter_pymupdf_parallel(
+        self, pdf_path: str, page_count: int, first_page: int = 0
+    ) -> Iterable[Tuple[int, str, bool]]:
+        """
+        Split the page range across a process pool. Each task gets a contiguous
+        batch of pages and a timeout proportional to its size; a batch that times
+        out or crashes is retried page-by-page in a separate pool so only the
+        pathological pages are lost. Pages are yielded in order as soon as their
+        batch completes.
+        """
+        batches = [
+            list(range(i, min(i + PDF_PAGES_PER_TASK, page_count)))
+            for i in range(first_page, page_count, PDF_PAGES_PER_TASK)
+        ]
+        source = os.path.basename(pdf_path)
+
+        for batch, texts in self._run_page_tasks(pdf_path, batches, self.workers):
+            if texts is None:
+                logger.warning(
+                    f"Pages {batch[0] + 1}-{batch[-1] + 1} of {source} "
+                    f"failed in worker; retrying individually."
+                )
+                texts = []
+                retries = [[i] for i in batch]
+                for (i,), page_texts in self._run_page_tasks(pdf_path, retries, self.workers):
+                    if page_texts is None:
+                        logger.warning(f"Skipping page {i + 1} of {source}.")
+                        self.last_stats.setdefault("pages_failed", []).append(i + 1)
+                    else:
+                        texts.extend(page_texts)
+            yield from texts
+
+    def _run_page_tasks(
+        self,
+        pdf_path: str,
+        tasks: List[List[int]],
+        processes: int,
+        task=None,
+        timeout: Optional[float] = None,
+        initializer=None,
+    ) -> Iterator[Tuple[List[int], Optional[list]]]:
+        """
+        Run `task(pdf_path, pages)` (default _pymupdf_page_range) for each list
+        of 0-based pages in its own pool and yield (pages, result or None on
+        failure), in order. Workers start with `initializer(max_worker_memory_mb)`
+        (default _limit_worker_memory).
+
+        At most `processes` tasks are in flight, so every task starts on a free
+        worker when it is submitted and its timeout (`timeout` per page, default
+        page_timeout) runs from then, not from when we start waiting on it. A
+        task that misses its deadline leaves a stuck worker behind: the pool is
+        terminated and replaced, and the other in-flight tasks are resubmitted.
+        """
+        import multiprocessing as mp
+        from collections import deque
+
+        task = task or _pymupdf_page_range
+        timeout = self.page_timeout if timeout is None else timeout
+        initializer = initializer or _limit_worker_memory
+        processes = max(1, min(processes, len(tasks)))
+        queue = deque(tasks)
+        in_flight: deque = deque()
+        source = os.path.basename(pdf_path)
+        pool = self._make_pool(processes, initializer)
+        try:
+            while queue or in_flight:
+                while queue and len(in_flight) < processes:
+                    pages = queue.popleft()
+                    deadline = time.monotonic() + timeout * len(pages)
+                    in_flight.append((pages, pool.apply_async(task, (pdf_path, pages)), deadline))
+                pages, res, deadline = in_flight.popleft()
+                result = None
+                try:
+                    result = res.get(timeout=max(0.0, deadline - time.monotonic()))
+                except mp.TimeoutError:
+                    logger.warning(
+                        f"Pages {pages[0] + 1}-{pages[-1] + 1} of {source} timed out; "
+                        f"replacing the worker pool."
+                    )
+                    queue.extendleft(reversed([p for p, _, _ in in_flight]))
+                    in_flight.clear()
+                    pool.terminate()
+                    pool.join()
+                    pool = self._make_pool(processes, initializer)
+                except Exception as e:
+                    logger.warning(
+                        f"Pages {pages[0] + 1}-{pages[-1] + 1} of {source} failed: {type(e).__name__}: {e}"
+                    )
+                yield pages, result
+        finally:
+            # terminate() also kills workers stuck on a timed-out page
+            pool.terminate()
+            pool.join()
+
+    def _make_pool(self, processes: int, initializer):
+        import multiprocessing as mp
+        # spawn (not fork): the parent may hold torch / Qdrant threads
+        ctx = mp.get_context("spawn")
+        return ctx.Pool(
+            processes=max(1, processes),
+            initializer=initializer,
+            initargs=(self.max_worker_memory_mb,),
+        )
+
+    def _page_count(self, pdf_path: str) -> int:
+        try:
+            import fitz
+            doc = fitz.open(pdf_path)
+            try:
+                return doc.page_count
+            finally:
+                doc.close()
+        except Exception:
+            return 0
+
+    def _record_stats(self, pdf_path: str, page_count: int, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        parallel = self.workers > 1 and page_count >= PDF_PARALLEL_MIN_PAGES
+        self.last_stats.update({
+            "source": os.path.basename(pdf_path),
+            "pages": page_count,
+            "seconds": round(elapsed, 3),
+            "pages_per_sec": round(page_count / elapsed, 1) if elapsed > 0 else 0.0,
+            "workers": self.workers if parallel else 1,
+        })
+        logger.info(
+            f"PyMuPDF extracted {page_count} pages from {self.last_stats['source']} in "
+            f"{elapsed:.2f}s ({self.last_stats['pages_per_sec']} pages/s, "
+            f"workers={self.last_stats['workers']})."
+        )
 
     # ── pdfplumber fallback ───────────────────────────────────────────────────
-    def _extract_with_pdfplumber(self, pdf_path: str) -> List[dict]:
-        """Better at tables and multi-column layouts."""
+    def _extract_with_pdfplumber(self, pdf_path: str, pages: Optional[List[int]] = None) -> Dict[int, str]:
+        """Better at tables and multi-column layouts. Returns {page_number: text} for `pages` (1-based)."""
         try:
             import pdfplumber
         except ImportError:
             logger.warning("pdfplumber not installed — skipping.")
-            return []
+            return {}
+        texts: Dict[int, str] = {}
         try:
-            docs = []
             with pdfplumber.open(pdf_path) as pdf:
-                for i, page in enumerate(pdf.pages):
+                wanted = pages if pages is not None else range(1, len(pdf.pages) + 1)
+                for page_no in wanted:
+                    page = pdf.pages[page_no - 1]
                     raw = page.extract_text() or ""
-                    text = clean_text(raw)
-                    if text:
-                        docs.append({
-                            "page_content": text,
-                            "metadata": {
-                                "type": "text_pdfplumber",
-                                "source": os.path.basename(pdf_path),
-                                "page": i + 1,
-                            },
-                        })
-            return docs
+                    texts[page_no] = clean_text(raw)
+                    page.flush_cache()
         except Exception as e:
             logger.warning(f"pdfplumber extraction failed for {pdf_path}: {e}")
-            return []
+        return texts
 
     # ── OCR fallback ──────────────────────────────────────────────────────────
-    def _ocr_fallback(self, pdf_path: str) -> List[dict]:
-        """Attempt OCR on each page if no text was extracted (scanned PDFs)."""
+    def _ocr_pages(self, pdf_path: str, pages: List[int]) -> Iterator[Tuple[int, str]]:
+        """
+        OCR the given 1-based pages (scanned PDFs / scanned appendices).
+        Runs through _run_page_tasks (per-page deadline from when the page starts,
+        stuck Tesseract workers replaced) with adaptive DPI; a single page is
+        OCR'd in-process. Yields (page_number, text) in page order.
+        """
+        if not pages:
+            return
         try:
-            import fitz
-            from PIL import Image
-            import pytesseract
+            import fitz  # noqa: F401
+            from PIL import Image  # noqa: F401
+            import pytesseract  # noqa: F401
         except ImportError:
             logger.warning("OCR dependencies (fitz/PIL/pytesseract) not available — skipping OCR.")
-            return []
-
-        # Set tesseract binary on Windows if not on PATH
-        try:
-            import shutil as _sh
-            if _sh.which("tesseract") is None:
-                candidate = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-                if os.path.exists(candidate):
-                    pytesseract.pytesseract.tesseract_cmd = candidate
-        except Exception:
-            pass
+            for page in pages:
+                yield page, ""
+            return
 
-        docs: List[dict] = []
-        try:
-            doc = fitz.open(pdf_path)
-            for i, page in enumerate(doc):
-                pix = page.get_pixmap(alpha=False, dpi=200)  # higher DPI = better OCR
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                raw = pytesseract.image_to_string(img, config="--psm 6")
-                text = clean_text(raw)
-                if text:
-                    docs.append({
-                        "page_content": text,
-                        "metadata": {
-                            "type": "ocr",
-                            "source": os.path.basename(pdf_path),
-                            "page": i + 1,
-                        },
-                    })
-            doc.close()
-        except Exception as e:
-            logger.error(f"OCR fallback failed for {pdf_path}: {e}")
-            return []
-        return docs
+        source = os.path.basename(pdf_path)
+        dpis: List[int] = []
+        if self.ocr_workers <= 1 or len(pages) == 1:
+            _configure_tesseract()
+            for page in pages:
+                try:
+                    _, text, dpi = _ocr_page(pdf_path, page - 1, OCR_PAGE_TIMEOUT)
+                    dpis.append(dpi)
+                except Exception as e:
+                    logger.warning(f"OCR failed for page {page} of {source}: {e}")
+                    self.last_stats["pages_failed"].append(page)
+                    text = ""
+                yield page, text
+        else:
+            results = self._run_page_tasks(
+                pdf_path, [[page - 1] for page in pages], self.ocr_workers,
+                task=partial(_ocr_page_range, timeout=OCR_PAGE_TIMEOUT),
+                # small grace over tesseract's own timeout for rendering
+                timeout=OCR_PAGE_TIMEOUT + 10,
+                initializer=_init_ocr_worker,
+            )
+            for (index,), result in results:
+                text = ""
+                if result is None:
+                    self.last_stats["pages_failed"].append(index + 1)
+                else:
+                    [(_, text, dpi)] = result
+                    dpis.append(dpi)
+                yield index + 1, text
+        if dpis:
+            self.last_stats["ocr_dpi"] = {"min": min(dpis), "max": max(dpis)}
 
     # ── Simple single-string extractor (for non-PDF, legacy) ─────────────────
     def extract_from_pdf_simple(self, pdf_path: str) -> str:
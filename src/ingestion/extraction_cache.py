@@ -0,0 +1,221 @@
+"""
+src/ingestion/extraction_cache.py
+On-disk cache of extracted pages, keyed by file content hash + extractor version
+(EXTRACTOR_VERSION plus the settings that shape the pages, see
+extract_text.extraction_cache_version()).
+
+Extraction (and OCR in particular) is by far the slowest ingestion stage, but
+its output only depends on the file bytes and the extraction code. Caching the
+cleaned pages lets re-chunking / re-indexing runs (new CHUNK_SIZE, new
+embedding model, ...) skip it entirely.
+
+Entries are zlib-compressed JSON lines, one page per line and one file per
+(file hash, version), written atomically so concurrent workers never see a
+partial entry. writer() streams pages into a new entry as they are extracted
+and get() decodes them one at a time as they are consumed, so the cache never
+holds a whole document in memory; an entry that would exceed the cap on its
+own is abandoned as soon as it grows past it. A hit refreshes the
+entry's mtime; when the cache grows past EXTRACTION_CACHE_MAX_MB the least
+recently used entries are removed until it is back under 90% of the cap.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import zlib
+from typing import Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE", "1") == "1"
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", "./data/extraction_cache")
+EXTRACTION_CACHE_MAX_MB = int(os.getenv("EXTRACTION_CACHE_MAX_MB", "2048"))
+
+_SUFFIX = ".json.z"
+_READ_BLOCK = 64 * 1024
+
+
+class ExtractionCache:
+    """Compressed page cache with an LRU size cap. Safe to share between processes."""
+
+    def __init__(self, cache_dir: str = EXTRACTION_CACHE_DIR, max_mb: int = EXTRACTION_CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._size: Optional[int] = None  # bytes on disk, computed lazily
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, file_hash: str, version: str) -> str:
+        return os.path.join(self.cache_dir, file_hash[:2], f"{file_hash}.{version}{_SUFFIX}")
+
+    def get(self, file_hash: str, version: str) -> Optional[Iterator[dict]]:
+        """
+        Cached page dicts for this file content + extractor version, decoded
+        one at a time as the iterator is consumed, or None. An entry found
+        unreadable is removed and the error raised from the iterator.
+        """
+        path = self._path(file_hash, version)
+        try:
+            os.utime(path)  # LRU: mark as recently used
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._iter_pages(path)
+
+    def _iter_pages(self, path: str) -> Iterator[dict]:
+        z = zlib.decompressobj()
+        pending = b""
+        try:
+            with open(path, "rb") as f:
+                while not z.eof:
+                    block = f.read(_READ_BLOCK)
+                    if not block:
+                        raise ValueError("entry is truncated")
+                    lines = (pending + z.decompress(block)).split(b"\n")
+                    pending = lines.pop()
+                    for line in lines:
+                        yield json.loads(line)
+            if pending:
+                raise ValueError("entry ends mid-page")
+        except Exception as e:
+            logger.warning(f"[ExtractionCache] Dropping unreadable entry {path}: {e}")
+            self._remove(path)
+            raise
+
+    def put(self, file_hash: str, version: str, pages: List[dict]) -> None:
+        """Store pages atomically, then evict old entries if over the size cap."""
+        writer = self.writer(file_hash, version)
+        try:
+            for page in pages:
+                writer.add(page)
+            writer.commit()
+        finally:
+            writer.abort()
+
+    def writer(self, file_hash: str, version: str) -> "CacheEntryWriter":
+        """Incremental writer for one entry: add() pages, then commit() (or abort())."""
+        return CacheEntryWriter(self, self._path(file_hash, version))
+
+    def _added(self, nbytes: int) -> None:
+        with self._lock:
+            if self._size is not None:
+                self._size += nbytes
+        if self.size_bytes() > self.max_bytes:
+            self.evict()
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            return self._size
+
+    def evict(self, target_ratio: float = 0.9) -> int:
+        """Remove least recently used entries until under target_ratio * cap."""
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * target_ratio
+        removed = 0
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            if self._remove(path):
+                total -= size
+                removed += 1
+        with self._lock:
+            self._size = total
+        if removed:
+            logger.info(f"[ExtractionCache] Evicted {removed} entries ({total / 1e6:.1f} MB left).")
+        return removed
+
+    def _entries(self):
+        """(path, size, mtime) for every cache entry on disk."""
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(_SUFFIX):
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue  # removed by another process
+                    yield entry.path, st.st_size, st.st_mtime
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+class CacheEntryWriter:
+    """
+    Streams pages into a temp file through one zlib stream, one JSON line per
+    page, and renames it into place on commit(). Gives up (writes nothing)
+    once the compressed entry is larger than the whole cache cap.
+    """
+
+    def __init__(self, cache: ExtractionCache, path: str):
+        self.cache = cache
+        self.path = path
+        self.pages = 0
+        self.done = False
+        self._bytes = 0
+        self._z = zlib.compressobj(6)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, self._tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        self._f = os.fdopen(fd, "wb")
+
+    def add(self, page: dict) -> None:
+        if self.done:
+            return
+        self._write(json.dumps(page, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.pages += 1
+
+    def commit(self) -> bool:
+        """Publish the entry; False if it was abandoned."""
+        if self.done:
+            return False
+        tail = self._z.flush()
+        if self._bytes + len(tail) > self.cache.max_bytes:
+            self.abort()
+            return False
+        self._f.write(tail)
+        self._f.close()
+        os.replace(self._tmp, self.path)
+        self.done = True
+        self.cache._added(self._bytes + len(tail))
+        return True
+
+    def abort(self) -> None:
+        if not self.done:
+            self.done = True
+            self._f.close()
+            ExtractionCache._remove(self._tmp)
+
+    def _write(self, raw: bytes) -> None:
+        data = self._z.compress(raw)
+        self._bytes += len(data)
+        if self._bytes > self.cache.max_bytes:
+            logger.info(f"[ExtractionCache] Entry {os.path.basename(self.path)} exceeds the cache cap; not caching.")
+            self.abort()
+            return
+        self._f.write(data)
+
+
+_cache: Optional[ExtractionCache] = None
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """Process-wide cache, or None when EXTRACTION_CACHE=0."""
+    global _cache
+    if not EXTRACTION_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = ExtractionCache()
+    return _cache
@@ -0,0 +1,143 @@
+"""
+src/ingestion/header_footer.py
+Document-level removal of running headers and footers.
+
+clean_text() works on one page at a time, so it cannot tell a running header
+("ACME Corp — Employee Handbook", "Confidential – Internal | Page 7") from
+ordinary text. This pass looks across pages: a line that sits in the top or
+bottom HEADER_FOOTER_EDGE_LINES lines of at least HEADER_FOOTER_MIN_SHARE of
+the pages is treated as a header/footer and removed from every page before
+chunking. Lines are compared with digits masked, so page-numbered footers
+match across pages.
+
+The repeated lines are learned from the first HEADER_FOOTER_WINDOW pages, so
+streaming ingestion only has to buffer that many pages.
+"""
+import logging
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+HEADER_FOOTER_FILTER = os.getenv("HEADER_FOOTER_FILTER", "1") == "1"
+HEADER_FOOTER_WINDOW = int(os.getenv("HEADER_FOOTER_WINDOW", "20"))
+HEADER_FOOTER_MIN_SHARE = float(os.getenv("HEADER_FOOTER_MIN_SHARE", "0.5"))
+HEADER_FOOTER_EDGE_LINES = int(os.getenv("HEADER_FOOTER_EDGE_LINES", "3"))
+# Below this many pages a "repeated" line is not meaningful evidence
+HEADER_FOOTER_MIN_PAGES = 3
+
+_DIGITS = re.compile(r"\d+")
+_SPACES = re.compile(r"\s+")
+
+Key = Tuple[str, str]  # ("top" | "bottom", normalised line)
+
+
+def _normalise(line: str) -> str:
+    return _SPACES.sub(" ", _DIGITS.sub("#", line)).strip().lower()
+
+
+def _edge_keys(text: str, edge: int) -> List[Tuple[int, Key]]:
+    """(line index, key) for the non-empty lines in the top/bottom `edge` lines."""
+    lines = text.split("\n")
+    filled = [i for i, ln in enumerate(lines) if ln.strip()]
+    keyed = [(i, ("top", _normalise(lines[i]))) for i in filled[:edge]]
+    keyed += [(i, ("bottom", _normalise(lines[i]))) for i in filled[-edge:]]
+    return keyed
+
+
+class RepeatedLineFilter:
+    """
+    Streaming header/footer remover; see the module docstring.
+
+        filt = RepeatedLineFilter()
+        for page in filt.apply(pages):
+            ...
+        filt.stats  # filled in once the pages are exhausted:
+                    # {"lines_removed", "chars_removed", "tokens_removed", "patterns"}
+    """
+
+    def __init__(
+        self,
+        window: int = HEADER_FOOTER_WINDOW,
+        min_share: float = HEADER_FOOTER_MIN_SHARE,
+        edge_lines: int = HEADER_FOOTER_EDGE_LINES,
+    ):
+        self.window = max(HEADER_FOOTER_MIN_PAGES, window)
+        self.min_share = min_share
+        self.edge_lines = edge_lines
+        self.repeated: Set[Key] = set()
+        self.stats: Dict[str, int] = {
+            "lines_removed": 0, "chars_removed": 0, "tokens_removed": 0, "patterns": 0,
+        }
+        self._removed: List[str] = []
+
+    def apply(self, pages: Iterable[dict]) -> Iterator[dict]:
+        """Yield `pages` with repeated header/footer lines removed."""
+        buffered: List[dict] = []
+        it = iter(pages)
+        for page in it:
+            buffered.append(page)
+            if len(buffered) >= self.window:
+                break
+        self.repeated = self._detect(buffered)
+        if self.repeated:
+            logger.info(
+                f"[HeaderFooter] {len(self.repeated)} repeated header/footer lines: "
+                f"{sorted(k[1] for k in self.repeated)[:5]}"
+            )
+        for page in buffered:
+            yield self._strip(page)
+        for page in it:
+            yield self._strip(page)
+        if self._removed:
+            from src.ingestion.chunking import count_tokens
+            self.stats = {
+                "lines_removed": len(self._removed),
+                "chars_removed": sum(len(ln) + 1 for ln in self._removed),
+                "tokens_removed": count_tokens(self._removed),
+                "patterns": len(self.repeated),
+            }
+            logger.info(
+                f"[HeaderFooter] Removed {self.stats['lines_removed']} lines, "
+                f"{self.stats['chars_removed']} chars ({self.stats['tokens_removed']} tokens)."
+            )
+
+    def _detect(self, pages: List[dict]) -> Set[Key]:
+        if len(pages) < HEADER_FOOTER_MIN_PAGES:
+            return set()
+        counts: Dict[Key, int] = {}
+        for page in pages:
+            for key in {k for _, k in _edge_keys(page.get("page_content", ""), self.edge_lines)}:
+                counts[key] = counts.get(key, 0) + 1
+        needed = max(HEADER_FOOTER_MIN_PAGES, self.min_share * len(pages))
+        return {k for k, n in counts.items() if n >= needed and k[1]}
+
+    def _strip(self, page: dict) -> dict:
+        if not self.repeated:
+            return page
+        text = page.get("page_content", "")
+        drop = {i for i, key in _edge_keys(text, self.edge_lines) if key in self.repeated}
+        if not drop:
+            return page
+        lines = text.split("\n")
+        self._removed.extend(lines[i] for i in sorted(drop))
+        kept = "\n".join(ln for i, ln in enumerate(lines) if i not in drop).strip()
+        return {**page, "page_content": kept}
+
+
+def strip_headers_footers(
+    pages: Iterable[dict], stats: Optional[Dict[str, int]] = None
+) -> Iterator[dict]:
+    """
+    Convenience wrapper: RepeatedLineFilter().apply(pages) when
+    HEADER_FOOTER_FILTER is on (pages unchanged otherwise). If `stats` is given
+    it is updated with the filter's stats once the pages are exhausted.
+    """
+    if not HEADER_FOOTER_FILTER:
+        yield from pages
+        return
+    filt = RepeatedLineFilter()
+    yield from filt.apply(pages)
+    if stats is not None:
+        stats.update(filt.stats)
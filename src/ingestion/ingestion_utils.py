@@ -0,0 +1,34 @@
+"""
+src/ingestion/ingestion_utils.py
+Content hashing helpers for incremental (re-)ingestion.
+
+Files and chunks are addressed by SHA-256 of their content, and vector-store
+point IDs are derived deterministically from (source, chunk hash), so
+re-ingesting an unchanged chunk always maps to the same point.
+"""
+import hashlib
+import uuid
+
+# Fixed namespace so point IDs are stable across processes and machines
+_POINT_NAMESPACE = uuid.UUID("8f2d6c4e-5b1a-4f3e-9c7d-2a6b0e1f4d93")
+
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 hex digest of a file, read in 1 MB blocks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 hex digest of a chunk's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def point_id(source: str, chunk_hash: str) -> str:
+    """Deterministic UUID for a chunk of `source` with the given content hash."""
+    return str(uuid.uuid5(_POINT_NAMESPACE, f"{source}::{chunk_hash}"))
@@ -0,0 +1,304 @@
+"""
+src/ingestion/near_dedup.py
+Near-duplicate chunk suppression across the corpus.
+
+Disclaimers, signature blocks and standard terms recur (with small edits)
+in hundreds of documents. Every chunk that is about to be embedded gets a
+MinHash signature over its word 3-gram shingles; if a chunk of *another*
+source with an estimated Jaccard similarity of at least NEAR_DUP_THRESHOLD is
+already indexed, the new chunk is not embedded. Instead its source is recorded
+as a reference to the stored ("canonical") chunk, whose `also_in` payload
+lists every referencing source.
+
+Signatures and references live in a small SQLite file per vector store and
+collection (NEAR_DUP_INDEX_DIR/<store type>-<collection>.sqlite3), emptied
+whenever that collection is cleared or recreated. A match whose stored chunk
+has gone anyway is dropped and the new chunk embedded. Chunks of the current
+run are matched through an in-memory SignatureView until their source is
+finished, so a near-repeat within one file is embedded once and a
+near-duplicate within one bulk batch becomes a reference. Candidates are found
+with LSH banding: the 128 MinHash values are cut into 16 bands of 8, and only
+chunks that agree exactly on a whole band are compared. Pairs at the default
+threshold (Jaccard 0.8) collide on some band with probability ~0.95, at 0.9
+with ~0.9999, unrelated chunks practically never, so a lookup is 16 indexed
+equality probes regardless of corpus size.
+"""
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+NEAR_DUP_DEDUP = os.getenv("NEAR_DUP_DEDUP", "1") == "1"
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
+NEAR_DUP_INDEX_DIR = os.getenv("NEAR_DUP_INDEX_DIR", "./data/fingerprints")
+# Chunks with fewer shingles than this are too short for a stable signature
+NEAR_DUP_MIN_SHINGLES = 8
+
+_NUM_PERM = 128
+_BANDS = 16
+_ROWS = _NUM_PERM // _BANDS
+_rng = np.random.default_rng(0x5EED)  # fixed: signatures must be stable across runs
+_PERM_A = _rng.integers(0, 1 << 63, size=_NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_PERM_B = _rng.integers(0, 1 << 63, size=_NUM_PERM, dtype=np.uint64)
+_WORD = re.compile(r"\w+")
+
+
+def minhash(text: str, shingle: int = 3) -> Optional[np.ndarray]:
+    """128-value MinHash signature (uint32) of `text`'s lower-cased word shingles."""
+    words = _WORD.findall(text.lower())
+    grams = {" ".join(words[i:i + shingle]) for i in range(len(words) - shingle + 1)}
+    if len(grams) < NEAR_DUP_MIN_SHINGLES:
+        return None
+    x = np.array(
+        [int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little")
+         for g in grams],
+        dtype=np.uint64,
+    )
+    # Multiply-shift hashing, (a * x + b) mod 2^64 >> 32, one (odd a, b) per permutation
+    with np.errstate(over="ignore"):
+        hashed = (np.outer(x, _PERM_A) + _PERM_B) >> np.uint64(32)
+    return hashed.min(axis=0).astype(np.uint32)
+
+
+def jaccard(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return float(np.mean(sig_a == sig_b))
+
+
+def _band_hashes(sig: np.ndarray) -> List[int]:
+    return [
+        int.from_bytes(
+            hashlib.blake2b(sig[i * _ROWS:(i + 1) * _ROWS].tobytes(), digest_size=8).digest(),
+            "little", signed=True,
+        )
+        for i in range(_BANDS)
+    ]
+
+
+class FingerprintIndex:
+    """
+    Persistent MinHash index of stored chunks plus near-duplicate references.
+
+    signatures: point_id → (owner source, signature blob)
+    bands:      (band, band hash) → point_id, for LSH candidate lookup
+    refs:       (point_id, source, content_hash, file_hash) for chunks of
+                `source` suppressed in favour of point_id
+    """
+
+    def __init__(self, path: str, threshold: float = NEAR_DUP_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS signatures ("
+                " point_id TEXT PRIMARY KEY, source TEXT NOT NULL, sig BLOB NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS bands ("
+                " band INTEGER NOT NULL, hash INTEGER NOT NULL, point_id TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, hash)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS bands_point ON bands (point_id)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS refs ("
+                " point_id TEXT NOT NULL, source TEXT NOT NULL, content_hash TEXT, file_hash TEXT,"
+                " PRIMARY KEY (point_id, source, content_hash))"
+            )
+            # Indexes written before the column was renamed / file_hash was added
+            columns = {r[1] for r in self._conn.execute("PRAGMA table_info(refs)")}
+            if "chunk_id" in columns:
+                self._conn.execute("ALTER TABLE refs RENAME COLUMN chunk_id TO content_hash")
+            if "file_hash" not in columns:
+                self._conn.execute("ALTER TABLE refs ADD COLUMN file_hash TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS refs_source ON refs (source)")
+
+    def find(
+        self, sig: np.ndarray, exclude_source: str, include: Optional[set] = None
+    ) -> Optional[Tuple[str, str]]:
+        """
+        (point_id, owner source) of the most similar stored chunk from another
+        source, or from `exclude_source` itself if its point ID is in `include`.
+        """
+        bands = _band_hashes(sig)
+        where = " OR ".join("(b.band = ? AND b.hash = ?)" for _ in bands)
+        params = [v for i, h in enumerate(bands) for v in (i, h)]
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT s.point_id, s.source, s.sig FROM bands b"
+                " JOIN signatures s ON s.point_id = b.point_id"
+                f" WHERE ({where})",
+                params,
+            ).fetchall()
+        best = None
+        for pid, owner, blob in rows:
+            if owner == exclude_source and (include is None or pid not in include):
+                continue
+            sim = jaccard(sig, np.frombuffer(blob, dtype=np.uint32))
+            if sim >= self.threshold and (best is None or sim > best[0]):
+                best = (sim, pid, owner)
+        return (best[1], best[2]) if best else None
+
+    def add(self, entries: Iterable[Tuple[str, str, np.ndarray]]) -> None:
+        """Register (point_id, source, signature) for newly stored chunks."""
+        entries = list(entries)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO signatures VALUES (?, ?, ?)",
+                [(pid, src, sig.tobytes()) for pid, src, sig in entries],
+            )
+            self._conn.executemany(
+                "DELETE FROM bands WHERE point_id = ?", [(pid,) for pid, _, _ in entries]
+            )
+            self._conn.executemany(
+                "INSERT INTO bands VALUES (?, ?, ?)",
+                [(i, h, pid) for pid, _, sig in entries for i, h in enumerate(_band_hashes(sig))],
+            )
+
+    def remove(self, point_ids: List[str]) -> None:
+        rows = [(p,) for p in point_ids]
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM signatures WHERE point_id = ?", rows)
+            self._conn.executemany("DELETE FROM bands WHERE point_id = ?", rows)
+            self._conn.executemany("DELETE FROM refs WHERE point_id = ?", rows)
+
+    def replace_refs(
+        self, source: str, refs: List[Tuple[str, str]], file_hash: Optional[str] = None
+    ) -> List[str]:
+        """
+        Make `refs` [(point_id, content_hash)] the complete set of references
+        held by `source` (whose content is `file_hash`). Returns every point ID
+        whose reference list changed.
+        """
+        with self._lock, self._conn:
+            old = {r[0] for r in self._conn.execute(
+                "SELECT point_id FROM refs WHERE source = ?", (source,)
+            )}
+            self._conn.execute("DELETE FROM refs WHERE source = ?", (source,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO refs VALUES (?, ?, ?, ?)",
+                [(pid, source, chash, file_hash) for pid, chash in refs],
+            )
+        return sorted(old | {pid for pid, _ in refs})
+
+    def ref_sources(self, point_id: str) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute(
+                "SELECT DISTINCT source FROM refs WHERE point_id = ? ORDER BY source", (point_id,)
+            )]
+
+    def transfer(self, point_id: str, new_owner: str) -> Optional[str]:
+        """
+        Hand a stored chunk to one of its referencing sources (its owner dropped
+        it). Returns the new owner's file hash recorded with its reference.
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT file_hash FROM refs WHERE point_id = ? AND source = ? LIMIT 1",
+                (point_id, new_owner),
+            ).fetchone()
+            self._conn.execute(
+                "UPDATE signatures SET source = ? WHERE point_id = ?", (new_owner, point_id)
+            )
+            self._conn.execute(
+                "DELETE FROM refs WHERE point_id = ? AND source = ?", (point_id, new_owner)
+            )
+        return row[0] if row else None
+
+    def clear(self) -> None:
+        """Forget every signature and reference (the collection was emptied)."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM signatures")
+            self._conn.execute("DELETE FROM bands")
+            self._conn.execute("DELETE FROM refs")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            fps = self._conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+            refs = self._conn.execute("SELECT COUNT(*) FROM refs").fetchone()[0]
+        return {"fingerprints": fps, "references": refs}
+
+
+class SignatureView:
+    """
+    In-memory LSH view of the chunks an ingestion run is about to upsert.
+
+    Their signatures reach the FingerprintIndex only once their source is
+    finished, so without this view near-duplicates within one file, or within
+    one bulk upsert batch, would all be embedded. Matches any source.
+    """
+
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD):
+        self.threshold = threshold
+        self._sigs: Dict[str, Tuple[str, np.ndarray]] = {}  # point_id -> (source, signature)
+        self._bands: Dict[Tuple[int, int], List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._sigs)
+
+    def add(self, point_id: str, source: str, sig: np.ndarray) -> None:
+        self._sigs[point_id] = (source, sig)
+        for key in enumerate(_band_hashes(sig)):
+            self._bands.setdefault(key, []).append(point_id)
+
+    def find(self, sig: np.ndarray) -> Optional[Tuple[str, str]]:
+        """(point_id, source) of the most similar chunk in the view."""
+        candidates = {pid for key in enumerate(_band_hashes(sig)) for pid in self._bands.get(key, ())}
+        best = None
+        for pid in candidates:
+            source, other = self._sigs[pid]
+            sim = jaccard(sig, other)
+            if sim >= self.threshold and (best is None or sim > best[0]):
+                best = (sim, pid, source)
+        return (best[1], best[2]) if best else None
+
+    def discard(self, point_ids: Iterable[str]) -> None:
+        """Drop chunks whose signatures are now in the FingerprintIndex."""
+        for pid in point_ids:
+            entry = self._sigs.pop(pid, None)
+            if entry is None:
+                continue
+            for key in enumerate(_band_hashes(entry[1])):
+                bucket = self._bands.get(key, [])
+                if pid in bucket:
+                    bucket.remove(pid)
+                if not bucket:
+                    self._bands.pop(key, None)
+
+
+_indexes: Dict[str, FingerprintIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def index_scope(store) -> str:
+    """Index name for a vector store: its type and collection (or table)."""
+    name = getattr(store, "collection_name", None) or getattr(store, "table_name", None) or "default"
+    return re.sub(r"[^\w.-]+", "_", f"{type(store).__name__}-{name}")
+
+
+def get_fingerprint_index(scope: str) -> Optional[FingerprintIndex]:
+    """Process-wide index for `scope` (see index_scope), or None when NEAR_DUP_DEDUP=0."""
+    if not NEAR_DUP_DEDUP:
+        return None
+    with _indexes_lock:
+        if scope not in _indexes:
+            _indexes[scope] = FingerprintIndex(os.path.join(NEAR_DUP_INDEX_DIR, f"{scope}.sqlite3"))
+        return _indexes[scope]
+
+
+def clear_fingerprint_index(store) -> None:
+    """Empty the index of `store`'s collection, after the collection itself was emptied."""
+    index = get_fingerprint_index(index_scope(store))
+    if index is not None:
+        index.clear()
+        logger.info(f"[NearDup] Cleared fingerprint index {index.path}.")
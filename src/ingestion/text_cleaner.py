@@ -4,12 +4,89 @@ Clean raw PDF/document text before chunking.
 """
 import re
 
+# ── Precompiled fast-path patterns (see clean_text) ──────────────────────────
+# Each pattern starts with a literal where possible so the regex engine can
+# skip ahead with a fast scan instead of attempting a match at every character.
+_PUNCT_REPLACEMENTS = (
+    ("\u2018", "'"), ("\u2019", "'"),      # smart single quotes
+    ("\u201c", '"'), ("\u201d", '"'),      # smart double quotes
+    ("\u2013", "-"), ("\u2014", "-"),      # en / em dash
+    ("\u00a0", " "),                       # non-breaking space
+)
+# "Page 3 of 12", bare page numbers and ---/___/=== separator lines, in one pass
+_NOISE_LINES = re.compile(
+    r"(?m)^\s*(?:Page\s+\d+\s+of\s+\d+|\d+)\s*$|^[-_=]{3,}\s*$"
+)
+_BLANK_RUNS = re.compile(r"\n\n\n+")
+_SPACE_RUNS = re.compile(r" [ \t]+|\t[ \t]+")
+
+
+def _is_word_char(ch: str) -> bool:
+    # Same definition as the re module's Unicode \w
+    return ch.isalnum() or ch == "_"
+
+
+def _join_hyphen_breaks(text: str) -> str:
+    r"""
+    Equivalent of re.sub(r"(\w)-\n(\w)", r"\1\2", text) that only inspects the
+    "-\n" occurrences instead of trying the pattern at every word character.
+    """
+    parts = []
+    last = 0
+    consumed = -1          # index of the last \w eaten by the previous match
+    end = len(text) - 2
+    i = text.find("-\n")
+    while i != -1:
+        if 0 < i < end and i - 1 > consumed \
+                and _is_word_char(text[i - 1]) and _is_word_char(text[i + 2]):
+            parts.append(text[last:i])
+            last = i + 2
+            consumed = i + 2
+        i = text.find("-\n", i + 1)
+    if not parts:
+        return text
+    parts.append(text[last:])
+    return "".join(parts)
+
 
 def clean_text(text) -> str:
     """
     Apply a series of cleaning steps to raw extracted text.
     Designed to handle common PDF extraction artifacts.
 
+    Steps:
+    1. Guard: return "" for None / non-string input
+    2. Fix hyphenated line-breaks (e.g., "conclu-\\nding" → "concluding")
+    3. Normalize Unicode dashes and quotes to ASCII equivalents
+    4. Remove excessive whitespace / blank lines
+    5. Strip common PDF header/footer noise (page numbers, "CONFIDENTIAL", etc.)
+    6. Normalise multiple spaces within a line to single space
+
+    Fast path with output identical to clean_text_reference(): hyphen breaks
+    are joined by scanning for "-\\n" only, the three header/footer regexes
+    are fused into one pass, and every pattern is precompiled.
+    """
+    if not text or not isinstance(text, str):
+        return ""
+    if "-\n" in text:
+        text = _join_hyphen_breaks(text)
+    if not text.isascii():
+        for src, dst in _PUNCT_REPLACEMENTS:
+            text = text.replace(src, dst)
+    text = _NOISE_LINES.sub("", text)
+    if "\n\n\n" in text:
+        text = _BLANK_RUNS.sub("\n\n", text)
+    text = _SPACE_RUNS.sub(" ", text)
+    return "\n".join([ln.rstrip() for ln in text.splitlines()]).strip()
+
+
+def clean_text_reference(text) -> str:
+    """
+    Step-by-step reference implementation of clean_text().
+    Kept as the readable specification: tests/test_ingestion.py checks that the
+    fast path produces identical output, and benchmarks/bench_text_cleaner.py
+    compares their throughput.
+
     Steps:
     1. Guard: return "" for None / non-string input
     2. Fix hyphenated line-breaks (e.g., "conclu-\\nding" → "concluding")
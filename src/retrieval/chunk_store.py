@@ -0,0 +1,98 @@
+"""
+src/retrieval/chunk_store.py
+Local store for chunk text, keyed by vector-store point ID.
+
+Keeping the chunk text (and the metadata nobody filters on) in every Qdrant
+payload makes each search response carry RETRIEVAL_K full chunks per expanded
+query, and keeps all of it in Qdrant's payload storage. Instead the text lives
+here, zlib-compressed in a SQLite file next to the Qdrant data, and is
+materialised only for the unique candidates that go on to the reranker.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHUNK_TEXT_STORE = os.getenv("CHUNK_TEXT_STORE", "1") == "1"
+CHUNK_TEXT_STORE_DIR = os.getenv("CHUNK_TEXT_STORE_DIR", "./data/chunk_text")
+
+# SQLite caps the number of bound parameters per statement
+_MAX_PARAMS = 500
+
+
+class ChunkTextStore:
+    """
+    point_id → (text, metadata) in one SQLite table, each row a compressed
+    JSON blob. Safe to share between threads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks (point_id TEXT PRIMARY KEY, data BLOB NOT NULL)"
+            )
+
+    def put(self, items: Iterable[Tuple[str, str, dict]]) -> None:
+        """Store (point_id, text, metadata) triples, replacing existing rows."""
+        rows = [
+            (pid, zlib.compress(json.dumps([text, meta], ensure_ascii=False).encode("utf-8"), 6))
+            for pid, text, meta in items
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?)", rows)
+
+    def get_many(self, ids: List[str]) -> Dict[str, Tuple[str, dict]]:
+        """{point_id: (text, metadata)} for the IDs that are stored."""
+        out: Dict[str, Tuple[str, dict]] = {}
+        for start in range(0, len(ids), _MAX_PARAMS):
+            part = ids[start:start + _MAX_PARAMS]
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT point_id, data FROM chunks WHERE point_id IN ({','.join('?' * len(part))})",
+                    part,
+                ).fetchall()
+            for pid, blob in rows:
+                text, meta = json.loads(zlib.decompress(blob).decode("utf-8"))
+                out[pid] = (text, meta)
+        return out
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM chunks WHERE point_id = ?", [(p,) for p in ids])
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunks")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM chunks"
+            ).fetchone()
+        return {"chunks": count, "compressed_bytes": size}
+
+
+_stores: Dict[str, ChunkTextStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_chunk_store(collection: str) -> Optional[ChunkTextStore]:
+    """Process-wide store for a collection, or None when CHUNK_TEXT_STORE=0."""
+    if not CHUNK_TEXT_STORE:
+        return None
+    with _stores_lock:
+        if collection not in _stores:
+            _stores[collection] = ChunkTextStore(
+                os.path.join(CHUNK_TEXT_STORE_DIR, f"{collection}.sqlite3")
+            )
+        return _stores[collection]
@@ -0,0 +1,238 @@
+"""
+src/retrieval/collection_profile.py
+Storage profiles for the Qdrant collection: vector quantization and on-disk
+storage, so large corpora do not need every float32 vector in RAM.
+
+  QDRANT_PROFILE   quantized copy kept in RAM         originals / payload   oversampling
+  memory           — (float32 vectors in RAM)         RAM / RAM             —
+  scalar           int8, 4x smaller                   disk / disk           2.0
+  binary           1 bit per dim, 32x smaller         disk / disk           3.0
+  product          product quantization, 16x smaller  disk / disk           3.0
+
+Search runs on the quantized vectors; with rescoring (QDRANT_RESCORE=1) the
+oversampling * k best candidates are re-scored with the original vectors, which
+recovers most of the recall lost to quantization. QDRANT_ON_DISK_VECTORS,
+QDRANT_ON_DISK_PAYLOAD, QDRANT_OVERSAMPLING and QDRANT_PQ_COMPRESSION override
+the preset. Each setting comes from the environment, else from the
+`vector_index:` section of config/config.yaml, else the preset.
+
+HNSW build parameters come from QDRANT_HNSW_M / QDRANT_HNSW_EF_CONSTRUCT
+(`hnsw_m` / `hnsw_ef_construct` in config.yaml).
+
+The profile is applied when the collection is created and pushed to an
+existing collection with update_collection(). Local (on-disk, QDRANT_MODE=local)
+Qdrant keeps on-disk storage but ignores quantization and always searches
+exactly; the profiles pay off on a Qdrant server (QDRANT_MODE=server).
+
+Search effort is chosen per request with a search profile (SEARCH_PROFILE is
+the default):
+
+  fast       hnsw_ef=SEARCH_EF_FAST, quantized scores only (no rescoring)
+  balanced   hnsw_ef=SEARCH_EF_BALANCED, rescoring/oversampling per the profile
+  exact      full scan with the original vectors (recall-critical queries)
+"""
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = os.getenv("CONFIG_PATH", str(Path(__file__).resolve().parents[2] / "config" / "config.yaml"))
+
+# quantization, on_disk_vectors, on_disk_payload, oversampling
+PRESETS: Dict[str, tuple] = {
+    "memory": ("none", False, False, 1.0),
+    "scalar": ("scalar", True, True, 2.0),
+    "binary": ("binary", True, True, 3.0),
+    "product": ("product", True, True, 3.0),
+}
+PQ_COMPRESSIONS = (4, 8, 16, 32, 64)
+
+SEARCH_PROFILES = ("fast", "balanced", "exact")
+SEARCH_PROFILE = os.getenv("SEARCH_PROFILE", "balanced").lower()
+SEARCH_EF_FAST = int(os.getenv("SEARCH_EF_FAST", "32"))
+SEARCH_EF_BALANCED = int(os.getenv("SEARCH_EF_BALANCED", "128"))
+
+
+def resolve_search_profile(name: Optional[str]) -> str:
+    """`name` if it is a search profile, SEARCH_PROFILE when None; ValueError otherwise."""
+    name = (name or SEARCH_PROFILE).lower()
+    if name not in SEARCH_PROFILES:
+        raise ValueError(f"unknown search profile {name!r} (expected one of {', '.join(SEARCH_PROFILES)})")
+    return name
+
+
+def _config_section() -> Dict[str, Any]:
+    """The `vector_index:` section of config.yaml ({} if absent or unreadable)."""
+    try:
+        import yaml
+        with open(CONFIG_PATH, encoding="utf-8") as f:
+            return dict((yaml.safe_load(f) or {}).get("vector_index") or {})
+    except Exception:
+        return {}
+
+
+def _setting(env: str, key: str, config: Dict[str, Any], default: Any) -> Any:
+    value = os.getenv(env, "").strip()
+    if value:
+        return value
+    return config.get(key, default)
+
+
+def _flag(value: Any) -> bool:
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+class CollectionProfile:
+    """Quantization / on-disk settings for one collection, convertible to qdrant-client models."""
+
+    def __init__(
+        self,
+        name: str = "memory",
+        quantization: str = "none",
+        on_disk_vectors: bool = False,
+        on_disk_payload: bool = False,
+        rescore: bool = True,
+        oversampling: float = 1.0,
+        pq_compression: int = 16,
+        hnsw_m: int = 16,
+        hnsw_ef_construct: int = 100,
+    ):
+        if quantization not in ("none", "scalar", "binary", "product"):
+            raise ValueError(f"unknown quantization {quantization!r}")
+        if pq_compression not in PQ_COMPRESSIONS:
+            raise ValueError(f"pq_compression must be one of {PQ_COMPRESSIONS}, got {pq_compression}")
+        self.name = name
+        self.quantization = quantization
+        self.on_disk_vectors = on_disk_vectors
+        self.on_disk_payload = on_disk_payload
+        self.rescore = rescore
+        self.oversampling = max(1.0, float(oversampling))
+        self.pq_compression = pq_compression
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construct = hnsw_ef_construct
+
+    @classmethod
+    def preset(cls, name: str, **overrides) -> "CollectionProfile":
+        if name not in PRESETS:
+            raise ValueError(f"unknown QDRANT_PROFILE {name!r} (expected one of {', '.join(PRESETS)})")
+        quantization, on_disk_vectors, on_disk_payload, oversampling = PRESETS[name]
+        settings = dict(
+            quantization=quantization, on_disk_vectors=on_disk_vectors,
+            on_disk_payload=on_disk_payload, oversampling=oversampling,
+        )
+        settings.update(overrides)
+        return cls(name, **settings)
+
+    # ── qdrant-client models ──────────────────────────────────────────────────
+
+    def vectors_config(self, dim: int):
+        from qdrant_client.http.models import Distance, VectorParams
+        return VectorParams(size=dim, distance=Distance.COSINE, on_disk=self.on_disk_vectors)
+
+    def hnsw_config(self):
+        from qdrant_client.http.models import HnswConfigDiff
+        return HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+
+    def quantization_config(self):
+        """ScalarQuantization / BinaryQuantization / ProductQuantization, or None."""
+        from qdrant_client.http import models as qm
+
+        if self.quantization == "scalar":
+            return qm.ScalarQuantization(
+                scalar=qm.ScalarQuantizationConfig(type=qm.ScalarType.INT8, quantile=0.99, always_ram=True)
+            )
+        if self.quantization == "binary":
+            return qm.BinaryQuantization(binary=qm.BinaryQuantizationConfig(always_ram=True))
+        if self.quantization == "product":
+            return qm.ProductQuantization(
+                product=qm.ProductQuantizationConfig(
+                    compression=qm.CompressionRatio(f"x{self.pq_compression}"), always_ram=True
+                )
+            )
+        return None
+
+    def search_settings(self, search_profile: Optional[str] = None) -> Dict[str, Any]:
+        """Effective hnsw_ef / exact / rescoring values for a search profile."""
+        name = resolve_search_profile(search_profile)
+        quantized = self.quantization != "none"
+        if name == "exact":
+            return {"search_profile": name, "exact": True, "hnsw_ef": None, "rescore": None, "oversampling": None}
+        fast = name == "fast"
+        return {
+            "search_profile": name,
+            "exact": False,
+            "hnsw_ef": SEARCH_EF_FAST if fast else SEARCH_EF_BALANCED,
+            "rescore": (False if fast else self.rescore) if quantized else None,
+            "oversampling": (1.0 if fast else self.oversampling) if quantized else None,
+        }
+
+    def search_params(self, search_profile: Optional[str] = None):
+        """SearchParams for a search profile (fast / balanced / exact, default SEARCH_PROFILE)."""
+        from qdrant_client.http import models as qm
+
+        settings = self.search_settings(search_profile)
+        if settings["exact"]:
+            # Full scan over the original vectors: quantized copies are not used at all
+            ignore = qm.QuantizationSearchParams(ignore=True) if self.quantization != "none" else None
+            return qm.SearchParams(exact=True, quantization=ignore)
+        quantization = None
+        if settings["rescore"] is not None:
+            quantization = qm.QuantizationSearchParams(
+                rescore=settings["rescore"], oversampling=settings["oversampling"]
+            )
+        return qm.SearchParams(hnsw_ef=settings["hnsw_ef"], exact=False, quantization=quantization)
+
+    # ── Reporting ─────────────────────────────────────────────────────────────
+
+    def ram_bytes(self, points: int, dim: int, hnsw_m: Optional[int] = None) -> int:
+        """
+        Estimated resident bytes for `points` vectors: the RAM-held vectors
+        (float32 originals, or the quantized copy when originals are on disk)
+        plus the HNSW graph (~2*m links of 4 bytes per point on layer 0).
+        """
+        full = points * dim * 4
+        quantized = {
+            "none": 0,
+            "scalar": points * dim,
+            "binary": points * ((dim + 7) // 8),
+            "product": full // self.pq_compression,
+        }[self.quantization]
+        vectors = quantized if self.on_disk_vectors and quantized else full + quantized
+        return vectors + points * (hnsw_m or self.hnsw_m) * 2 * 4
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "profile": self.name,
+            "quantization": self.quantization if self.quantization != "product" else f"product-x{self.pq_compression}",
+            "on_disk_vectors": self.on_disk_vectors,
+            "on_disk_payload": self.on_disk_payload,
+            "rescore": self.rescore,
+            "oversampling": self.oversampling,
+            "hnsw_m": self.hnsw_m,
+            "hnsw_ef_construct": self.hnsw_ef_construct,
+        }
+
+
+def load_profile(config: Optional[Dict[str, Any]] = None) -> CollectionProfile:
+    """The configured profile: environment first, then config.yaml `vector_index:`, then the preset."""
+    config = _config_section() if config is None else config
+    name = str(_setting("QDRANT_PROFILE", "profile", config, "memory")).lower()
+    overrides: Dict[str, Any] = {}
+    for env, key in (("QDRANT_ON_DISK_VECTORS", "on_disk_vectors"), ("QDRANT_ON_DISK_PAYLOAD", "on_disk_payload")):
+        value = _setting(env, key, config, None)
+        if value is not None:
+            overrides[key] = _flag(value)
+    overrides["rescore"] = _flag(_setting("QDRANT_RESCORE", "rescore", config, True))
+    oversampling = _setting("QDRANT_OVERSAMPLING", "oversampling", config, None)
+    if oversampling is not None:
+        overrides["oversampling"] = float(oversampling)
+    overrides["pq_compression"] = int(_setting("QDRANT_PQ_COMPRESSION", "pq_compression", config, 16))
+    overrides["hnsw_m"] = int(_setting("QDRANT_HNSW_M", "hnsw_m", config, 16))
+    overrides["hnsw_ef_construct"] = int(_setting("QDRANT_HNSW_EF_CONSTRUCT", "hnsw_ef_construct", config, 100))
+    try:
+        return CollectionProfile.preset(name, **overrides)
+    except ValueError as e:
+        logger.warning(f"[CollectionProfile] {e}; using the in-memory profile.")
+        return CollectionProfile.preset("memory")
@@ -0,0 +1,333 @@
+"""
+src/retrieval/embedding_cache.py
+Persistent, content-addressed cache of document embeddings.
+
+Re-uploads, re-chunking that reproduces the same chunk boundaries and moving
+between QdrantVectorStore and PGVectorStore all re-embed text that was
+embedded before. Vectors are cached on disk keyed by (model name,
+whitespace-normalised text), stored as raw float32 blobs in SQLite, and
+looked up in bulk before encoding. Every lookup stamps the entry's last-use
+time; when the cache grows past EMBEDDING_CACHE_MAX_MB the least recently
+used entries are removed until it is back under 90% of the cap.
+
+Texts that do need encoding are sorted by token length and grouped into
+batches of at most EMBED_ENCODE_BATCH texts and EMBED_TOKEN_BUDGET padded
+tokens, so short chunks are not padded to the length of long ones and the size
+of a single forward pass stays bounded however many chunks are added at once.
+
+Query embeddings are cached separately, in an in-process LRU of the last
+QUERY_EMBEDDING_CACHE_SIZE queries: repeated and popular questions (and their
+expanded variants) skip the encoder entirely.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE", "1") == "1"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./data/embedding_cache.sqlite3")
+EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024"))
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+EMBED_ENCODE_BATCH = int(os.getenv("EMBED_ENCODE_BATCH", "64"))
+# Padded tokens (texts x longest text) per forward pass; bounds activation memory
+EMBED_TOKEN_BUDGET = int(os.getenv("EMBED_TOKEN_BUDGET", "4096"))
+
+# SQLite caps the number of bound parameters per statement
+_MAX_PARAMS = 500
+# Approximate per-row overhead (key, timestamp, b-tree) on top of the vector bytes
+_ROW_OVERHEAD = 48
+
+
+def _key(model_name: str, text: str) -> bytes:
+    normalised = " ".join(text.split())
+    return hashlib.blake2b(f"{model_name}\0{normalised}".encode("utf-8"), digest_size=16).digest()
+
+
+class EmbeddingCache:
+    """float32 vectors keyed by (model, text) with an LRU size cap. Safe to share between threads."""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_mb: int = EMBEDDING_CACHE_MAX_MB):
+        self.path = path
+        self.max_bytes = max_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS vectors ("
+                " key BLOB PRIMARY KEY, vec BLOB NOT NULL, used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS vectors_used ON vectors (used)")
+            self._size = self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(vec)), 0) + COUNT(*) * ? FROM vectors", (_ROW_OVERHEAD,)
+            ).fetchone()[0]
+
+    def get_many(self, model_name: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached vector for each text (None where missing), in order."""
+        keys = [_key(model_name, t) for t in texts]
+        found: Dict[bytes, np.ndarray] = {}
+        unique = list(dict.fromkeys(keys))
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(unique), _MAX_PARAMS):
+                part = unique[start:start + _MAX_PARAMS]
+                rows = self._conn.execute(
+                    f"SELECT key, vec FROM vectors WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE vectors SET used = ? WHERE key = ?", [(now, k) for k in found]
+                    )
+            out = [found.get(k) for k in keys]
+            hits = sum(v is not None for v in out)
+            self.hits += hits
+            self.misses += len(out) - hits
+        return out
+
+    def put_many(self, model_name: str, texts: List[str], vectors: np.ndarray) -> None:
+        """Store vectors (one row per text), then evict if over the size cap."""
+        now = time.time()
+        rows = {
+            _key(model_name, t): np.ascontiguousarray(v, dtype=np.float32).tobytes()
+            for t, v in zip(texts, vectors)
+        }
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO vectors VALUES (?, ?, ?)",
+                [(k, blob, now) for k, blob in rows.items()],
+            )
+            added = self._conn.total_changes - before
+            if added:
+                self._size += added * (len(next(iter(rows.values()))) + _ROW_OVERHEAD)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self, target_ratio: float = 0.9) -> int:
+        """Remove least recently used entries until under target_ratio * cap."""
+        removed = 0
+        with self._lock, self._conn:
+            target = self.max_bytes * target_ratio
+            while self._size > target:
+                rows = self._conn.execute(
+                    "SELECT key, LENGTH(vec) FROM vectors ORDER BY used LIMIT 1000"
+                ).fetchall()
+                if not rows:
+                    self._size = 0
+                    break
+                drop = []
+                for key, size in rows:
+                    if self._size <= target:
+                        break
+                    drop.append((key,))
+                    self._size -= size + _ROW_OVERHEAD
+                self._conn.executemany("DELETE FROM vectors WHERE key = ?", drop)
+                removed += len(drop)
+        if removed:
+            logger.info(f"[EmbeddingCache] Evicted {removed} vectors ({self._size / 1e6:.1f} MB left).")
+        return removed
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        return {
+            "entries": entries,
+            "size_mb": round(self._size / 1e6, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 3),
+        }
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide cache, or None when EMBEDDING_CACHE=0."""
+    global _cache
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
+
+
+# ── Document encoding ─────────────────────────────────────────────────────────
+
+def _token_lengths(model, texts: List[str]) -> List[int]:
+    """Encoder token count per text (truncated to the model's window), or a chars/4 estimate."""
+    max_len = getattr(model, "max_seq_length", None) or 512
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is not None:
+        try:
+            ids = tokenizer(texts, truncation=True, max_length=max_len)["input_ids"]
+            return [len(i) for i in ids]
+        except Exception as e:
+            logger.debug(f"[EmbeddingCache] Tokenizer length lookup failed, estimating: {e}")
+    return [min(len(t) // 4 + 2, max_len) for t in texts]
+
+
+def length_batches(
+    lengths: List[int],
+    batch_size: int = EMBED_ENCODE_BATCH,
+    token_budget: int = EMBED_TOKEN_BUDGET,
+) -> List[List[int]]:
+    """
+    Indices sorted by length and grouped so that each batch has at most
+    `batch_size` items and at most `token_budget` padded tokens
+    (items x longest item). An item longer than the budget gets its own batch.
+    """
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    for i in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+        # Ascending order: the new item is the longest, so it sets the padding
+        if batch and (len(batch) >= batch_size or (len(batch) + 1) * lengths[i] > token_budget):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def encode_bucketed(model, texts: List[str]) -> np.ndarray:
+    """Normalised float32 embeddings (n x dim) encoded in length-sorted, token-budgeted batches."""
+    if not texts:
+        return np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+    started = time.perf_counter()
+    batches = length_batches(_token_lengths(model, texts), EMBED_ENCODE_BATCH, EMBED_TOKEN_BUDGET)
+    out: Optional[np.ndarray] = None
+    for idx in batches:
+        vecs = model.encode(
+            [texts[i] for i in idx], batch_size=len(idx),
+            normalize_embeddings=True, show_progress_bar=False,
+        )
+        if out is None:
+            out = np.empty((len(texts), np.shape(vecs)[1]), dtype=np.float32)
+        out[idx] = vecs
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Embedded {len(texts)} chunks in {len(batches)} batches, {elapsed:.2f}s "
+        f"({len(texts) / max(elapsed, 1e-9):.1f} chunks/s)."
+    )
+    return out
+
+
+def encode_documents(model, texts: List[str], model_name: str) -> np.ndarray:
+    """
+    Normalised float32 embeddings for `texts` (n x dim), encoding only the
+    texts that are not already cached. `model_name` must identify the
+    model's weights, since it is part of the cache key.
+    """
+    cache = get_embedding_cache()
+    if cache is None or not texts:
+        return encode_bucketed(model, texts)
+    cached = cache.get_many(model_name, texts)
+    todo = [i for i, v in enumerate(cached) if v is None]
+    done = [i for i, v in enumerate(cached) if v is not None]
+    fresh = None
+    if todo:
+        missing = list(dict.fromkeys(texts[i] for i in todo))
+        fresh = encode_bucketed(model, missing)
+        cache.put_many(model_name, missing, fresh)
+    dim = fresh.shape[1] if fresh is not None else len(cached[done[0]])
+    out = np.empty((len(texts), dim), dtype=np.float32)
+    if todo:
+        row = {t: j for j, t in enumerate(missing)}
+        out[todo] = fresh[[row[texts[i]] for i in todo]]
+    if done:
+        out[done] = np.stack([cached[i] for i in done])
+        logger.info(
+            f"[EmbeddingCache] {len(done)}/{len(texts)} embeddings from cache "
+            f"(hit rate {cache.hit_rate:.0%})."
+        )
+    return out
+
+
+class QueryEmbeddingLRU:
+    """Bounded in-memory LRU of query vectors. Safe to share between threads."""
+
+    def __init__(self, maxsize: int = QUERY_EMBEDDING_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        with self._lock:
+            vec = self._items.get(key)
+            if vec is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return vec
+
+    def put(self, key: bytes, vec: np.ndarray) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._items[key] = vec
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+_query_lru = QueryEmbeddingLRU()
+
+
+def get_query_embedding_lru() -> QueryEmbeddingLRU:
+    return _query_lru
+
+
+def encode_queries(model, queries: List[str], model_name: str) -> np.ndarray:
+    """
+    Normalised float32 query embeddings (n x dim). Queries missing from the
+    LRU are encoded together in a single forward pass.
+    """
+    lru = get_query_embedding_lru()
+    keys = [_key(model_name, q) for q in queries]
+    vecs = [lru.get(k) for k in keys]
+    missing = list(dict.fromkeys(q for q, v in zip(queries, vecs) if v is None))
+    if missing:
+        fresh = np.asarray(
+            model.encode(missing, normalize_embeddings=True, show_progress_bar=False), dtype=np.float32
+        )
+        by_query = dict(zip(missing, fresh))
+        for i, (q, v) in enumerate(zip(queries, vecs)):
+            if v is None:
+                vecs[i] = by_query[q]
+        for q, vec in by_query.items():
+            lru.put(_key(model_name, q), vec)
+    return np.stack(vecs)
@@ -0,0 +1,137 @@
+"""
+src/retrieval/embedding_dispatcher.py
+Cross-request micro-batching for the embedding model.
+
+Under concurrent load every /api/ask request encodes its (few) queries on its
+own, so the model runs many batch-of-1..3 forward passes back to back. The
+dispatcher puts a single worker thread in front of the model: callers submit
+texts and get a Future, and the worker collects requests for up to
+EMBED_BATCH_WAIT_MS (or until EMBED_BATCH_MAX texts are waiting), runs one
+encode() for all of them and hands each caller its rows.
+
+The dispatcher has the same encode() signature as the model, so it can be
+passed wherever the model is used for queries.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBED_DISPATCHER = os.getenv("EMBED_DISPATCHER", "1") == "1"
+EMBED_BATCH_MAX = int(os.getenv("EMBED_BATCH_MAX", "32"))
+EMBED_BATCH_WAIT_MS = float(os.getenv("EMBED_BATCH_WAIT_MS", "5"))
+
+_STOP = object()
+
+
+class EmbeddingDispatcher:
+    """Single-worker micro-batcher around a SentenceTransformer-like model."""
+
+    def __init__(self, model, max_batch: int = EMBED_BATCH_MAX, max_wait_ms: float = EMBED_BATCH_WAIT_MS):
+        self.model = model
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.batches = 0
+        self.texts = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="embedding-dispatcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, texts: List[str], normalize_embeddings: bool = True) -> Future:
+        """Queue `texts` for encoding; the Future resolves to a float32 (n x dim) array."""
+        fut: Future = Future()
+        if not texts:
+            fut.set_result(np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32))
+            return fut
+        self._queue.put((list(texts), normalize_embeddings, fut))
+        return fut
+
+    def encode(self, texts: List[str], normalize_embeddings: bool = True, **_kwargs) -> np.ndarray:
+        """Blocking encode through the shared batch (model.encode-compatible)."""
+        return self.submit(texts, normalize_embeddings).result()
+
+    def close(self) -> None:
+        self._queue.put(_STOP)
+        self._worker.join()
+
+    # ── Worker ────────────────────────────────────────────────────────────────
+
+    def _run(self) -> None:
+        carry = None
+        while True:
+            first = carry if carry is not None else self._queue.get()
+            carry = None
+            if first is _STOP:
+                return
+            batch = [first]
+            size = len(first[0])
+            deadline = time.perf_counter() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                # Requests are never split; normalisation must match to share a pass
+                if item is _STOP or item[1] != first[1] or size + len(item[0]) > self.max_batch:
+                    carry = item
+                    break
+                batch.append(item)
+                size += len(item[0])
+            self._encode(batch)
+
+    def _encode(self, batch: List[Tuple[List[str], bool, Future]]) -> None:
+        texts = [t for item in batch for t in item[0]]
+        try:
+            vecs = np.asarray(self.model.encode(
+                texts, normalize_embeddings=batch[0][1], show_progress_bar=False,
+                batch_size=max(len(texts), 1),
+            ), dtype=np.float32)
+        except Exception as e:
+            for _texts, _norm, fut in batch:
+                fut.set_exception(e)
+            return
+        self.batches += 1
+        self.texts += len(texts)
+        start = 0
+        for item_texts, _norm, fut in batch:
+            fut.set_result(vecs[start:start + len(item_texts)])
+            start += len(item_texts)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch": round(self.texts / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+_dispatcher: Optional[EmbeddingDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_embedding_dispatcher() -> Optional[EmbeddingDispatcher]:
+    """Process-wide dispatcher around the embedding model singleton, or None when EMBED_DISPATCHER=0."""
+    global _dispatcher
+    if not EMBED_DISPATCHER:
+        return None
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            from src.retrieval.models import get_embedding_model
+            _dispatcher = EmbeddingDispatcher(get_embedding_model())
+        return _dispatcher
+
+
+def query_encoder(model):
+    """The object to encode queries with: the shared dispatcher if `model` is the singleton."""
+    from src.retrieval.models import _MODELS
+    if model is not None and model is _MODELS["embedding"]:
+        return get_embedding_dispatcher() or model
+    return model
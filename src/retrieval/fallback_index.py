@@ -0,0 +1,324 @@
+"""
+src/retrieval/fallback_index.py
+Durable fallback index for points that could not be written to Qdrant.
+
+MemoryVectorIndex loses its points on restart, so chunks ingested while
+Qdrant was failing silently disappeared from search. DurableVectorIndex has
+the same interface but keeps its data on disk under
+FALLBACK_INDEX_DIR/<collection>/:
+
+  vectors.f32      append-only float32 rows (unit length), memory-mapped for
+                   search; replaced and deleted rows are just left behind
+  points.sqlite3   point_id → row, plus the zlib-compressed [text, metadata]
+
+Opening reads only the (point_id, row) pairs, so it is near-instant and needs
+no re-embedding; text and metadata are read for search hits only.
+QdrantVectorStore.reconcile_fallback() replays the points into Qdrant once it
+accepts writes again and then empties the index (which also drops the dead
+rows).
+
+An index directory belongs to one process at a time (an exclusive lock on
+owner.lock, held until the process exits): its row offsets and memory map are
+cached in that process, so a second writer would corrupt them. When the API
+and the Streamlit app both run, the process that opens the collection second
+gets an in-memory MemoryVectorIndex instead (open_fallback_index).
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.retrieval.memory_index import _Guard, _RWLock
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_INDEX = os.getenv("FALLBACK_INDEX", "1") == "1"
+FALLBACK_INDEX_DIR = os.getenv("FALLBACK_INDEX_DIR", "./data/fallback_index")
+
+# SQLite caps the number of bound parameters per statement
+_MAX_PARAMS = 500
+
+_owned: Dict[str, int] = {}  # index directory → fd holding its owner.lock
+_owned_lock = threading.Lock()
+
+
+class FallbackIndexInUse(RuntimeError):
+    """The index directory is owned by another process."""
+
+
+def _claim(path: str) -> None:
+    """Take process-wide ownership of an index directory (kept until exit)."""
+    key = os.path.realpath(path)
+    with _owned_lock:
+        if key in _owned:
+            return
+        fd = os.open(os.path.join(path, "owner.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                import fcntl
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except ImportError:  # Windows
+                import msvcrt
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            raise FallbackIndexInUse(f"{path} is in use by another process")
+        _owned[key] = fd
+
+
+def _pack(text: str, meta: dict) -> bytes:
+    return zlib.compress(json.dumps([text, meta], ensure_ascii=False, default=str).encode("utf-8"), 6)
+
+
+def _unpack(blob: bytes) -> Tuple[str, dict]:
+    text, meta = json.loads(zlib.decompress(blob).decode("utf-8"))
+    return text, meta
+
+
+class DurableVectorIndex:
+    """
+    On-disk drop-in for MemoryVectorIndex. Thread-safe within one process;
+    raises FallbackIndexInUse if another process owns `path`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        _claim(path)
+        self._vec_path = os.path.join(path, "vectors.f32")
+        self._conn = sqlite3.connect(os.path.join(path, "points.sqlite3"), check_same_thread=False)
+        self._db_lock = threading.Lock()
+        lock = _RWLock()
+        self._read = _Guard(lock.acquire_read, lock.release_read)
+        self._write = _Guard(lock.acquire_write, lock.release_write)
+        with self._db_lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS points ("
+                " point_id TEXT PRIMARY KEY, row INTEGER NOT NULL, data BLOB NOT NULL)"
+            )
+            dim = self._conn.execute("SELECT value FROM info WHERE key = 'dim'").fetchone()
+            pairs = self._conn.execute("SELECT point_id, row FROM points").fetchall()
+        self.dim: Optional[int] = int(dim[0]) if dim else None
+        self._rows = 0
+        self._mm: Optional[np.ndarray] = None
+        self._row: Dict[str, int] = {}
+        self._row_ids: List[Optional[str]] = []  # row → point_id, None for dead rows
+        self._live = np.zeros(0, dtype=bool)
+        if self.dim:
+            if os.path.exists(self._vec_path):
+                size = os.path.getsize(self._vec_path)
+                self._rows = size // (self.dim * 4)
+                if size != self._rows * self.dim * 4:
+                    # Drop a partly written trailing row, or the next append
+                    # would start mid-row and misalign every row after it
+                    with open(self._vec_path, "r+b") as f:
+                        f.truncate(self._rows * self.dim * 4)
+            self._live = np.zeros(self._rows, dtype=bool)
+            # Rows past the end of the vector file were never fully written
+            self._row = {pid: row for pid, row in pairs if row < self._rows}
+            self._row_ids = [None] * self._rows
+            for pid, row in self._row.items():
+                self._row_ids[row] = pid
+            self._live[list(self._row.values())] = True
+            self._remap()
+        if self._row:
+            logger.warning(f"[FallbackIndex] {len(self._row)} points not yet in Qdrant ({path}).")
+
+    def __len__(self) -> int:
+        return len(self._row)
+
+    @property
+    def nbytes(self) -> int:
+        return self._rows * (self.dim or 0) * 4
+
+    def _remap(self) -> None:
+        self._mm = (
+            np.memmap(self._vec_path, dtype=np.float32, mode="r", shape=(self._rows, self.dim))
+            if self._rows else None
+        )
+
+    # ── Writes ────────────────────────────────────────────────────────────────
+
+    def add(self, ids: List[str], texts: List[str], metadatas: List[dict], vectors) -> None:
+        """Append points (a re-added ID gets a new row); `vectors` is (n x dim), normalised here."""
+        vecs = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        vecs = vecs / np.clip(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12, None)
+        with self._write:
+            if self.dim != vecs.shape[1] and not self._row:
+                # New or empty index: (re)start at this width
+                self._truncate()
+                self.dim = vecs.shape[1]
+                with self._db_lock, self._conn:
+                    self._conn.execute("INSERT OR REPLACE INTO info VALUES ('dim', ?)", (str(self.dim),))
+            if vecs.shape[1] != self.dim:
+                raise ValueError(f"vector dim {vecs.shape[1]} != index dim {self.dim}")
+            # Vectors first: a crash before the commit below leaves only unreferenced rows
+            with open(self._vec_path, "ab") as f:
+                f.write(np.ascontiguousarray(vecs).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            first = self._rows
+            rows = {pid: first + i for i, pid in enumerate(ids)}  # last copy of a duplicate ID wins
+            with self._db_lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO points VALUES (?, ?, ?)",
+                    [
+                        (pid, first + i, _pack(text, meta))
+                        for i, (pid, text, meta) in enumerate(zip(ids, texts, metadatas))
+                    ],
+                )
+            self._rows += len(ids)
+            self._live = np.concatenate([self._live, np.zeros(len(ids), dtype=bool)])
+            self._row_ids.extend([None] * len(ids))
+            for pid, row in rows.items():
+                old = self._row.get(pid)
+                if old is not None:
+                    self._live[old] = False
+                    self._row_ids[old] = None
+                self._row[pid] = row
+                self._row_ids[row] = pid
+                self._live[row] = True
+            self._remap()
+
+    def remove(self, ids: Iterable[str]) -> int:
+        """Delete points. Returns how many were present."""
+        with self._write:
+            drop = [pid for pid in set(ids) if pid in self._row]
+            if not drop:
+                return 0
+            with self._db_lock, self._conn:
+                self._conn.executemany("DELETE FROM points WHERE point_id = ?", [(pid,) for pid in drop])
+            for pid in drop:
+                row = self._row.pop(pid)
+                self._live[row] = False
+                self._row_ids[row] = None
+            if not self._row:
+                self._truncate()
+        return len(drop)
+
+    def update_metadata(self, ids: Iterable[str], fields: dict) -> None:
+        with self._write:
+            current = self._fetch([pid for pid in ids if pid in self._row])
+            with self._db_lock, self._conn:
+                self._conn.executemany(
+                    "UPDATE points SET data = ? WHERE point_id = ?",
+                    [(_pack(text, {**meta, **fields}), pid) for pid, (text, meta) in current.items()],
+                )
+
+    def clear(self) -> None:
+        with self._write:
+            with self._db_lock, self._conn:
+                self._conn.execute("DELETE FROM points")
+            self._row = {}
+            self._truncate()
+
+    def _truncate(self) -> None:
+        """Drop the vector file once no live point is left (caller holds the write lock)."""
+        self._mm = None
+        with open(self._vec_path, "wb"):
+            pass
+        self._rows = 0
+        self._row_ids = []
+        self._live = np.zeros(0, dtype=bool)
+
+    # ── Reads ─────────────────────────────────────────────────────────────────
+
+    def _fetch(self, ids: List[str]) -> Dict[str, Tuple[str, dict]]:
+        out: Dict[str, Tuple[str, dict]] = {}
+        for start in range(0, len(ids), _MAX_PARAMS):
+            part = ids[start:start + _MAX_PARAMS]
+            with self._db_lock:
+                rows = self._conn.execute(
+                    f"SELECT point_id, data FROM points WHERE point_id IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+            out.update((pid, _unpack(blob)) for pid, blob in rows)
+        return out
+
+    def search(
+        self, query_vecs, k: int, score_threshold: float = 0.0, where: Optional[Callable[[dict], bool]] = None
+    ) -> List[List[Tuple[str, dict, float]]]:
+        """
+        Top-k (point_id, metadata, cosine score) per query vector, best first.
+        `where(metadata)` restricts the candidates (metadata is read from
+        SQLite for this, so it costs a scan of the side file).
+        """
+        queries = np.asarray(query_vecs, dtype=np.float32)
+        queries = queries.reshape(-1, queries.shape[-1])
+        queries = queries / np.clip(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12, None)
+        with self._read:
+            live = self._live
+            if where is not None:
+                live = np.zeros_like(self._live)
+                with self._db_lock:
+                    rows = self._conn.execute("SELECT row, data FROM points").fetchall()
+                for row, blob in rows:
+                    if row < self._rows and where(_unpack(blob)[1]):
+                        live[row] = True
+            allowed = int(live.sum())
+            if not allowed or k <= 0:
+                return [[] for _ in queries]
+            scores = queries @ self._mm.T
+            scores[:, ~live] = -np.inf
+            kk = min(k, allowed)
+            top = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+            ranked = []
+            for q_scores, rows in zip(scores, top):
+                rows = rows[np.argsort(-q_scores[rows])]
+                ranked.append([
+                    (self._row_ids[r], float(q_scores[r])) for r in rows
+                    if score_threshold <= 0.0 or q_scores[r] >= score_threshold
+                ])
+        found = self._fetch(list({pid for hits in ranked for pid, _ in hits}))
+        return [[(pid, found[pid][1], score) for pid, score in hits if pid in found] for hits in ranked]
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, Tuple[str, dict]]:
+        with self._read:
+            wanted = [pid for pid in ids if pid in self._row]
+        return self._fetch(wanted)
+
+    def items(self) -> Iterator[Tuple[str, str, dict]]:
+        """(point_id, text, metadata) for every point."""
+        with self._db_lock:
+            rows = self._conn.execute("SELECT point_id, data FROM points").fetchall()
+        for pid, blob in rows:
+            text, meta = _unpack(blob)
+            yield pid, text, meta
+
+    def ids(self) -> List[str]:
+        with self._read:
+            return list(self._row)
+
+    def vectors(self, ids: List[str]) -> np.ndarray:
+        """Stored unit vectors for `ids` (all must be present), as an (n x dim) array."""
+        with self._read:
+            return np.array(self._mm[[self._row[pid] for pid in ids]], dtype=np.float32)
+
+
+_indexes: Dict[str, DurableVectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def open_fallback_index(collection: str):
+    """
+    Process-wide DurableVectorIndex for a collection, or a fresh in-memory
+    MemoryVectorIndex when FALLBACK_INDEX=0 or another process owns the index.
+    """
+    from src.retrieval.memory_index import MemoryVectorIndex
+
+    if not FALLBACK_INDEX:
+        return MemoryVectorIndex()
+    with _indexes_lock:
+        if collection not in _indexes:
+            try:
+                _indexes[collection] = DurableVectorIndex(os.path.join(FALLBACK_INDEX_DIR, collection))
+            except FallbackIndexInUse as e:
+                logger.warning(f"[FallbackIndex] {e}; this process keeps its fallback points in memory.")
+                return MemoryVectorIndex()
+        return _indexes[collection]
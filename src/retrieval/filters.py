@@ -0,0 +1,151 @@
+"""
+src/retrieval/filters.py
+Structured metadata filters for vector search, translated for each backend
+so filtering happens inside the ANN search instead of after it.
+
+A filter is a dict of metadata field → condition; all conditions must hold:
+
+  {"source": "contract_x.pdf"}                    equal
+  {"source": ["a.pdf", "b.pdf"]}                  any of
+  {"page": {"gte": 3, "lte": 10}}                 range (gt / gte / lt / lte)
+  {"type": "ocr", "department": "legal"}          several fields (AND)
+
+A near-duplicate chunk is stored once, with the other files it appears in
+listed in its `also_in` payload (src/ingestion/near_dedup.py), so a `source`
+condition matches `source` or any entry of `also_in` (ALIASES).
+
+  to_qdrant_filter()   models.Filter for Qdrant (backed by payload indexes)
+  to_sql_clauses()     WHERE clauses on a JSON metadata column (PGVectorStore)
+  matches()            the same test in Python (the fallback indexes)
+"""
+import math
+from typing import Any, Dict, List, Optional
+
+RANGE_OPS = ("gt", "gte", "lt", "lte")
+
+Filters = Dict[str, Any]
+
+# field → list field whose entries also satisfy equality / "any of" conditions on it
+ALIASES: Dict[str, str] = {"source": "also_in"}
+
+
+def _is_scalar(value: Any) -> bool:
+    return isinstance(value, (str, int, float, bool)) and not (isinstance(value, float) and math.isnan(value))
+
+
+def normalize_filters(filters: Optional[Filters]) -> Filters:
+    """Validate a filter dict; returns {} for None/empty, raises ValueError on malformed conditions."""
+    if not filters:
+        return {}
+    if not isinstance(filters, dict):
+        raise ValueError("filters must be an object of field → condition")
+    out: Filters = {}
+    for field, cond in filters.items():
+        if not isinstance(field, str) or not field:
+            raise ValueError(f"filter field names must be non-empty strings, got {field!r}")
+        if isinstance(cond, dict):
+            if not cond or set(cond) - set(RANGE_OPS):
+                raise ValueError(f"range filter on {field!r} takes {', '.join(RANGE_OPS)}, got {sorted(cond)}")
+            if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in cond.values()):
+                raise ValueError(f"range bounds on {field!r} must be numbers")
+        elif isinstance(cond, (list, tuple)):
+            if not cond or not all(_is_scalar(v) for v in cond):
+                raise ValueError(f"'any of' filter on {field!r} needs a non-empty list of strings/numbers")
+            cond = list(cond)
+        elif not _is_scalar(cond):
+            raise ValueError(f"unsupported filter value for {field!r}: {cond!r}")
+        out[field] = cond
+    return out
+
+
+def _equal(a: Any, b: Any) -> bool:
+    # bool is an int subclass: True must not match 1
+    return a == b and isinstance(a, bool) == isinstance(b, bool)
+
+
+def matches(meta: dict, filters: Filters) -> bool:
+    """Whether `meta` satisfies every condition of (normalised) `filters`."""
+    for field, cond in filters.items():
+        value = meta.get(field)
+        if isinstance(cond, dict):
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                return False
+            if "gt" in cond and not value > cond["gt"]:
+                return False
+            if "gte" in cond and not value >= cond["gte"]:
+                return False
+            if "lt" in cond and not value < cond["lt"]:
+                return False
+            if "lte" in cond and not value <= cond["lte"]:
+                return False
+        else:
+            wanted = cond if isinstance(cond, list) else [cond]
+            values = [value]
+            if field in ALIASES:
+                values.extend(meta.get(ALIASES[field]) or [])
+            if not any(_equal(v, c) for v in values for c in wanted):
+                return False
+    return True
+
+
+def to_qdrant_filter(filters: Filters):
+    """models.Filter for (normalised) `filters`, or None when there are none."""
+    from qdrant_client.http import models as qm
+
+    if not filters:
+        return None
+    must: List[Any] = []
+    for field, cond in filters.items():
+        if isinstance(cond, dict):
+            must.append(qm.FieldCondition(key=field, range=qm.Range(**cond)))
+        elif field in ALIASES:
+            # Qdrant matches an array payload when any element matches
+            must.append(qm.Filter(should=[_qdrant_match(field, cond), _qdrant_match(ALIASES[field], cond)]))
+        else:
+            must.append(_qdrant_match(field, cond))
+    return qm.Filter(must=must)
+
+
+def _qdrant_match(field: str, cond: Any):
+    """Condition for an equality / 'any of' `cond` on `field`."""
+    from qdrant_client.http import models as qm
+
+    if isinstance(cond, list):
+        floats = [v for v in cond if isinstance(v, float)]
+        if not floats:
+            return qm.FieldCondition(key=field, match=qm.MatchAny(any=cond))
+        # MatchAny takes strings / integers only: OR of point ranges for floats
+        should = [qm.FieldCondition(key=field, range=qm.Range(gte=v, lte=v)) for v in floats]
+        rest = [v for v in cond if not isinstance(v, float)]
+        if rest:
+            should.append(qm.FieldCondition(key=field, match=qm.MatchAny(any=rest)))
+        return qm.Filter(should=should)
+    if isinstance(cond, float):
+        return qm.FieldCondition(key=field, range=qm.Range(gte=cond, lte=cond))
+    return qm.FieldCondition(key=field, match=qm.MatchValue(value=cond))
+
+
+def to_sql_clauses(column, filters: Filters) -> list:
+    """
+    SQLAlchemy WHERE clauses on a JSON-text metadata `column` (PostgreSQL).
+    Equality and 'any of' use JSONB containment (@>), which a GIN index on
+    (column::jsonb) serves; ranges compare the numeric value of the field.
+    """
+    from sqlalchemy import Float, case, cast, func, or_
+    from sqlalchemy.dialects.postgresql import JSONB
+
+    doc = cast(column, JSONB)
+    clauses = []
+    for field, cond in filters.items():
+        if isinstance(cond, dict):
+            # NULL (no match) for missing or non-numeric values instead of a cast error
+            value = case((func.jsonb_typeof(doc[field]) == "number", cast(doc[field].astext, Float)), else_=None)
+            ops = {"gt": value.__gt__, "gte": value.__ge__, "lt": value.__lt__, "lte": value.__le__}
+            clauses.extend(ops[op](bound) for op, bound in cond.items())
+        else:
+            wanted = cond if isinstance(cond, list) else [cond]
+            options = [doc.contains({field: v}) for v in wanted]
+            if field in ALIASES:
+                options.extend(doc.contains({ALIASES[field]: [v]}) for v in wanted)
+            clauses.append(or_(*options) if len(options) > 1 else options[0])
+    return clauses
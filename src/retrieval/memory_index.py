@@ -0,0 +1,211 @@
+"""
+src/retrieval/memory_index.py
+In-memory vector index used by QdrantVectorStore while Qdrant is unavailable.
+
+Vectors are L2-normalised once on insert and kept in one contiguous, growable
+float32 matrix (4 KB per 1024-d vector instead of ~33 KB as a list of Python
+floats). A search is a single matrix product against the live rows followed
+by an argpartition top-k, so only the k best scores are ever sorted.
+
+Searches share a read lock (NumPy releases the GIL for the product);
+inserts, deletes and metadata updates take the write lock.
+"""
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+_MIN_CAPACITY = 256
+
+
+class _RWLock:
+    """Many readers or one writer; waiting writers block new readers."""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+
+class _Guard:
+    def __init__(self, acquire, release):
+        self._acquire, self._release = acquire, release
+
+    def __enter__(self):
+        self._acquire()
+
+    def __exit__(self, *exc):
+        self._release()
+
+
+class MemoryVectorIndex:
+    """point_id → (text, metadata, unit vector), searchable by cosine similarity. Thread-safe."""
+
+    def __init__(self, dim: Optional[int] = None):
+        self.dim = dim
+        self._vecs = np.empty((0, dim or 0), dtype=np.float32)
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metas: List[dict] = []
+        self._row: Dict[str, int] = {}
+        lock = _RWLock()
+        self._read = _Guard(lock.acquire_read, lock.release_read)
+        self._write = _Guard(lock.acquire_write, lock.release_write)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._ids) * (self.dim or 0) * 4
+
+    # ── Writes ────────────────────────────────────────────────────────────────
+
+    def add(self, ids: List[str], texts: List[str], metadatas: List[dict], vectors) -> None:
+        """Insert or replace points; `vectors` is (n x dim), normalised here."""
+        vecs = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        vecs = vecs / np.clip(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12, None)
+        with self._write:
+            if self.dim is None:
+                self.dim = vecs.shape[1]
+                self._vecs = np.empty((0, self.dim), dtype=np.float32)
+            if vecs.shape[1] != self.dim:
+                raise ValueError(f"vector dim {vecs.shape[1]} != index dim {self.dim}")
+            new = sum(pid not in self._row for pid in dict.fromkeys(ids))
+            self._reserve(len(self._ids) + new)
+            for pid, text, meta, vec in zip(ids, texts, metadatas, vecs):
+                row = self._row.get(pid)
+                if row is None:
+                    row = len(self._ids)
+                    self._row[pid] = row
+                    self._ids.append(pid)
+                    self._texts.append(text)
+                    self._metas.append(meta)
+                else:
+                    self._texts[row], self._metas[row] = text, meta
+                self._vecs[row] = vec
+
+    def remove(self, ids: Iterable[str]) -> int:
+        """Delete points (swapping the last row into each hole). Returns how many were present."""
+        removed = 0
+        with self._write:
+            for pid in set(ids):
+                row = self._row.pop(pid, None)
+                if row is None:
+                    continue
+                last = len(self._ids) - 1
+                if row != last:
+                    self._vecs[row] = self._vecs[last]
+                    self._ids[row] = self._ids[last]
+                    self._texts[row] = self._texts[last]
+                    self._metas[row] = self._metas[last]
+                    self._row[self._ids[row]] = row
+                self._ids.pop()
+                self._texts.pop()
+                self._metas.pop()
+                removed += 1
+        return removed
+
+    def update_metadata(self, ids: Iterable[str], fields: dict) -> None:
+        with self._write:
+            for pid in ids:
+                row = self._row.get(pid)
+                if row is not None:
+                    self._metas[row].update(fields)
+
+    def clear(self) -> None:
+        with self._write:
+            self._vecs = np.empty((0, self.dim or 0), dtype=np.float32)
+            self._ids, self._texts, self._metas, self._row = [], [], [], {}
+
+    def _reserve(self, needed: int) -> None:
+        if needed <= self._vecs.shape[0]:
+            return
+        capacity = max(needed, 2 * self._vecs.shape[0], _MIN_CAPACITY)
+        grown = np.empty((capacity, self.dim), dtype=np.float32)
+        grown[:len(self._ids)] = self._vecs[:len(self._ids)]
+        self._vecs = grown
+
+    # ── Reads ─────────────────────────────────────────────────────────────────
+
+    def search(
+        self, query_vecs, k: int, score_threshold: float = 0.0, where: Optional[Callable[[dict], bool]] = None
+    ) -> List[List[Tuple[str, dict, float]]]:
+        """
+        Top-k (point_id, metadata, cosine score) per query vector, best first.
+        `where(metadata)` restricts the candidates before the top-k is taken.
+        """
+        queries = np.asarray(query_vecs, dtype=np.float32)
+        queries = queries.reshape(-1, queries.shape[-1])
+        queries = queries / np.clip(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12, None)
+        with self._read:
+            n = len(self._ids)
+            allowed = n
+            if where is not None:
+                mask = np.fromiter((where(meta) for meta in self._metas), dtype=bool, count=n)
+                allowed = int(mask.sum())
+            if not allowed or k <= 0:
+                return [[] for _ in queries]
+            scores = queries @ self._vecs[:n].T
+            if where is not None:
+                scores[:, ~mask] = -np.inf
+            kk = min(k, allowed)
+            top = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+            out = []
+            for q_scores, rows in zip(scores, top):
+                rows = rows[np.argsort(-q_scores[rows])]
+                out.append([
+                    (self._ids[r], self._metas[r], float(q_scores[r]))
+                    for r in rows if score_threshold <= 0.0 or q_scores[r] >= score_threshold
+                ])
+        return out
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, Tuple[str, dict]]:
+        out = {}
+        with self._read:
+            for pid in ids:
+                row = self._row.get(pid)
+                if row is not None:
+                    out[pid] = (self._texts[row], self._metas[row])
+        return out
+
+    def ids(self) -> List[str]:
+        with self._read:
+            return list(self._ids)
+
+    def vectors(self, ids: List[str]) -> np.ndarray:
+        """Stored unit vectors for `ids` (all must be present), as an (n x dim) array."""
+        with self._read:
+            return self._vecs[[self._row[pid] for pid in ids]]
+
+    def items(self) -> Iterator[Tuple[str, str, dict]]:
+        """Snapshot of (point_id, text, metadata) for every point."""
+        with self._read:
+            snapshot = list(zip(self._ids, self._texts, self._metas))
+        return iter(snapshot)
@@ -5,21 +5,78 @@ from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+# "torch" (sentence-transformers, fp32) or "onnx-int8" (src/retrieval/onnx_backend.py)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+
 # Global cache for models to avoid redundant loading across threads/calls
 _MODELS = {
     "embedding": None,
-    "reranker": None
+    "reranker": None,
+    "tokenizer": None,
 }
 
+def get_embedding_model_name() -> str:
+    """Name of the configured embedding model."""
+    return os.getenv("EMBEDDING_MODEL", "BAAI/bge-large-en-v1.5")
+
+def get_embedding_model_id() -> str:
+    """
+    Model name plus the backend actually serving it; keys the embedding caches
+    (int8 vectors differ slightly). Read off the loaded model, not
+    EMBEDDING_BACKEND: a failed onnx-int8 load falls back to PyTorch.
+    """
+    name = get_embedding_model_name()
+    backend = getattr(get_embedding_model(), "backend", "torch")
+    return name if backend == "torch" else f"{name}@{backend}"
+
+def _load_onnx(kind: str, model_name: str):
+    """int8 ONNX model for EMBEDDING_BACKEND=onnx-int8, or None (torch fallback) on failure."""
+    try:
+        from src.retrieval.onnx_backend import load_onnx_model
+        return load_onnx_model(kind, model_name)
+    except Exception as e:
+        logger.error(f"Failed to load ONNX {kind} model ({e}); falling back to PyTorch.")
+        return None
+
 def get_embedding_model():
-    """Get or load the embedding model singleton."""
+    """Get or load the embedding model singleton (backend per EMBEDDING_BACKEND)."""
     if _MODELS["embedding"] is None:
-        from sentence_transformers import SentenceTransformer
-        model_name = os.getenv("EMBEDDING_MODEL", "BAAI/bge-large-en-v1.5")
-        logger.info(f"Loading embedding model: {model_name}...")
-        _MODELS["embedding"] = SentenceTransformer(model_name)
+        model_name = get_embedding_model_name()
+        logger.info(f"Loading embedding model: {model_name} ({EMBEDDING_BACKEND})...")
+        if EMBEDDING_BACKEND == "onnx-int8":
+            _MODELS["embedding"] = _load_onnx("embedding", model_name)
+        if _MODELS["embedding"] is None:
+            from sentence_transformers import SentenceTransformer
+            _MODELS["embedding"] = SentenceTransformer(model_name)
     return _MODELS["embedding"]
 
+def get_tokenizer():
+    """Get or load the embedding model's tokenizer singleton.
+
+    Used by the chunker to measure chunk lengths in embedding tokens. Reuses the
+    tokenizer of an already-loaded embedding model; otherwise only the (fast)
+    tokenizer files are loaded, not the model weights. Returns None if no fast
+    tokenizer is available — the result is cached either way.
+    """
+    if _MODELS["tokenizer"] is None:
+        tokenizer = None
+        try:
+            if _MODELS["embedding"] is not None:
+                tokenizer = _MODELS["embedding"].tokenizer
+            else:
+                from transformers import AutoTokenizer
+                model_name = os.getenv("EMBEDDING_MODEL", "BAAI/bge-large-en-v1.5")
+                logger.info(f"Loading tokenizer: {model_name}...")
+                tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+            if not getattr(tokenizer, "is_fast", False):
+                # Offset mappings (used for span token counts) need a fast tokenizer
+                logger.warning("Embedding tokenizer is not a fast tokenizer; ignoring it.")
+                tokenizer = None
+        except Exception as e:
+            logger.error(f"Failed to load tokenizer: {e}")
+        _MODELS["tokenizer"] = tokenizer or False
+    return _MODELS["tokenizer"] or None
+
 def get_reranker_model():
     """Get or load the reranker model singleton.
     
@@ -34,8 +91,11 @@ def get_reranker_model():
                 "RERANKER_MODEL",
                 "cross-encoder/ms-marco-MiniLM-L-12-v2"
             )
-            logger.info(f"Loading reranker model: {model_name}...")
-            _MODELS["reranker"] = CrossEncoder(model_name)
+            logger.info(f"Loading reranker model: {model_name} ({EMBEDDING_BACKEND})...")
+            if EMBEDDING_BACKEND == "onnx-int8":
+                _MODELS["reranker"] = _load_onnx("reranker", model_name)
+            if _MODELS["reranker"] is None:
+                _MODELS["reranker"] = CrossEncoder(model_name)
         except Exception as e:
             logger.error(f"Failed to load reranker: {e}")
             return None
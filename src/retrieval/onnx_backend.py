@@ -0,0 +1,258 @@
+"""
+src/retrieval/onnx_backend.py
+int8-quantized ONNX Runtime backend for the embedding model and the reranker.
+
+Selected with EMBEDDING_BACKEND=onnx-int8 (see src/retrieval/models.py). On
+first use each model is loaded once with sentence-transformers, exported to
+ONNX, dynamically quantized to int8 weights and cached under ONNX_CACHE_DIR
+together with what is needed to reproduce its outputs (pooling mode, max
+sequence length, score activation). Exports are staged in a temp directory
+and renamed into place, so an interrupted export is never mistaken for a
+complete one. Later loads only need onnxruntime and the tokenizer.
+
+OnnxSentenceEncoder.encode() and OnnxCrossEncoder.predict() accept the
+arguments the rest of the code passes to SentenceTransformer.encode() and
+CrossEncoder.predict() and return numpy arrays.
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", "./data/onnx_models")
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))  # 0: onnxruntime default
+
+_MODEL_FILE = "model.int8.onnx"
+_CONFIG_FILE = "backend.json"
+
+
+def _cache_path(kind: str, model_name: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name.strip("/"))
+    return os.path.join(ONNX_CACHE_DIR, f"{kind}-{slug}")
+
+
+@contextmanager
+def _staged(path: str):
+    """
+    Temp directory next to `path` to export into; renamed to `path` once the
+    block completes. A concurrent export that finished first wins.
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix=f".{os.path.basename(path)}.")
+    try:
+        yield tmp
+        if os.path.exists(os.path.join(path, _MODEL_FILE)):
+            return
+        if os.path.exists(path):
+            shutil.rmtree(path)  # left by an export that predates staging
+        os.rename(tmp, path)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _session(path: str):
+    import onnxruntime as ort
+    opts = ort.SessionOptions()
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if ONNX_THREADS > 0:
+        opts.intra_op_num_threads = ONNX_THREADS
+    return ort.InferenceSession(
+        os.path.join(path, _MODEL_FILE), sess_options=opts, providers=["CPUExecutionProvider"]
+    )
+
+
+def _export(module, tokenizer, path: str, output_name: str) -> None:
+    """Export a HF transformer to ONNX (dynamic batch/sequence) and quantize it to int8."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    sample = tokenizer(["export sample"], ["second segment"], return_tensors="pt")
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    dynamic = {n: {0: "batch", 1: "sequence"} for n in input_names}
+    dynamic[output_name] = {0: "batch"}
+
+    class _Wrapped(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, *args):
+            out = self.inner(**dict(zip(input_names, args)))
+            return out[0]
+
+    os.makedirs(path, exist_ok=True)
+    module = module.eval().to("cpu")
+    with tempfile.TemporaryDirectory() as tmp:
+        fp32 = os.path.join(tmp, "model.onnx")
+        kwargs = {"dynamo": False} if "dynamo" in torch.onnx.export.__code__.co_varnames else {}
+        with torch.no_grad():
+            torch.onnx.export(
+                _Wrapped(module), tuple(sample[n] for n in input_names), fp32,
+                input_names=input_names, output_names=[output_name],
+                dynamic_axes=dynamic, opset_version=17, **kwargs,
+            )
+        quantize_dynamic(fp32, os.path.join(path, _MODEL_FILE), weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(path)
+
+
+def _feeds(session, encoded) -> dict:
+    names = {i.name for i in session.get_inputs()}
+    return {k: np.asarray(v, dtype=np.int64) for k, v in encoded.items() if k in names}
+
+
+def _length_batches(lengths: Sequence[int], batch_size: int) -> List[List[int]]:
+    """Indices grouped into batches of similar length (less padding per batch)."""
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+# ── Embedding model ───────────────────────────────────────────────────────────
+
+class OnnxSentenceEncoder:
+    """int8 ONNX replacement for SentenceTransformer (CLS or mean pooling)."""
+
+    backend = "onnx-int8"
+
+    def __init__(self, path: str):
+        from transformers import AutoTokenizer
+        with open(os.path.join(path, _CONFIG_FILE), "r", encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.tokenizer = AutoTokenizer.from_pretrained(path, use_fast=True)
+        self.max_seq_length = self.config["max_seq_length"]
+        self.session = _session(path)
+
+    @classmethod
+    def load(cls, model_name: str) -> "OnnxSentenceEncoder":
+        path = _cache_path("embedding", model_name)
+        if not os.path.exists(os.path.join(path, _MODEL_FILE)):
+            cls.export(model_name, path)
+        return cls(path)
+
+    @staticmethod
+    def export(model_name: str, path: str) -> None:
+        from sentence_transformers import SentenceTransformer
+        logger.info(f"[ONNX] Exporting int8 embedding model {model_name} → {path} (one-off)...")
+        st = SentenceTransformer(model_name, device="cpu")
+        pooling = next((m for m in st if type(m).__name__ == "Pooling"), None)
+        conf = pooling.get_config_dict() if pooling is not None else {}
+        # sentence-transformers < 5: pooling_mode_cls_token flag; newer: pooling_mode name
+        cls_token = conf.get("pooling_mode_cls_token") or conf.get("pooling_mode") in ("cls", ["cls"])
+        mode = "cls" if cls_token else "mean"
+        with _staged(path) as tmp:
+            _export(st[0].auto_model, st.tokenizer, tmp, "last_hidden_state")
+            with open(os.path.join(tmp, _CONFIG_FILE), "w", encoding="utf-8") as f:
+                json.dump({
+                    "model_name": model_name,
+                    "pooling": mode,
+                    "max_seq_length": st.max_seq_length,
+                    "dimension": st.get_sentence_embedding_dimension(),
+                    "normalize": any(type(m).__name__ == "Normalize" for m in st),
+                }, f)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config["dimension"]
+
+    def encode(
+        self,
+        sentences,
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        convert_to_numpy: bool = True,
+        show_progress_bar: bool = False,
+        **_kwargs,
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        out = np.zeros((len(texts), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        lengths = [len(t) for t in texts]
+        for idx in _length_batches(lengths, max(1, batch_size)):
+            enc = self.tokenizer(
+                [texts[i] for i in idx], padding=True, truncation=True,
+                max_length=self.max_seq_length, return_tensors="np",
+            )
+            hidden = self.session.run(None, _feeds(self.session, enc))[0]
+            if self.config["pooling"] == "cls":
+                pooled = hidden[:, 0]
+            else:
+                mask = enc["attention_mask"][..., None].astype(np.float32)
+                pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            out[idx] = pooled
+        if normalize_embeddings or self.config.get("normalize"):
+            out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+        return out[0] if single else out
+
+
+# ── Cross-encoder ─────────────────────────────────────────────────────────────
+
+class OnnxCrossEncoder:
+    """int8 ONNX replacement for CrossEncoder.predict (single-logit rerankers)."""
+
+    def __init__(self, path: str):
+        from transformers import AutoTokenizer
+        with open(os.path.join(path, _CONFIG_FILE), "r", encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.tokenizer = AutoTokenizer.from_pretrained(path, use_fast=True)
+        self.max_length = self.config["max_length"]
+        self.session = _session(path)
+
+    @classmethod
+    def load(cls, model_name: str) -> "OnnxCrossEncoder":
+        path = _cache_path("reranker", model_name)
+        if not os.path.exists(os.path.join(path, _MODEL_FILE)):
+            cls.export(model_name, path)
+        return cls(path)
+
+    @staticmethod
+    def export(model_name: str, path: str) -> None:
+        from sentence_transformers import CrossEncoder
+        logger.info(f"[ONNX] Exporting int8 reranker {model_name} → {path} (one-off)...")
+        ce = CrossEncoder(model_name, device="cpu")
+        activation = getattr(ce, "activation_fn", None) or getattr(ce, "default_activation_function", None)
+        with _staged(path) as tmp:
+            _export(ce.model, ce.tokenizer, tmp, "logits")
+            with open(os.path.join(tmp, _CONFIG_FILE), "w", encoding="utf-8") as f:
+                json.dump({
+                    "model_name": model_name,
+                    "max_length": ce.max_length or ce.tokenizer.model_max_length,
+                    "activation": "sigmoid" if type(activation).__name__ == "Sigmoid" else "identity",
+                }, f)
+
+    def predict(
+        self,
+        sentences: Sequence[Tuple[str, str]],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+        **_kwargs,
+    ) -> np.ndarray:
+        pairs = list(sentences)
+        scores = np.zeros(len(pairs), dtype=np.float32)
+        lengths = [len(a) + len(b) for a, b in pairs]
+        for idx in _length_batches(lengths, max(1, batch_size)):
+            enc = self.tokenizer(
+                [pairs[i][0] for i in idx], [pairs[i][1] for i in idx],
+                padding=True, truncation="longest_first", max_length=self.max_length,
+                return_tensors="np",
+            )
+            logits = self.session.run(None, _feeds(self.session, enc))[0]
+            scores[idx] = logits[:, 0]
+        if self.config["activation"] == "sigmoid":
+            scores = 1 / (1 + np.exp(-scores))
+        return scores
+
+
+def load_onnx_model(kind: str, model_name: str):
+    """OnnxSentenceEncoder ("embedding") or OnnxCrossEncoder ("reranker"), exporting on first use."""
+    cls: Optional[type] = {"embedding": OnnxSentenceEncoder, "reranker": OnnxCrossEncoder}.get(kind)
+    if cls is None:
+        raise ValueError(f"unknown model kind: {kind}")
+    return cls.load(model_name)
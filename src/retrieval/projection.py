@@ -0,0 +1,151 @@
+"""
+src/retrieval/projection.py
+Reduced-dimension vectors for the Qdrant collection.
+
+bge-large embeddings are 1024-d float32 (4 KB per chunk), and Qdrant's index
+memory and search time grow with that width. With VECTOR_PROJECTION set the
+store keeps only VECTOR_DIM dimensions per vector:
+
+  truncate  keep the first VECTOR_DIM dimensions (for Matryoshka-trained
+            models, whose leading dimensions carry most of the signal)
+  pca       project onto the top VECTOR_DIM principal components, fitted on a
+            sample of the collection's chunks (python -m pipelines.fit_projection)
+
+Projected vectors are re-normalised, so cosine search works unchanged.
+Projections are saved next to the collection (PROJECTION_DIR/<collection>.npz)
+with the name of the embedding model they were fitted for; a saved projection
+for another model is ignored. The backend (torch / onnx-int8) is not part of
+the key: both produce vectors in the same space. Until a PCA projection has
+been fitted the collection stays at full dimension. An existing collection
+keeps the width it was built with (and its saved projection) when
+VECTOR_PROJECTION changes, until fit_projection rebuilds it; a narrower
+collection whose projection is missing refuses to open rather than being
+recreated empty.
+"""
+import json
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTOR_PROJECTION = os.getenv("VECTOR_PROJECTION", "none").lower()  # none | truncate | pca
+VECTOR_DIM = int(os.getenv("VECTOR_DIM", "256"))
+PROJECTION_DIR = os.getenv("PROJECTION_DIR", "./data/projections")
+PCA_FIT_SAMPLE = int(os.getenv("PCA_FIT_SAMPLE", "20000"))
+
+
+class VectorProjection:
+    """Linear map from model-width vectors to `dim` dimensions, followed by L2 normalisation."""
+
+    def __init__(
+        self,
+        kind: str,
+        input_dim: int,
+        dim: int,
+        model_name: str = "",
+        components: Optional[np.ndarray] = None,
+    ):
+        if kind not in ("truncate", "pca"):
+            raise ValueError(f"unknown projection: {kind}")
+        if not 0 < dim <= input_dim:
+            raise ValueError(f"projection dim must be in 1..{input_dim}, got {dim}")
+        if kind == "pca" and (components is None or components.shape != (dim, input_dim)):
+            raise ValueError("pca projection needs a (dim x input_dim) components matrix")
+        self.kind = kind
+        self.input_dim = input_dim
+        self.dim = dim
+        self.model_name = model_name
+        self.components = None if components is None else np.asarray(components, dtype=np.float32)
+
+    @classmethod
+    def fit_pca(cls, vectors: np.ndarray, dim: int, model_name: str = "") -> "VectorProjection":
+        """Principal components of a (n x input_dim) sample; needs n >= dim."""
+        x = np.asarray(vectors, dtype=np.float32)
+        if x.shape[0] < dim:
+            raise ValueError(f"PCA to {dim} dims needs at least {dim} sample vectors, got {x.shape[0]}")
+        # Uncentred SVD: the rank-`dim` subspace that best preserves dot products
+        # (centring would shift every document's score by its own mean term)
+        _, s, vt = np.linalg.svd(x, full_matrices=False)
+        explained = float((s[:dim] ** 2).sum() / max((s ** 2).sum(), 1e-12))
+        logger.info(f"[Projection] PCA {x.shape[1]} → {dim} dims keeps {explained:.1%} of the energy.")
+        return cls("pca", x.shape[1], dim, model_name, components=vt[:dim])
+
+    def apply(self, vectors: np.ndarray) -> np.ndarray:
+        """Project (n x input_dim) or (input_dim,) vectors; returns normalised float32."""
+        x = np.asarray(vectors, dtype=np.float32)
+        if self.kind == "truncate":
+            out = x[..., :self.dim]
+        else:
+            out = x @ self.components.T
+        norms = np.linalg.norm(out, axis=-1, keepdims=True)
+        return np.ascontiguousarray(out / np.clip(norms, 1e-12, None), dtype=np.float32)
+
+    # ── Persistence ───────────────────────────────────────────────────────────
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        info = {"kind": self.kind, "input_dim": self.input_dim, "dim": self.dim, "model_name": self.model_name}
+        arrays = {} if self.kind == "truncate" else {"components": self.components}
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, info=np.array(json.dumps(info)), **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "VectorProjection":
+        with np.load(path) as data:
+            info = json.loads(str(data["info"]))
+            # Older files store "model_id", the model name with an "@backend" suffix
+            model_name = info.get("model_name", info.get("model_id", "").split("@")[0])
+            return cls(
+                info["kind"], info["input_dim"], info["dim"], model_name,
+                components=data["components"] if "components" in data else None,
+            )
+
+
+def projection_path(collection_name: str) -> str:
+    return os.path.join(PROJECTION_DIR, f"{collection_name}.npz")
+
+
+def load_saved_projection(collection_name: str, input_dim: int, model_name: str) -> Optional[VectorProjection]:
+    """The projection saved with `collection_name`, if there is one for this model and width."""
+    path = projection_path(collection_name)
+    if not os.path.exists(path):
+        return None
+    try:
+        projection = VectorProjection.load(path)
+    except Exception as e:
+        logger.warning(f"[Projection] Could not load {path}: {e}")
+        return None
+    if (projection.model_name, projection.input_dim) != (model_name, input_dim):
+        logger.warning(
+            f"[Projection] {path} was fitted for {projection.model_name} ({projection.input_dim}-d), "
+            f"not {model_name} ({input_dim}-d); ignoring it."
+        )
+        return None
+    return projection
+
+
+def get_projection(collection_name: str, input_dim: int, model_name: str) -> Optional[VectorProjection]:
+    """
+    The projection configured for `collection_name`, or None for full-dimension
+    vectors (VECTOR_PROJECTION=none, or pca not fitted yet for this model/VECTOR_DIM).
+    """
+    if VECTOR_PROJECTION in ("", "none"):
+        return None
+    dim = min(VECTOR_DIM, input_dim)
+    if VECTOR_PROJECTION == "truncate":
+        return VectorProjection("truncate", input_dim, dim, model_name)
+    if VECTOR_PROJECTION != "pca":
+        logger.warning(f"[Projection] Unknown VECTOR_PROJECTION={VECTOR_PROJECTION!r}; using full dimension.")
+        return None
+    projection = load_saved_projection(collection_name, input_dim, model_name)
+    if projection is None or projection.kind != "pca" or projection.dim != dim:
+        logger.warning(
+            f"[Projection] No {dim}-d PCA fitted for '{collection_name}'; using full dimension. "
+            "Run: python -m pipelines.fit_projection"
+        )
+        return None
+    return projection
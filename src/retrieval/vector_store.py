@@ -7,6 +7,20 @@ from typing import List, Tuple, Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
+# Metadata kept in the Qdrant payload when chunk text lives in the chunk text
+# store (src/retrieval/chunk_store.py): what we filter and cite on. Each gets a
+# payload index (integer for QDRANT_INTEGER_FIELDS, keyword otherwise).
+QDRANT_PAYLOAD_FIELDS = tuple(
+    f.strip() for f in os.getenv("QDRANT_PAYLOAD_FIELDS", "source,page,file_hash,type").split(",") if f.strip()
+)
+QDRANT_INTEGER_FIELDS = tuple(
+    f.strip() for f in os.getenv("QDRANT_INTEGER_FIELDS", "page").split(",") if f.strip()
+)
+# Points per Qdrant upsert request when adding texts
+QDRANT_UPLOAD_BATCH = int(os.getenv("QDRANT_UPLOAD_BATCH", "256"))
+# local: embedded on-disk Qdrant at QDRANT_PATH; server: a Qdrant server at QDRANT_URL
+QDRANT_MODE = os.getenv("QDRANT_MODE", "local").lower()
+
 
 class QdrantVectorStore:
     """
@@ -16,18 +30,49 @@ class QdrantVectorStore:
     - Bug 2: uuid.uuid4() directly (not the redundant double-wrap)
     - Bug 3: get_document_count() uses client.count() — points_count is deprecated
     - Bug 4: _memory is a true fallback; only populated when Qdrant fails
+
+    Point IDs may be supplied by the caller (deterministic content-addressed IDs,
+    see src/ingestion/ingestion_utils.point_id) so re-ingestion can skip
+    unchanged chunks and delete stale ones per source.
+
+    Points that Qdrant rejects are kept in the fallback index
+    (src/retrieval/fallback_index.py), searched together with Qdrant and replayed
+    into it by reconcile_fallback() at start-up and after the next successful
+    upsert.
+
+    Chunk text and non-filter metadata go to the chunk text store; payloads
+    hold only QDRANT_PAYLOAD_FIELDS. search_points() returns IDs and those
+    small payloads, materialize() fetches text for the hits that are used.
+
+    Quantization, on-disk storage and HNSW build parameters follow
+    QDRANT_PROFILE; each search takes a search profile (fast / balanced /
+    exact) that sets its effort (src/retrieval/collection_profile.py).
+
+    Searches take structured metadata filters (src/retrieval/filters.py),
+    applied by Qdrant inside the search and backed by payload indexes.
     """
 
     def __init__(
         self,
         path: str = "./data/qdrant_db",
         collection_name: str = "enterprise_knowledge",
+        rebuild: bool = False,
     ):
+        """
+        rebuild=True opens a collection whose vectors cannot be reproduced
+        (projected, but the projection is lost) so reproject() can rebuild
+        it; otherwise such a collection refuses to start.
+        """
         base_path = os.getenv("QDRANT_PATH", path)
+        self.rebuild = rebuild
         self.path = base_path
         self.collection_name = os.getenv("QDRANT_COLLECTION", collection_name)
         self.score_threshold = float(os.getenv("SCORE_THRESHOLD", "0.0"))
-        self._memory: List[Tuple[str, dict, list]] = []  # (text, meta, vector) — fallback only
+        from src.retrieval.fallback_index import open_fallback_index
+        self._memory = open_fallback_index(self.collection_name)  # points Qdrant rejected — fallback only
+
+        from src.retrieval.chunk_store import get_chunk_store
+        self.chunk_store = get_chunk_store(self.collection_name)
 
         # ── Initialise Qdrant client ──────────────────────────────────────────
         self.client = self._init_client()
@@ -35,17 +80,36 @@ class QdrantVectorStore:
         # ── Load embedding model (cached singleton) ───────────────────────────
         from src.retrieval.models import get_embedding_model
         self.model = get_embedding_model()
-        self.dimension = self.model.get_sentence_embedding_dimension()
-        logger.info(f"Using embedding model singleton (dim={self.dimension})")
+        self.model_dimension = self.model.get_sentence_embedding_dimension()
+        logger.info(f"Using embedding model singleton (dim={self.model_dimension})")
+
+        # ── Optional reduced-dimension projection (src/retrieval/projection.py) ─
+        from src.retrieval.models import get_embedding_model_name
+        from src.retrieval.projection import get_projection
+        self.projection = get_projection(self.collection_name, self.model_dimension, get_embedding_model_name())
+        self.dimension = self.projection.dim if self.projection else self.model_dimension
+
+        # ── Storage profile: quantization / on-disk vectors and payload ───────
+        from src.retrieval.collection_profile import load_profile
+        self.profile = load_profile()
 
         # ── Ensure collection exists ──────────────────────────────────────────
         self._ensure_collection()
 
+        # ── Replay points written to the fallback while Qdrant was failing ────
+        if len(self._memory):
+            self.reconcile_fallback()
+
     def _init_client(self):
         """Initialise QdrantClient with robust fallback on lock conflicts."""
         from qdrant_client import QdrantClient
         import random
 
+        if QDRANT_MODE == "server":
+            url = os.getenv("QDRANT_URL", "http://localhost:6333")
+            logger.info(f"Connecting to Qdrant server at {url}")
+            return QdrantClient(url=url, api_key=os.getenv("QDRANT_API_KEY") or None)
+
         os.makedirs(self.path, exist_ok=True)
         try:
             client = QdrantClient(path=self.path)
@@ -74,60 +138,215 @@ class QdrantVectorStore:
                     return QdrantClient(":memory:")
 
     def _ensure_collection(self):
-        from qdrant_client.http.models import Distance, VectorParams
-
         try:
             info = self.client.get_collection(self.collection_name)
+        except Exception:
+            info = None
+        if info is not None:
             existing_dim = info.config.params.vectors.size
+            if existing_dim != self.dimension:
+                # VECTOR_PROJECTION changed since the collection was built: keep
+                # using what it was built with until fit_projection rebuilds it
+                self._adopt_existing_projection(existing_dim)
+            if existing_dim != self.dimension and existing_dim < self.model_dimension:
+                # Built with a projection we cannot reproduce: recreating would
+                # silently drop every indexed document
+                from src.retrieval.models import get_embedding_model_name
+                from src.retrieval.projection import projection_path
+                message = (
+                    f"Collection '{self.collection_name}' holds {existing_dim}-d vectors but no matching "
+                    f"projection for {self.model_dimension}-d model {get_embedding_model_name()} is saved in "
+                    f"{projection_path(self.collection_name)}."
+                )
+                if not self.rebuild:
+                    raise RuntimeError(
+                        f"{message} Restore that file, or rebuild the collection "
+                        "with `python -m pipelines.fit_projection`."
+                    )
+                logger.warning(f"{message} Keeping it until reproject() rebuilds it.")
+                return
             if existing_dim != self.dimension:
                 logger.warning(
                     f"Collection dimension mismatch ({existing_dim} vs {self.dimension}). "
                     "Recreating collection."
                 )
                 self.client.delete_collection(self.collection_name)
-                raise Exception("dimension mismatch — recreate")
-        except Exception:
+                from src.ingestion.near_dedup import clear_fingerprint_index
+                clear_fingerprint_index(self)
+                info = None
+        if info is None:
             self.client.create_collection(
                 collection_name=self.collection_name,
-                vectors_config=VectorParams(
-                    size=self.dimension, distance=Distance.COSINE
-                ),
+                vectors_config=self.profile.vectors_config(self.dimension),
+                quantization_config=self.profile.quantization_config(),
+                on_disk_payload=self.profile.on_disk_payload,
+                hnsw_config=self.profile.hnsw_config(),
+            )
+            if self.projection is not None:
+                from src.retrieval.projection import projection_path
+                self.projection.save(projection_path(self.collection_name))
+            logger.info(
+                f"Created Qdrant collection '{self.collection_name}' "
+                f"(dim={self.dimension}, profile={self.profile.name})"
             )
-            logger.info(f"Created Qdrant collection '{self.collection_name}' (dim={self.dimension})")
+            self._ensure_payload_indexes(set())
+            return
+        self._apply_profile(info)
+        self._ensure_payload_indexes(set(info.payload_schema or {}))
+
+    def _ensure_payload_indexes(self, existing: set):
+        """Payload index per filterable field, so filtered searches do not scan payloads."""
+        from qdrant_client.http.models import PayloadSchemaType
+
+        from src.retrieval.filters import ALIASES
+
+        if QDRANT_MODE != "server":
+            return  # embedded Qdrant has no payload indexes (filters are applied by scan)
+        # A `source` condition also tests `also_in` (near-duplicate files)
+        fields = list(QDRANT_PAYLOAD_FIELDS) + [ALIASES[f] for f in QDRANT_PAYLOAD_FIELDS if f in ALIASES]
+        for field in fields:
+            if field in existing:
+                continue
+            schema = PayloadSchemaType.INTEGER if field in QDRANT_INTEGER_FIELDS else PayloadSchemaType.KEYWORD
+            try:
+                self.client.create_payload_index(
+                    collection_name=self.collection_name, field_name=field, field_schema=schema, wait=False
+                )
+                logger.info(f"Created {schema.value} payload index on '{field}'")
+            except Exception as e:
+                logger.warning(f"Could not create payload index on '{field}': {e}")
+
+    def _apply_profile(self, info):
+        """Bring an existing collection's quantization / on-disk / HNSW settings in line with the profile."""
+        from qdrant_client.http import models as qm
+
+        if QDRANT_MODE != "server":
+            # Embedded Qdrant drops quantization configs and always searches exactly
+            if self.profile.quantization != "none":
+                logger.info(f"QDRANT_PROFILE={self.profile.name}: quantization only takes effect with QDRANT_MODE=server")
+            return
+        params = info.config.params
+        wanted = self.profile.quantization_config()
+        current = info.config.quantization_config
+        changes = {}
+        if (current.model_dump() if current else None) != (wanted.model_dump() if wanted else None):
+            changes["quantization_config"] = wanted if wanted is not None else qm.Disabled.DISABLED
+        if bool(params.vectors.on_disk) != self.profile.on_disk_vectors:
+            changes["vectors_config"] = {"": qm.VectorParamsDiff(on_disk=self.profile.on_disk_vectors)}
+        if bool(params.on_disk_payload) != self.profile.on_disk_payload:
+            changes["collection_params"] = qm.CollectionParamsDiff(on_disk_payload=self.profile.on_disk_payload)
+        hnsw = info.config.hnsw_config
+        if (hnsw.m, hnsw.ef_construct) != (self.profile.hnsw_m, self.profile.hnsw_ef_construct):
+            changes["hnsw_config"] = self.profile.hnsw_config()
+        if changes:
+            # Qdrant rebuilds the affected segments in the background; search keeps working
+            self.client.update_collection(collection_name=self.collection_name, **changes)
+            logger.info(f"Updated collection '{self.collection_name}' to profile {self.profile.name}: {sorted(changes)}")
+
+    def _adopt_existing_projection(self, existing_dim: int):
+        from src.retrieval.models import get_embedding_model_name
+        from src.retrieval.projection import load_saved_projection
+
+        if existing_dim == self.model_dimension:
+            projection = None
+        else:
+            projection = load_saved_projection(self.collection_name, self.model_dimension, get_embedding_model_name())
+            if projection is None or projection.dim != existing_dim:
+                return
+        logger.warning(
+            f"Collection '{self.collection_name}' was built with {existing_dim}-d vectors "
+            f"({projection.kind if projection else 'no'} projection), not {self.dimension}-d; "
+            "keeping it. Run `python -m pipelines.fit_projection` to rebuild."
+        )
+        self.projection = projection
+        self.dimension = existing_dim
+
+    def index_settings(self) -> Dict[str, Any]:
+        """Effective collection settings (as Qdrant reports them) and per-search-profile parameters."""
+        from src.retrieval.collection_profile import SEARCH_PROFILE, SEARCH_PROFILES
 
-    def _qdrant_search(self, query_vec: list, k: int, score_threshold: float):
+        settings: Dict[str, Any] = {"qdrant_mode": QDRANT_MODE, **self.profile.as_dict()}
+        try:
+            config = self.client.get_collection(self.collection_name).config
+            settings["hnsw_m"] = config.hnsw_config.m
+            settings["hnsw_ef_construct"] = config.hnsw_config.ef_construct
+        except Exception as e:
+            logger.warning(f"Could not read collection config: {e}")
+        settings["default_search_profile"] = SEARCH_PROFILE
+        settings["search_profiles"] = {name: self.profile.search_settings(name) for name in SEARCH_PROFILES}
+        if QDRANT_MODE != "server":
+            settings["search_note"] = "embedded Qdrant searches exactly; search profiles apply in server mode"
+        return settings
+
+    def check_filters(self, filters: Optional[dict]) -> dict:
+        """
+        Normalised `filters` (src/retrieval/filters.py). ValueError for malformed
+        filters, or for fields that are not in the Qdrant payload (with the
+        chunk text store, only QDRANT_PAYLOAD_FIELDS are).
         """
+        from src.retrieval.filters import normalize_filters
+
+        filters = normalize_filters(filters)
+        if self.chunk_store is not None:
+            unknown = sorted(set(filters) - set(QDRANT_PAYLOAD_FIELDS))
+            if unknown:
+                raise ValueError(
+                    f"cannot filter on {', '.join(unknown)}: not stored in the Qdrant payload "
+                    "(add to QDRANT_PAYLOAD_FIELDS and re-ingest)"
+                )
+        return filters
+
+    def _qdrant_search_batch(
+        self,
+        query_vecs: List[list],
+        k: int,
+        score_threshold: float,
+        search_profile: Optional[str] = None,
+        query_filter=None,
+    ):
+        """
+        Search several query vectors in one request; returns one hit list per vector.
         Compatibility layer for qdrant-client versions:
-        - Older versions expose `search(...)`
-        - Newer versions expose `query_points(...)`
+        - Older versions expose `search_batch(...)`
+        - Newer versions expose `query_batch_points(...)`
+        Payload "text" (points written before the chunk text store) is never returned.
         """
-        if hasattr(self.client, "search"):
-            return self.client.search(
+        from qdrant_client.http import models as qm
+
+        with_payload = qm.PayloadSelectorExclude(exclude=["text"])
+        threshold = score_threshold if score_threshold > 0.0 else None
+        # hnsw_ef / exact / quantization rescoring (embedded Qdrant always searches exactly)
+        params = self.profile.search_params(search_profile) if QDRANT_MODE == "server" else None
+        if hasattr(self.client, "search_batch"):
+            return self.client.search_batch(
                 collection_name=self.collection_name,
-                query_vector=query_vec,
-                limit=k,
-                score_threshold=score_threshold if score_threshold > 0.0 else None,
+                requests=[
+                    qm.SearchRequest(
+                        vector=v, filter=query_filter, limit=k, score_threshold=threshold,
+                        with_payload=with_payload, params=params,
+                    )
+                    for v in query_vecs
+                ],
             )
 
-        if hasattr(self.client, "query_points"):
-            result = self.client.query_points(
+        if hasattr(self.client, "query_batch_points"):
+            responses = self.client.query_batch_points(
                 collection_name=self.collection_name,
-                query=query_vec,
-                limit=k,
-                score_threshold=score_threshold if score_threshold > 0.0 else None,
+                requests=[
+                    qm.QueryRequest(
+                        query=v, filter=query_filter, limit=k, score_threshold=threshold,
+                        with_payload=with_payload, params=params,
+                    )
+                    for v in query_vecs
+                ],
             )
-            points = getattr(result, "points", None)
-            if points is not None:
-                return points
-            if isinstance(result, tuple) and result:
-                return result[0]
-            return result
+            return [getattr(r, "points", r) for r in responses]
 
-        raise AttributeError("Qdrant client has neither 'search' nor 'query_points'")
+        raise AttributeError("Qdrant client has neither 'search_batch' nor 'query_batch_points'")
 
     # ── Public API ────────────────────────────────────────────────────────────
 
-    def add_documents(self, documents: list):
+    def add_documents(self, documents: list, ids: Optional[List[str]] = None):
         """Accept dicts or LangChain Document objects."""
         def _extract(d):
             if hasattr(d, "page_content"):
@@ -137,84 +356,203 @@ class QdrantVectorStore:
             return str(d), {}
 
         pairs = [_extract(doc) for doc in documents]
-        texts = [p[0] for p in pairs]
-        metas = [p[1] for p in pairs]
+        ids = ids if ids is not None else [None] * len(pairs)
         # Filter empty texts
-        filtered = [(t, m) for t, m in zip(texts, metas) if t and t.strip()]
+        filtered = [(t, m, i) for (t, m), i in zip(pairs, ids) if t and t.strip()]
         if not filtered:
             return
-        self.add_texts([t for t, m in filtered], [m for t, m in filtered])
+        self.add_texts(
+            [t for t, m, i in filtered],
+            [m for t, m, i in filtered],
+            ids=[i for t, m, i in filtered],
+        )
 
-    def add_texts(self, texts: List[str], metadatas: List[Dict[str, Any]]):
-        """Encode texts and upsert into Qdrant. Falls back to in-memory only on failure."""
-        from qdrant_client.http.models import PointStruct
+    def add_texts(
+        self,
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        ids: Optional[List[Optional[str]]] = None,
+    ):
+        """
+        Encode texts and upsert into Qdrant. On failure the points go to the
+        fallback index (on disk unless FALLBACK_INDEX=0) until reconciled.
+        `ids` are optional point IDs; missing ones get a random uuid4.
+        """
+        from src.retrieval.embedding_cache import encode_documents
+        from src.retrieval.models import get_embedding_model_id
+        # Contiguous float32 (n x dim); the client converts it per upload batch
+        vectors = encode_documents(self.model, texts, get_embedding_model_id())
+        if self.projection is not None:
+            vectors = self.projection.apply(vectors)
 
-        vectors = self.model.encode(
-            texts, normalize_embeddings=True, show_progress_bar=False
-        ).tolist()
-
-        # Bug 2 Fix: uuid.uuid4() returns a uuid.UUID directly — no double-wrap needed
-        points = []
-        for text, meta, vec in zip(texts, metadatas, vectors):
-            payload = {"text": text, **{
-                k: (str(v) if not isinstance(v, (str, int, float, bool)) else v)
-                for k, v in meta.items()
-            }}
-            points.append(
-                PointStruct(
-                    id=uuid.uuid4(),   # ← Direct uuid.UUID, no redundant str() wrapping
-                    vector=vec,
-                    payload=payload,
-                )
-            )
+        # Point IDs are canonical UUID strings (deterministic uuid5 or random uuid4)
+        ids = [str(i) if i else str(uuid.uuid4()) for i in (ids or [None] * len(texts))]
+        payloads = self._payloads(ids, texts, metadatas)
 
         # Bug 4 Fix: Only append to _memory when Qdrant fails (true fallback, not always)
         try:
-            if points:
-                self.client.upsert(
-                    collection_name=self.collection_name, points=points
+            if ids:
+                self.client.upload_collection(
+                    collection_name=self.collection_name, vectors=vectors,
+                    payload=payloads, ids=ids, batch_size=QDRANT_UPLOAD_BATCH, wait=True,
                 )
-                logger.info(f"Upserted {len(points)} points into Qdrant.")
+                logger.info(f"Upserted {len(ids)} points into Qdrant.")
                 # Qdrant succeeded — do NOT populate _memory (prevents RAM leak)
         except Exception as e:
-            logger.warning(f"Qdrant upsert failed — using in-memory fallback: {e}")
-            # Only on failure do we populate the in-memory store
-            for text, meta, vec in zip(texts, metadatas, vectors):
-                self._memory.append((text, meta, vec))
+            logger.warning(f"Qdrant upsert failed — using fallback index: {e}")
+            # Only on failure do we populate the fallback index
+            self._memory.add(ids, texts, metadatas, vectors)
+            return
+        if len(self._memory):
+            self.reconcile_fallback()
+
+    def reconcile_fallback(self, batch_size: int = QDRANT_UPLOAD_BATCH) -> int:
+        """
+        Upsert points from the fallback index into Qdrant and remove them from
+        the fallback. Stops at the first failed batch (Qdrant still down).
+        Returns the number of points moved.
+        """
+        from src.retrieval.embedding_cache import encode_documents
+        from src.retrieval.models import get_embedding_model_id
+
+        pending = self._memory.ids()
+        moved = 0
+        for start in range(0, len(pending), batch_size):
+            ids = pending[start:start + batch_size]
+            found = self._memory.get_many(ids)
+            ids = [pid for pid in ids if pid in found]
+            texts = [found[pid][0] for pid in ids]
+            metas = [found[pid][1] for pid in ids]
+            if self._memory.dim == self.dimension:
+                vectors = self._memory.vectors(ids)
+            else:  # stored before a projection change: re-embed (embedding cache hits)
+                vectors = encode_documents(self.model, texts, get_embedding_model_id())
+                if self.projection is not None:
+                    vectors = self.projection.apply(vectors)
+            try:
+                self.client.upload_collection(
+                    collection_name=self.collection_name, vectors=vectors,
+                    payload=self._payloads(ids, texts, metas), ids=ids,
+                    batch_size=batch_size, wait=True,
+                )
+            except Exception as e:
+                logger.warning(f"Fallback reconciliation stopped, Qdrant still failing: {e}")
+                break
+            self._memory.remove(ids)
+            moved += len(ids)
+        if moved:
+            logger.info(f"Reconciled {moved} fallback points into Qdrant ({len(self._memory)} left).")
+        return moved
 
     def similarity_search(
         self,
         query: str,
         k: int = 20,
         score_threshold: float = 0.0,
+        search_profile: Optional[str] = None,
+        filters: Optional[dict] = None,
     ) -> List[Tuple[str, dict, float]]:
         """
         Return top-k (text, metadata, score) tuples for a query.
+        search_profile: "fast" | "balanced" | "exact" (default SEARCH_PROFILE).
+        filters: metadata conditions, e.g. {"source": "x.pdf", "page": {"gte": 3}}.
         Falls back to in-memory cosine search if Qdrant fails.
         """
-        query_vec = self.model.encode(
-            [query], normalize_embeddings=True
-        )[0].tolist()
+        return self.materialize(self.search_points(query, k, score_threshold, search_profile, filters))
 
+    def search_points(
+        self,
+        query: str,
+        k: int = 20,
+        score_threshold: float = 0.0,
+        search_profile: Optional[str] = None,
+        filters: Optional[dict] = None,
+    ) -> List[Tuple[str, dict, float]]:
+        """
+        Return top-k (point_id, payload, score) tuples for a query, without text.
+        Falls back to in-memory cosine search if Qdrant fails.
+        """
+        return self.search_points_many([query], k, score_threshold, search_profile, filters)[0]
+
+    def search_points_many(
+        self,
+        queries: List[str],
+        k: int = 20,
+        score_threshold: float = 0.0,
+        search_profile: Optional[str] = None,
+        filters: Optional[dict] = None,
+    ) -> List[List[Tuple[str, dict, float]]]:
+        """
+        search_points() for several queries at once: the queries are embedded
+        in one forward pass (cached ones not at all) and searched in one Qdrant
+        request. Returns one hit list per query, in order.
+        """
+        from src.retrieval.collection_profile import resolve_search_profile
+        from src.retrieval.embedding_cache import encode_queries
+        from src.retrieval.embedding_dispatcher import query_encoder
+        from src.retrieval.filters import matches, to_qdrant_filter
+        from src.retrieval.models import get_embedding_model_id
+
+        # ValueError before any work
+        search_profile = resolve_search_profile(search_profile)
+        filters = self.check_filters(filters)
+
+        query_vecs = encode_queries(query_encoder(self.model), queries, get_embedding_model_id())
+        if self.projection is not None:
+            query_vecs = self.projection.apply(query_vecs)
         effective_threshold = score_threshold if score_threshold > 0.0 else self.score_threshold
 
         # ── Qdrant search ─────────────────────────────────────────────────────
+        batches: List[list] = [[] for _ in queries]
         try:
-            results = self._qdrant_search(query_vec, k, effective_threshold)
-            if results:
-                return [
-                    (
-                        r.payload.get("text", ""),
-                        {k: v for k, v in r.payload.items() if k != "text"},
-                        getattr(r, "score", 0.0),
-                    )
-                    for r in results
-                ]
+            batches = self._qdrant_search_batch(
+                query_vecs.tolist(), k, effective_threshold, search_profile, to_qdrant_filter(filters)
+            )
         except Exception as e:
             logger.warning(f"Qdrant search failed, falling back to in-memory: {e}")
+        out = [
+            [(str(r.id), dict(r.payload or {}), getattr(r, "score", 0.0)) for r in results]
+            for results in batches
+        ]
+
+        # ── Points only in the fallback index (not yet reconciled) ────────────
+        if len(self._memory) and self._memory.dim == query_vecs.shape[1]:
+            where = (lambda meta: matches(meta, filters)) if filters else None
+            for i, extra in enumerate(self._memory.search(query_vecs, k, effective_threshold, where)):
+                if extra:
+                    best = {pid: (pid, payload, score) for pid, payload, score in out[i] + extra[::-1]}
+                    out[i] = sorted(best.values(), key=lambda h: h[2], reverse=True)[:k]
+        return out
 
-        # ── In-memory cosine search fallback ─────────────────────────────────
-        return self._memory_search(query_vec, k, effective_threshold)
+    def materialize(self, hits: List[Tuple[str, dict, float]]) -> List[Tuple[str, dict, float]]:
+        """
+        Turn search_points() hits into (text, metadata, score) tuples, reading
+        text from the in-memory fallback, the chunk text store or, for points
+        stored with their text in the payload, Qdrant itself.
+        """
+        ids = [pid for pid, _payload, _score in hits]
+        found: Dict[str, Tuple[str, dict]] = self._memory.get_many(ids)
+        if self.chunk_store is not None:
+            missing = [pid for pid in ids if pid not in found]
+            if missing:
+                found.update(self.chunk_store.get_many(missing))
+        missing = [pid for pid in ids if pid not in found]
+        if missing:
+            try:
+                for p in self.client.retrieve(
+                    collection_name=self.collection_name,
+                    ids=missing,
+                    with_payload=["text"],
+                    with_vectors=False,
+                ):
+                    found[str(p.id)] = ((p.payload or {}).get("text", ""), {})
+            except Exception as e:
+                logger.warning(f"Could not fetch text for {len(missing)} points: {e}")
+        out = []
+        for pid, payload, score in hits:
+            text, meta = found.get(pid, ("", {}))
+            out.append((text, {**meta, **payload}, score))
+        return out
 
     def get_document_count(self) -> int:
         """Return number of indexed vectors (for diagnostics)."""
@@ -230,6 +568,135 @@ class QdrantVectorStore:
             # Fallback to in-memory count (only populated if Qdrant failed)
             return len(self._memory)
 
+    def get_source_state(self, source: str) -> Dict[str, Optional[str]]:
+        """
+        Return {point_id: file_hash} for every stored chunk of `source`.
+        Used by incremental ingestion to skip unchanged files and find stale chunks.
+        """
+        from qdrant_client.http.models import FieldCondition, Filter, MatchValue
+
+        state = {
+            pid: meta.get("file_hash")
+            for pid, _text, meta in self._memory.items()
+            if meta.get("source") == source
+        }
+        try:
+            flt = Filter(must=[FieldCondition(key="source", match=MatchValue(value=source))])
+            offset = None
+            while True:
+                points, offset = self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=flt,
+                    limit=1024,
+                    offset=offset,
+                    with_payload=["file_hash"],
+                    with_vectors=False,
+                )
+                for p in points:
+                    state[str(p.id)] = (p.payload or {}).get("file_hash")
+                if offset is None:
+                    break
+        except Exception as e:
+            logger.warning(f"Could not read stored state for '{source}': {e}")
+        return state
+
+    def existing_points(self, ids: List[str]) -> set:
+        """The subset of `ids` stored in Qdrant or the fallback index."""
+        found = set(self._memory.get_many(ids))
+        missing = [pid for pid in ids if pid not in found]
+        if missing:
+            found.update(
+                str(p.id) for p in self.client.retrieve(
+                    collection_name=self.collection_name, ids=missing,
+                    with_payload=False, with_vectors=False,
+                )
+            )
+        return found
+
+    def delete_points(self, ids: List[str]):
+        """Delete points by ID from Qdrant and the in-memory fallback."""
+        if not ids:
+            return
+        from qdrant_client.http.models import PointIdsList
+
+        drop = set(ids)
+        self._memory.remove(drop)
+        if self.chunk_store is not None:
+            self.chunk_store.delete(list(drop))
+        try:
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=list(drop)),
+            )
+            logger.info(f"Deleted {len(drop)} stale points from Qdrant.")
+        except Exception as e:
+            logger.warning(f"Qdrant delete failed: {e}")
+
+    def set_file_hash(self, ids: List[str], file_hash: str):
+        """Stamp unchanged chunks with the file hash of the latest ingested version."""
+        self.update_payload(ids, {"file_hash": file_hash})
+
+    def update_payload(self, ids: List[str], fields: Dict[str, Any]):
+        """Overwrite metadata `fields` on existing points (vectors untouched)."""
+        if not ids:
+            return
+        keep = set(ids)
+        self._memory.update_metadata(keep, fields)
+        try:
+            self.client.set_payload(
+                collection_name=self.collection_name,
+                payload=fields,
+                points=list(keep),
+            )
+        except Exception as e:
+            logger.warning(f"Qdrant set_payload failed: {e}")
+
+    def sample_texts(self, n: int, seed: int = 0) -> List[str]:
+        """Text of up to `n` randomly chosen stored chunks (e.g. to fit a projection)."""
+        import random
+        ids = [pid for pid, _payload in self._scroll_points(with_payload=False)]
+        ids = random.Random(seed).sample(ids, min(n, len(ids)))
+        return [text for text, _meta, _score in self.materialize([(pid, {}, 0.0) for pid in ids])]
+
+    def reproject(self, projection, batch_size: int = 512) -> int:
+        """
+        Rebuild the collection with `projection` (None for full dimension):
+        re-embed every stored chunk (mostly embedding-cache hits), project it
+        and re-upload it with its payload. Returns the number of points.
+        Payloads are read up front; if the rebuild is interrupted, re-ingest.
+        """
+        from src.retrieval.embedding_cache import encode_documents
+        from src.retrieval.models import get_embedding_model_id
+
+        self.reconcile_fallback()
+        points = list(self._scroll_points(with_payload=True))
+        self.client.delete_collection(self.collection_name)
+        self.projection = projection
+        self.dimension = projection.dim if projection else self.model_dimension
+        self._ensure_collection()
+        model_id = get_embedding_model_id()
+        try:
+            for start in range(0, len(points), batch_size):
+                part = points[start:start + batch_size]
+                stored = self.chunk_store.get_many([pid for pid, _ in part]) if self.chunk_store is not None else {}
+                texts = [payload.get("text") or stored.get(pid, ("", {}))[0] for pid, payload in part]
+                vectors = encode_documents(self.model, texts, model_id)
+                if projection is not None:
+                    vectors = projection.apply(vectors)
+                self.client.upload_collection(
+                    collection_name=self.collection_name, vectors=vectors,
+                    payload=[payload for _, payload in part], ids=[pid for pid, _ in part],
+                    batch_size=QDRANT_UPLOAD_BATCH, wait=True,
+                )
+        except Exception:
+            # A complete rebuild keeps every point ID and payload, so the
+            # near-duplicate index stays valid; a partial one does not
+            from src.ingestion.near_dedup import clear_fingerprint_index
+            clear_fingerprint_index(self)
+            raise
+        logger.info(f"Rebuilt '{self.collection_name}' with {len(points)} points at dim={self.dimension}.")
+        return len(points)
+
     def clear(self):
         """Remove all documents from the store (use with caution)."""
         try:
@@ -238,33 +705,52 @@ class QdrantVectorStore:
         except Exception:
             pass
         self._memory.clear()
+        if self.chunk_store is not None:
+            self.chunk_store.clear()
+        from src.ingestion.near_dedup import clear_fingerprint_index
+        clear_fingerprint_index(self)
         logger.info("Vector store cleared.")
 
     # ── Private helpers ───────────────────────────────────────────────────────
 
-    def _memory_search(
-        self,
-        query_vec: list,
-        k: int,
-        score_threshold: float,
-    ) -> List[Tuple[str, dict, float]]:
-        import math
-
-        def _cos(a, b):
-            dot = sum(x * y for x, y in zip(a, b))
-            na = math.sqrt(sum(x * x for x in a))
-            nb = math.sqrt(sum(y * y for y in b))
-            return dot / (na * nb + 1e-8)
-
-        scored = [
-            (_cos(query_vec, vec), text, meta)
-            for text, meta, vec in self._memory
-        ]
-        scored.sort(key=lambda t: t[0], reverse=True)
-        top = scored[:k]
-        if score_threshold > 0.0:
-            top = [item for item in top if item[0] >= score_threshold]
-        return [(text, meta, score) for score, text, meta in top]
+    def _payloads(self, ids: List[str], texts: List[str], metadatas: List[dict]) -> List[dict]:
+        """
+        Qdrant payload per point. With the chunk text store, text and non-filter
+        metadata are written there first, so a point is never searchable without
+        its text, and the payload keeps QDRANT_PAYLOAD_FIELDS only.
+        """
+        payloads = []
+        stored = []
+        for pid, text, meta in zip(ids, texts, metadatas):
+            payload = {
+                k: (str(v) if not isinstance(v, (str, int, float, bool)) else v)
+                for k, v in meta.items()
+            }
+            if self.chunk_store is not None:
+                stored.append((pid, text, {k: v for k, v in payload.items() if k not in QDRANT_PAYLOAD_FIELDS}))
+                payload = {k: v for k, v in payload.items() if k in QDRANT_PAYLOAD_FIELDS}
+            else:
+                payload["text"] = text
+            payloads.append(payload)
+        if stored:
+            self.chunk_store.put(stored)
+        return payloads
+
+    def _scroll_points(self, with_payload: bool = True):
+        """Yield (point_id, payload) for every point in the collection."""
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=1024,
+                offset=offset,
+                with_payload=with_payload,
+                with_vectors=False,
+            )
+            for p in points:
+                yield str(p.id), dict(p.payload or {})
+            if offset is None:
+                break
 
 
 # ── PGVector store (unchanged, kept for compatibility) ────────────────────────
@@ -278,11 +764,8 @@ class PGVectorStore:
             raise ImportError(
                 "Install sqlalchemy, pgvector, and psycopg2-binary for PGVectorStore"
             )
-        from sentence_transformers import SentenceTransformer
-
-        self.model = SentenceTransformer(
-            os.getenv("EMBEDDING_MODEL", "BAAI/bge-large-en-v1.5")
-        )
+        from src.retrieval.models import get_embedding_model
+        self.model = get_embedding_model()
         self.dimension = self.model.get_sentence_embedding_dimension()
 
         if connection_string is None:
@@ -305,6 +788,7 @@ class PGVectorStore:
         class Embedding(Base):
             __tablename__ = table_name
             id = Column(Integer, primary_key=True)
+            point_id = Column(String(36), unique=True, index=True)
             text = Column(Text)
             metadata_json = Column(Text)
             embedding = Column(Vector(dim))
@@ -317,19 +801,53 @@ class PGVectorStore:
             conn.commit()
         Base.metadata.create_all(self.engine)
 
-    def add_documents(self, documents):
-        texts = [doc.page_content for doc in documents]
-        metadatas = [doc.metadata for doc in documents]
-        self.add_texts(texts, metadatas)
+        # Tables created before point_id existed: add the column in place
+        with self.engine.connect() as conn:
+            from sqlalchemy import text
+            conn.execute(text(
+                f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS point_id VARCHAR(36)"
+            ))
+            conn.execute(text(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{table_name}_point_id "
+                f"ON {table_name} (point_id)"
+            ))
+            # Serves the JSONB containment (@>) filters of similarity_search
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{table_name}_metadata "
+                f"ON {table_name} USING gin ((metadata_json::jsonb) jsonb_path_ops)"
+            ))
+            conn.commit()
+
+    def add_documents(self, documents, ids: Optional[List[str]] = None):
+        def _extract(d):
+            if isinstance(d, dict):
+                return d.get("page_content", ""), d.get("metadata", {})
+            return d.page_content, d.metadata
 
-    def add_texts(self, texts: List[str], metadatas: List[dict]):
+        pairs = [_extract(doc) for doc in documents]
+        self.add_texts([p[0] for p in pairs], [p[1] for p in pairs], ids=ids)
+
+    def add_texts(
+        self,
+        texts: List[str],
+        metadatas: List[dict],
+        ids: Optional[List[Optional[str]]] = None,
+    ):
         import json
-        vectors = self.model.encode(texts, normalize_embeddings=True).tolist()
+        from src.retrieval.embedding_cache import encode_documents
+        from src.retrieval.models import get_embedding_model_id
+        vectors = encode_documents(self.model, texts, get_embedding_model_id())
+        ids = [str(i) if i else str(uuid.uuid4()) for i in (ids or [None] * len(texts))]
         session = self.Session()
         try:
-            for text, meta, vec in zip(texts, metadatas, vectors):
+            # Upsert semantics: a re-ingested point_id replaces its old row
+            session.query(self.Embedding).filter(
+                self.Embedding.point_id.in_(ids)
+            ).delete(synchronize_session=False)
+            for pid, text, meta, vec in zip(ids, texts, metadatas, vectors):
                 session.add(
                     self.Embedding(
+                        point_id=pid,
                         text=text,
                         metadata_json=json.dumps(meta),
                         embedding=vec,
@@ -344,26 +862,129 @@ class PGVectorStore:
             session.close()
 
     def similarity_search(
-        self, query: str, k: int = 20, score_threshold: float = 0.0
+        self,
+        query: str,
+        k: int = 20,
+        score_threshold: float = 0.0,
+        search_profile: Optional[str] = None,
+        filters: Optional[dict] = None,
     ) -> List[Tuple[str, dict, float]]:
+        return self.similarity_search_many([query], k, score_threshold, search_profile, filters)[0]
+
+    def check_filters(self, filters: Optional[dict]) -> dict:
+        """Normalised `filters`; ValueError if malformed. Every metadata field is filterable here."""
+        from src.retrieval.filters import normalize_filters
+        return normalize_filters(filters)
+
+    def similarity_search_many(
+        self,
+        queries: List[str],
+        k: int = 20,
+        score_threshold: float = 0.0,
+        search_profile: Optional[str] = None,
+        filters: Optional[dict] = None,
+    ) -> List[List[Tuple[str, dict, float]]]:
+        """
+        similarity_search() for several queries, embedded in one forward pass.
+        search_profile maps to pgvector's hnsw.ef_search (fast / balanced) or
+        disables index scans (exact); filters become WHERE clauses of the
+        same query.
+        """
+        import json
+        from src.retrieval.collection_profile import SEARCH_EF_BALANCED, SEARCH_EF_FAST, resolve_search_profile
+        from src.retrieval.embedding_cache import encode_queries
+        from src.retrieval.embedding_dispatcher import query_encoder
+        from src.retrieval.filters import to_sql_clauses
+        from src.retrieval.models import get_embedding_model_id
+        from sqlalchemy import text
+
+        search_profile = resolve_search_profile(search_profile)
+        where = to_sql_clauses(self.Embedding.metadata_json, self.check_filters(filters))
+        query_vecs = encode_queries(
+            query_encoder(self.model), queries, get_embedding_model_id()
+        ).tolist()
+        session = self.Session()
+        try:
+            # SET LOCAL lasts for this transaction only
+            if search_profile == "exact":
+                session.execute(text("SET LOCAL enable_indexscan = off"))
+            else:
+                ef = SEARCH_EF_FAST if search_profile == "fast" else SEARCH_EF_BALANCED
+                session.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef)}"))
+            out = []
+            for query_vec in query_vecs:
+                rows = (
+                    session.query(self.Embedding)
+                    .filter(*where)
+                    .order_by(self.Embedding.embedding.cosine_distance(query_vec))
+                    .limit(k)
+                    .all()
+                )
+                out.append([(r.text, json.loads(r.metadata_json), 0.0) for r in rows])
+            return out
+        finally:
+            session.close()
+
+    def get_document_count(self) -> int:
+        session = self.Session()
+        try:
+            return session.query(self.Embedding).count()
+        finally:
+            session.close()
+
+    def _source_clause(self, source: str):
+        from sqlalchemy import cast
+        from sqlalchemy.dialects.postgresql import JSONB
+        return cast(self.Embedding.metadata_json, JSONB)["source"].astext == source
+
+    def get_source_state(self, source: str) -> Dict[str, Optional[str]]:
+        """Return {point_id: file_hash} for every stored chunk of `source`."""
         import json
-        query_vec = self.model.encode([query], normalize_embeddings=True)[0].tolist()
         session = self.Session()
         try:
             rows = (
-                session.query(self.Embedding)
-                .order_by(self.Embedding.embedding.cosine_distance(query_vec))
-                .limit(k)
+                session.query(self.Embedding.point_id, self.Embedding.metadata_json)
+                .filter(self._source_clause(source))
                 .all()
             )
-            return [(r.text, json.loads(r.metadata_json), 0.0) for r in rows]
+            return {pid: json.loads(meta).get("file_hash") for pid, meta in rows if pid}
         finally:
             session.close()
 
-    def get_document_count(self) -> int:
+    def existing_points(self, ids: List[str]) -> set:
         session = self.Session()
         try:
-            return session.query(self.Embedding).count()
+            rows = session.query(self.Embedding.point_id).filter(self.Embedding.point_id.in_(list(ids)))
+            return {pid for (pid,) in rows}
+        finally:
+            session.close()
+
+    def delete_points(self, ids: List[str]):
+        if not ids:
+            return
+        session = self.Session()
+        try:
+            session.query(self.Embedding).filter(
+                self.Embedding.point_id.in_(list(ids))
+            ).delete(synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+
+    def set_file_hash(self, ids: List[str], file_hash: str):
+        self.update_payload(ids, {"file_hash": file_hash})
+
+    def update_payload(self, ids: List[str], fields: Dict[str, Any]):
+        import json
+        if not ids:
+            return
+        session = self.Session()
+        try:
+            for row in session.query(self.Embedding).filter(self.Embedding.point_id.in_(list(ids))):
+                meta = json.loads(row.metadata_json)
+                meta.update(fields)
+                row.metadata_json = json.dumps(meta)
+            session.commit()
         finally:
             session.close()
 
@@ -0,0 +1,152 @@
+"""
+src/services/ingestion_jobs.py
+Background ingestion jobs for the API.
+
+/api/upload enqueues a job and returns its ID immediately; a small bounded
+thread pool runs run_ingestion() off the event loop. INGEST_WORKERS caps how
+many files are ingested at once (extraction, OCR and embedding compete with
+query traffic for CPU) and INGEST_MAX_QUEUED caps the backlog — beyond it new
+uploads are rejected instead of queueing without bound.
+"""
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+INGEST_MAX_QUEUED = int(os.getenv("INGEST_MAX_QUEUED", "16"))
+# Finished jobs kept for GET /api/jobs/{id}; the oldest are forgotten first
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "200"))
+
+TERMINAL_STATES = ("success", "error")
+
+
+class QueueFullError(RuntimeError):
+    """Raised by submit() when INGEST_MAX_QUEUED jobs are already waiting."""
+
+
+class IngestionJobManager:
+    """
+    Runs ingestion jobs on a bounded worker pool and tracks their progress.
+
+    Job states: queued → running → success | error. Progress counters
+    (pages_extracted, chunks_embedded, chunks_upserted) are updated from the
+    pipeline's progress callback while the job runs.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_queued: Optional[int] = None,
+        runner: Optional[Callable[..., Dict[str, Any]]] = None,
+    ):
+        self.workers = max(1, workers or INGEST_WORKERS)
+        self.max_queued = max(0, INGEST_MAX_QUEUED if max_queued is None else max_queued)
+        self._runner = runner or _run_ingestion
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest-job")
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ── Public API ───────────────────────────────────────────────────────────
+    def submit(self, file_path: str, cleanup_dir: Optional[str] = None, **kwargs) -> str:
+        """
+        Queue `file_path` for ingestion and return the job ID.
+
+        `cleanup_dir` (e.g. the upload's temp directory) is removed once the job
+        finishes. Extra kwargs are passed through to run_ingestion().
+        """
+        with self._lock:
+            queued = sum(1 for j in self._jobs.values() if j["status"] == "queued")
+            if queued >= self.max_queued:
+                raise QueueFullError(f"{queued} ingestion jobs already queued.")
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "filename": os.path.basename(file_path),
+                "status": "queued",
+                "progress": {"pages_extracted": 0, "chunks_embedded": 0, "chunks_upserted": 0},
+                "result": None,
+                "error": None,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "version": 0,
+            }
+            self._prune()
+        self._pool.submit(self._run, job_id, file_path, cleanup_dir, kwargs)
+        logger.info(f"[Jobs] Queued {job_id} for {os.path.basename(file_path)}.")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Snapshot of a job, or None if unknown (or already forgotten)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return _snapshot(job) if job else None
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+    # ── Worker side ──────────────────────────────────────────────────────────
+    def _run(self, job_id: str, file_path: str, cleanup_dir: Optional[str], kwargs: dict) -> None:
+        self._update(job_id, status="running", started_at=time.time())
+
+        def _progress(**counts):
+            self._update(job_id, progress=counts)
+
+        final: Dict[str, Any] = {}
+        try:
+            result = self._runner(file_path, progress=_progress, **kwargs)
+            status = "error" if result.get("status") == "error" else "success"
+            final = {"status": status, "result": result, "error": result.get("error")}
+        except Exception as e:
+            logger.error(f"[Jobs] {job_id} failed: {e}")
+            final = {"status": "error", "error": str(e)}
+        finally:
+            if cleanup_dir:
+                shutil.rmtree(cleanup_dir, ignore_errors=True)
+            self._update(job_id, finished_at=time.time(), **final)
+
+    def _update(self, job_id: str, progress: Optional[dict] = None, **fields) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if progress:
+                job["progress"].update(progress)
+            job.update(fields)
+            job["version"] += 1
+
+    def _prune(self) -> None:
+        # Caller holds the lock
+        finished = [jid for jid, j in self._jobs.items() if j["status"] in TERMINAL_STATES]
+        for jid in finished[: max(0, len(finished) - INGEST_JOB_HISTORY)]:
+            del self._jobs[jid]
+
+
+def _snapshot(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {**job, "progress": dict(job["progress"])}
+
+
+def _run_ingestion(file_path: str, **kwargs) -> Dict[str, Any]:
+    from pipelines.ingestion_pipeline import run_ingestion
+    return run_ingestion(file_path, **kwargs)
+
+
+_manager: Optional[IngestionJobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> IngestionJobManager:
+    """Process-wide IngestionJobManager singleton."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = IngestionJobManager()
+        return _manager
@@ -0,0 +1,26 @@
+"""
+tests/conftest.py
+Keep on-disk caches and indexes written during tests out of the working tree.
+Set before any src module is imported, and inherited by spawned worker processes.
+"""
+import os
+import tempfile
+
+import pytest
+
+os.environ.setdefault("EXTRACTION_CACHE_DIR", tempfile.mkdtemp(prefix="test-extraction-cache-"))
+os.environ.setdefault("CHUNK_TEXT_STORE_DIR", tempfile.mkdtemp(prefix="test-chunk-text-"))
+os.environ.setdefault("PROJECTION_DIR", tempfile.mkdtemp(prefix="test-projections-"))
+os.environ.setdefault("FALLBACK_INDEX_DIR", tempfile.mkdtemp(prefix="test-fallback-index-"))
+os.environ.setdefault(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(tempfile.mkdtemp(prefix="test-embedding-cache-"), "embeddings.sqlite3"),
+)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_fingerprint_index(tmp_path, monkeypatch):
+    """Near-duplicate fingerprints must not leak between tests."""
+    from src.ingestion import near_dedup
+    monkeypatch.setattr(near_dedup, "NEAR_DUP_INDEX_DIR", str(tmp_path / "fp"))
+    monkeypatch.setattr(near_dedup, "_indexes", {})
@@ -0,0 +1,220 @@
+"""
+tests/test_api.py
+API tests with FastAPI's TestClient. Ingestion runs through a fake runner,
+so no embedding model or vector store is needed.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import time
+
+import pytest
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from fastapi.testclient import TestClient
+    import app as app_module
+    from src.services import ingestion_jobs
+
+    seen = {}
+
+    def runner(file_path, progress=None, store=None, **kwargs):
+        with open(file_path, "rb") as f:
+            seen["content"] = f.read()
+        seen["filename"] = file_path
+        seen["file_hash"] = kwargs.get("file_hash")
+        progress(pages_extracted=1)
+        progress(chunks_embedded=3, chunks_upserted=3)
+        return {"status": "success", "filename": "notes.txt", "chunks_indexed": 3, "error": None}
+
+    manager = ingestion_jobs.IngestionJobManager(workers=1, runner=runner)
+    monkeypatch.setattr(ingestion_jobs, "_manager", manager)
+    monkeypatch.setattr(app_module, "_vector_store", lambda: None)
+    yield TestClient(app_module.app), seen
+    manager.shutdown()
+
+
+class TestUploadJobs:
+    def test_upload_returns_job_and_status_reports_result(self, client):
+        http, seen = client
+        resp = http.post("/api/upload", files={"file": ("notes.txt", b"hello world", "text/plain")})
+        assert resp.status_code == 202
+        body = resp.json()
+        assert body["status"] == "queued"
+
+        for _ in range(200):
+            job = http.get(f"/api/jobs/{body['job_id']}").json()
+            if job["status"] == "success":
+                break
+            time.sleep(0.02)
+        assert job["status"] == "success"
+        assert job["progress"] == {"pages_extracted": 1, "chunks_embedded": 3, "chunks_upserted": 3}
+        assert job["result"]["chunks_indexed"] == 3
+        assert seen["content"] == b"hello world"
+        assert seen["filename"].endswith("notes.txt")
+        assert seen["file_hash"] == body["sha256"] == hashlib.sha256(b"hello world").hexdigest()
+
+    def test_event_stream_ends_with_final_state(self, client):
+        import json
+        http, _ = client
+        job_id = http.post(
+            "/api/upload", files={"file": ("notes.txt", b"hello", "text/plain")}
+        ).json()["job_id"]
+        events = [
+            json.loads(line[len("data: "):])
+            for line in http.get(f"/api/jobs/{job_id}/events").text.splitlines()
+            if line.startswith("data: ")
+        ]
+        assert events[-1]["status"] == "success"
+
+    def test_unknown_job_is_404(self, client):
+        http, _ = client
+        assert http.get("/api/jobs/nope").status_code == 404
+
+    def test_unsupported_extension_rejected(self, client):
+        http, _ = client
+        resp = http.post("/api/upload", files={"file": ("x.exe", b"MZ", "application/octet-stream")})
+        assert resp.status_code == 400
+
+    def test_oversized_upload_rejected(self, client, monkeypatch):
+        import functools
+        import app as app_module
+        from src.api.api_utils import save_upload
+        http, seen = client
+        monkeypatch.setattr(app_module, "save_upload", functools.partial(save_upload, max_bytes=8))
+        resp = http.post("/api/upload", files={"file": ("big.txt", b"x" * 64, "text/plain")})
+        assert resp.status_code == 413
+        assert "content" not in seen
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# save_upload (streamed, size-capped upload spooling)
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestAsk:
+    def test_search_profile_reaches_retrieval(self, client, monkeypatch):
+        from pipelines import retrieval_pipeline
+        http, _ = client
+        calls = []
+
+        def fake_run_retrieval(question, history=None, store=None, search_profile=None, filters=None):
+            calls.append((question, search_profile))
+            return {"answer": "ok", "sources": [], "context_preview": "", "chunks_retrieved": 0}
+
+        monkeypatch.setattr(retrieval_pipeline, "run_retrieval", fake_run_retrieval)
+        assert http.post("/api/ask", json={"question": "audit?", "search_profile": "exact"}).status_code == 200
+        assert http.post("/api/ask", json={"question": "hi"}).status_code == 200
+        assert http.post("/api/ask", data={"question": "form", "search_profile": "fast"}).status_code == 200
+        assert http.post("/api/ask", json={"question": "hi", "search_profile": "slow"}).status_code == 422
+        assert http.post("/api/ask", json={"history": []}).status_code == 422
+        assert calls == [("audit?", "exact"), ("hi", None), ("form", "fast")]
+
+    def test_retrieval_runs_off_the_event_loop(self, client, monkeypatch):
+        import asyncio
+        from pipelines import retrieval_pipeline
+        http, _ = client
+        loops = []
+
+        def fake_run_retrieval(question, **kw):
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+            return {"answer": "ok", "sources": [], "context_preview": "", "chunks_retrieved": 0}
+
+        monkeypatch.setattr(retrieval_pipeline, "run_retrieval", fake_run_retrieval)
+        assert http.post("/api/ask", json={"question": "hi"}).status_code == 200
+        assert loops == [None]
+
+    def test_filters_are_validated_and_passed_on(self, client, monkeypatch):
+        from pipelines import retrieval_pipeline
+        http, _ = client
+        calls = []
+        monkeypatch.setattr(retrieval_pipeline, "run_retrieval", lambda q, **kw: calls.append(kw["filters"]) or {
+            "answer": "ok", "sources": [], "context_preview": "", "chunks_retrieved": 0,
+        })
+        filters = {"source": "contract_x.pdf", "page": {"gte": 2}}
+        assert http.post("/api/ask", json={"question": "q", "filters": filters}).status_code == 200
+        assert http.post("/api/ask", data={"question": "q", "filters": '{"type": "ocr"}'}).status_code == 200
+        assert http.post("/api/ask", json={"question": "q", "filters": {"page": {"near": 1}}}).status_code == 422
+        assert http.post("/api/ask", data={"question": "q", "filters": "type=ocr"}).status_code == 422
+        assert calls == [filters, {"type": "ocr"}]
+
+
+class _FakeUpload:
+    def __init__(self, data: bytes, filename: str):
+        self._buf = io.BytesIO(data)
+        self.filename = filename
+        self.reads = []
+
+    async def read(self, size: int = -1) -> bytes:
+        self.reads.append(size)
+        return self._buf.read(size)
+
+
+class TestSaveUpload:
+    def test_streams_in_chunks_and_hashes(self):
+        from src.api.api_utils import save_upload
+        data = os.urandom(10_000)
+        upload = _FakeUpload(data, "../../report.pdf")
+        temp_dir, path, digest, size = asyncio.run(save_upload(upload, chunk_bytes=1024))
+        try:
+            assert os.path.dirname(path) == temp_dir
+            assert os.path.basename(path) == "report.pdf"
+            assert open(path, "rb").read() == data
+            assert digest == hashlib.sha256(data).hexdigest()
+            assert size == len(data)
+            assert set(upload.reads) == {1024}
+        finally:
+            import shutil
+            shutil.rmtree(temp_dir)
+
+    def test_blocks_are_written_off_the_event_loop(self, monkeypatch):
+        import threading
+        from src.api import api_utils
+        threads = []
+        real_append = api_utils._append
+
+        def recording_append(out, digest, block):
+            threads.append(threading.get_ident())
+            real_append(out, digest, block)
+
+        async def run():
+            loop_thread = threading.get_ident()
+            result = await api_utils.save_upload(_FakeUpload(b"y" * 4096, "a.txt"), chunk_bytes=1024)
+            return loop_thread, result
+
+        monkeypatch.setattr(api_utils, "_append", recording_append)
+        loop_thread, (temp_dir, path, digest, _) = asyncio.run(run())
+        try:
+            assert len(threads) == 4 and loop_thread not in threads
+            assert digest == hashlib.sha256(b"y" * 4096).hexdigest()
+        finally:
+            import shutil
+            shutil.rmtree(temp_dir)
+
+    def test_same_filename_gets_separate_files(self):
+        from src.api.api_utils import save_upload
+        a = asyncio.run(save_upload(_FakeUpload(b"first", "same.txt")))
+        b = asyncio.run(save_upload(_FakeUpload(b"second", "same.txt")))
+        try:
+            assert a[1] != b[1]
+            assert open(a[1], "rb").read() == b"first"
+        finally:
+            import shutil
+            shutil.rmtree(a[0])
+            shutil.rmtree(b[0])
+
+    def test_limit_aborts_early_and_removes_partial_file(self, monkeypatch):
+        import tempfile
+        from src.api.api_utils import UploadTooLargeError, save_upload
+        created = []
+        real_mkdtemp = tempfile.mkdtemp
+        monkeypatch.setattr(tempfile, "mkdtemp", lambda **kw: created.append(real_mkdtemp(**kw)) or created[-1])
+        upload = _FakeUpload(b"x" * 10_000, "big.txt")
+        with pytest.raises(UploadTooLargeError):
+            asyncio.run(save_upload(upload, max_bytes=2048, chunk_bytes=1024))
+        assert len(upload.reads) == 3  # stopped right after crossing the limit
+        assert not os.path.exists(created[0])
@@ -56,6 +56,45 @@ class TestCleanText:
         assert "  " not in result
 
 
+# Inputs from TestCleanText plus edge cases around the fused line rules
+_CLEAN_CASES = [
+    "",
+    None,
+    "inter-\noperability is key",
+    "\u201cHello\u201d and \u2018world\u2019",
+    "Content here.\n\n   42   \n\nMore content.",
+    "Content\nPage 3 of 10\nMore content",
+    "A\n\n\n\n\nB",
+    "word    another    word",
+    "Hello world. This is clean.",
+    "A\n3\n \nPage 1 of 2\nX",
+    "Intro\r\n  12  \r\n-----\r\nBody \t text\u00a0here \u2013 done.  \n",
+    "Line one\x0cLine two\u2028Line three \x85 end",
+    "conclu-\nding\u2014remarks\n___\n===   \nPage 10 of 10",
+]
+
+
+class TestCleanTextFastPath:
+    """clean_text (fast path) must match clean_text_reference byte-for-byte."""
+
+    @pytest.mark.parametrize("text", _CLEAN_CASES)
+    def test_matches_reference(self, text):
+        from src.ingestion.text_cleaner import clean_text, clean_text_reference
+        assert clean_text(text) == clean_text_reference(text)
+
+    def test_matches_reference_randomised(self):
+        import random
+        from src.ingestion.text_cleaner import clean_text, clean_text_reference
+        tokens = [
+            "\n", "\n", " ", "  ", "\t", "\r", "\r\n", "\x0c", "\u00a0", "3", "42",
+            "Page 3 of 10", "---", "___", "===", "word", "-", "a-\nb", "\u201c", "\u2013", "\x85",
+        ]
+        rng = random.Random(1234)
+        for _ in range(5000):
+            text = "".join(rng.choice(tokens) for _ in range(rng.randint(0, 25)))
+            assert clean_text(text) == clean_text_reference(text), repr(text)
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # chunking tests
 # ─────────────────────────────────────────────────────────────────────────────
@@ -115,3 +154,816 @@ class TestSemanticChunkDocuments:
         docs = [Document(page_content="Some content. " * 30, metadata={"source": "lc.pdf", "page": 1})]
         chunks = self._chunk(docs)
         assert len(chunks) > 0
+
+    class _WhitespaceTokenizer:
+        """Fast-tokenizer stand-in: one token per whitespace-separated word."""
+        model_max_length = 512
+
+        def __call__(self, texts, **kwargs):
+            import re
+            return {"offset_mapping": [
+                [(m.start(), m.end()) for m in re.finditer(r"\S+", t)] for t in texts
+            ]}
+
+    def test_chunks_respect_token_budget(self):
+        text = " ".join(f"Sentence number {i} is here." for i in range(300))
+        docs = [{"page_content": text, "metadata": {"source": "t.pdf", "page": 1}}]
+        chunks = self._chunk(docs, chunk_size=60, chunk_overlap=10,
+                             tokenizer=self._WhitespaceTokenizer())
+        assert len(chunks) > 1
+        for c in chunks:
+            assert c["metadata"]["token_count"] == len(c["page_content"].split())
+            assert c["metadata"]["token_count"] <= 60
+        # Budget is actually used, not under-filled
+        assert max(c["metadata"]["token_count"] for c in chunks) > 45
+        # Sentence boundaries are preferred over mid-sentence cuts
+        assert all(c["page_content"].endswith(".") for c in chunks)
+
+    def test_overlap_repeats_tail_tokens(self):
+        text = " ".join(f"w{i}" for i in range(200)) + "."
+        docs = [{"page_content": text, "metadata": {"source": "t.pdf", "page": 1}}]
+        chunks = self._chunk(docs, chunk_size=50, chunk_overlap=10,
+                             tokenizer=self._WhitespaceTokenizer())
+        first, second = chunks[0]["page_content"].split(), chunks[1]["page_content"].split()
+        assert first[-10:] == second[:10]
+
+    def test_chunk_size_clamped_to_model_window(self):
+        tok = self._WhitespaceTokenizer()
+        tok.model_max_length = 32
+        docs = [{"page_content": "alpha beta gamma delta. " * 100, "metadata": {"source": "t.pdf"}}]
+        chunks = self._chunk(docs, chunk_size=1000, chunk_overlap=0, tokenizer=tok)
+        assert all(c["metadata"]["token_count"] <= 30 for c in chunks)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# PDF extraction tests
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _hang_on_page_two(pdf_path, pages):
+    # Worker task for the pool tests: page 2 never finishes
+    import time
+    if 1 in pages:
+        time.sleep(60)
+    return [(i + 1, f"page {i + 1}", False) for i in pages]
+
+
+class TestTextExtractor:
+    def _make_pdf(self, path, pages):
+        import fitz
+        doc = fitz.open()
+        for i in range(pages):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"Body text of page {i + 1} for the contract appendix.")
+        doc.save(str(path))
+        doc.close()
+        return str(path)
+
+    def test_parallel_matches_serial(self, tmp_path, monkeypatch):
+        import src.ingestion.extract_text as et
+        monkeypatch.setattr(et, "PDF_PARALLEL_MIN_PAGES", 2)
+        monkeypatch.setattr(et, "PDF_PAGES_PER_TASK", 3)
+        pdf = self._make_pdf(tmp_path / "long.pdf", 10)
+
+        parallel = et.TextExtractor(workers=2)
+        docs = parallel.extract_from_pdf_advanced(pdf)
+        serial = et.TextExtractor(workers=1).extract_from_pdf_advanced(pdf)
+
+        assert docs == serial
+        assert [d["metadata"]["page"] for d in docs] == list(range(1, 11))
+        assert parallel.last_stats["workers"] == 2
+        assert parallel.last_stats["pages_failed"] == []
+
+    def test_stuck_worker_is_replaced_and_later_tasks_keep_their_timeout(self):
+        import time
+        from src.ingestion.extract_text import TextExtractor
+        extractor = TextExtractor(workers=2, page_timeout=2)
+
+        started = time.monotonic()
+        results = list(extractor._run_page_tasks("x.pdf", [[0], [1], [2], [3]], 2, task=_hang_on_page_two))
+
+        assert [pages for pages, _ in results] == [[0], [1], [2], [3]]
+        assert [r is None for _, r in results] == [False, True, False, False]
+        assert results[3][1] == [(4, "page 4", False)]
+        assert time.monotonic() - started < 30
+
+    def test_pdfplumber_reads_every_page_when_pymupdf_cannot_open_the_file(self, tmp_path, monkeypatch):
+        import fitz
+        from src.ingestion.extract_text import TextExtractor
+        pdf = self._make_pdf(tmp_path / "odd.pdf", 3)
+
+        def _refuse(*args, **kwargs):
+            raise RuntimeError("cannot open broken document")
+        monkeypatch.setattr(fitz, "open", _refuse)
+
+        docs = TextExtractor(workers=1).extract_from_pdf_advanced(pdf)
+        assert [d["metadata"]["page"] for d in docs] == [1, 2, 3]
+        assert all(d["metadata"]["type"] == "text_pdfplumber" for d in docs)
+        assert "page 2" in docs[1]["page_content"]
+
+    def test_ocr_pool_runs_through_the_page_task_runner(self, monkeypatch):
+        import sys
+        import types
+        import src.ingestion.extract_text as et
+        monkeypatch.setitem(sys.modules, "pytesseract", types.ModuleType("pytesseract"))
+        extractor = et.TextExtractor(ocr_workers=2)
+        extractor.last_stats = {"pages_failed": []}
+        calls = []
+
+        def _run_page_tasks(pdf_path, tasks, processes, **kwargs):
+            calls.append((tasks, processes, kwargs))
+            yield [2], None  # timed out: its worker was replaced
+            yield [4], [(5, "scanned text", 300)]
+        monkeypatch.setattr(extractor, "_run_page_tasks", _run_page_tasks)
+
+        assert list(extractor._ocr_pages("scan.pdf", [3, 5])) == [(3, ""), (5, "scanned text")]
+        [(tasks, processes, kwargs)] = calls
+        assert (tasks, processes) == ([[2], [4]], 2)
+        assert kwargs["timeout"] == et.OCR_PAGE_TIMEOUT + 10
+        assert kwargs["initializer"] is et._init_ocr_worker
+        assert extractor.last_stats["pages_failed"] == [3]
+        assert extractor.last_stats["ocr_dpi"] == {"min": 300, "max": 300}
+
+    def test_only_scanned_pages_need_ocr(self, tmp_path):
+        import fitz
+        from src.ingestion.extract_text import _needs_fallback
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), "A normal page with a proper text layer on it.")
+        doc.new_page().insert_text((72, 72), "Annex")
+        pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 600, 800), False)
+        pix.clear_with(255)
+        page = doc.new_page()
+        page.insert_image(page.rect, pixmap=pix)
+        page.insert_text((72, 40), "Appendix B")
+        text_page, title_page, scanned = doc[0], doc[1], doc[2]
+
+        assert _needs_fallback(text_page, "A normal page with a proper text layer on it.") is False
+        assert _needs_fallback(title_page, "Annex") is False
+        assert _needs_fallback(scanned, "Appendix B") is True
+        assert _needs_fallback(text_page, "\u25a0\u25a1\u25aa" * 20) is True
+
+
+class TestDocxStreaming:
+    def _make_docx(self, path):
+        import docx
+        from docx.enum.section import WD_SECTION
+        from docx.enum.text import WD_BREAK
+        d = docx.Document()
+        d.add_paragraph("Intro paragraph about the leave policy.")
+        table = d.add_table(rows=2, cols=2)
+        for (r, c), text in {(0, 0): "Type", (0, 1): "Days", (1, 0): "Annual", (1, 1): "25"}.items():
+            table.cell(r, c).text = text
+        d.add_paragraph("Paragraph after the table.").add_run().add_break(WD_BREAK.PAGE)
+        d.add_paragraph("Second page text.")
+        d.add_section(WD_SECTION.NEW_PAGE)
+        d.add_paragraph("Text in a new section.")
+        d.save(str(path))
+        return str(path)
+
+    def test_pieces_follow_breaks_with_tables_in_order(self, tmp_path):
+        from src.ingestion.extract_text import TextExtractor
+        pages = list(TextExtractor().iter_docx_pages(self._make_docx(tmp_path / "policy.docx")))
+        assert [p["page_content"] for p in pages] == [
+            "Intro paragraph about the leave policy.\nType | Days\nAnnual | 25\n"
+            "Paragraph after the table.",
+            "Second page text.",
+            "Text in a new section.",
+        ]
+        assert [p["metadata"]["page"] for p in pages] == [1, 2, 3]
+        assert [p["metadata"]["break"] for p in pages] == ["page", "section", "end"]
+        assert all(p["metadata"]["source"] == "policy.docx" for p in pages)
+
+    def test_documents_without_breaks_are_cut_by_size(self, tmp_path, monkeypatch):
+        import docx
+        import src.ingestion.extract_text as et
+        monkeypatch.setattr(et, "DOCX_MAX_PIECE_CHARS", 1000)
+        d = docx.Document()
+        for i in range(200):
+            d.add_paragraph(f"Clause {i} of the manual describes one procedure in detail.")
+        path = tmp_path / "manual.docx"
+        d.save(str(path))
+
+        pages = et.TextExtractor().extract_from_docx(str(path))
+        assert len(pages) > 5
+        assert all(len(p["page_content"]) < 1100 for p in pages)
+        text = "\n".join(p["page_content"] for p in pages)
+        assert text.count("Clause") == 200
+
+    def test_truncated_document_raises_after_partial_pieces(self, tmp_path):
+        import zipfile
+        from src.ingestion.extract_text import TextExtractor
+        good = self._make_docx(tmp_path / "policy.docx")
+        broken = tmp_path / "broken.docx"
+        with zipfile.ZipFile(good) as src, zipfile.ZipFile(broken, "w") as dst:
+            for item in src.infolist():
+                data = src.read(item)
+                if item.filename == "word/document.xml":
+                    data = data[: data.index(b"Text in a new section")]
+                dst.writestr(item, data)
+
+        pieces = []
+        with pytest.raises(Exception):
+            for piece in TextExtractor().iter_docx_pages(str(broken)):
+                pieces.append(piece)
+        assert len(pieces) == 2
+
+
+class TestHeaderFooterFilter:
+    _TOPICS = ["leave", "pay", "conduct", "travel", "security", "training", "benefits", "safety"]
+
+    def _body(self, i):
+        a, b = self._TOPICS[i % 8], self._TOPICS[(i // 8) % 8]
+        return f"Rules on {a} and {b} for staff in region {i}.\nDetails on {b} follow the {a} guide."
+
+    def _pages(self, n):
+        return [
+            {
+                "page_content": (
+                    f"ACME Corp Employee Handbook\n{self._body(i)}\n"
+                    f"Confidential - Internal | Page {i} of {n}"
+                ),
+                "metadata": {"source": "handbook.pdf", "page": i},
+            }
+            for i in range(1, n + 1)
+        ]
+
+    def test_removes_running_header_and_numbered_footer(self):
+        from src.ingestion.header_footer import RepeatedLineFilter
+        filt = RepeatedLineFilter(window=10)
+        out = list(filt.apply(self._pages(30)))
+        assert len(out) == 30
+        for i, page in enumerate(out, start=1):
+            assert "ACME Corp" not in page["page_content"]
+            assert "Confidential" not in page["page_content"]
+            assert page["page_content"] == self._body(i)
+        assert filt.stats["lines_removed"] == 60
+        assert filt.stats["chars_removed"] > 60 * 20
+        assert filt.stats["tokens_removed"] > 0
+
+    def test_body_lines_and_short_documents_untouched(self):
+        from src.ingestion.header_footer import RepeatedLineFilter
+        pages = self._pages(2)
+        assert list(RepeatedLineFilter().apply(pages)) == pages
+        # A line repeated in the middle of pages is content, not a header
+        mid = [
+            {
+                "page_content": "\n".join([
+                    self._body(i), self._body(i + 20), "Definitions apply.",
+                    self._body(i + 9), self._body(i + 30),
+                ]),
+                "metadata": {},
+            }
+            for i in range(10)
+        ]
+        assert list(RepeatedLineFilter().apply(mid)) == mid
+
+    def test_pipeline_reports_savings(self, tmp_path, monkeypatch):
+        from pipelines import ingestion_pipeline
+        pages = self._pages(12)
+        monkeypatch.setattr(ingestion_pipeline, "_iter_extracted", lambda *a, **kw: iter(pages))
+        path = tmp_path / "handbook.pdf"
+        path.write_bytes(b"%PDF-1.4 stub")
+        store = _RecordingStore()
+        result = ingestion_pipeline.run_ingestion(str(path), store=store)
+        assert result["status"] == "success"
+        assert result["chars_saved"] > 0 and result["tokens_saved"] > 0
+        assert not any("ACME" in c["page_content"] for b in store.batches for c in b)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ingestion pipeline tests (fake store — no embedding model needed)
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _RecordingStore:
+    """Implements the vector-store calls used by the ingestion pipeline."""
+
+    def __init__(self):
+        self.batches = []
+        self.points = {}  # point_id -> metadata
+
+    def add_documents(self, documents, ids=None):
+        self.batches.append(list(documents))
+        for pid, doc in zip(ids or [], documents):
+            self.points[pid] = dict(doc["metadata"])
+
+    def get_source_state(self, source):
+        return {
+            pid: meta.get("file_hash")
+            for pid, meta in self.points.items()
+            if meta.get("source") == source
+        }
+
+    def delete_points(self, ids):
+        for pid in ids:
+            self.points.pop(pid, None)
+
+    def set_file_hash(self, ids, file_hash):
+        self.update_payload(ids, {"file_hash": file_hash})
+
+    def update_payload(self, ids, fields):
+        for pid in ids:
+            self.points[pid].update(fields)
+
+    def existing_points(self, ids):
+        return {pid for pid in ids if pid in self.points}
+
+
+class TestStreamingIngestion:
+    def test_streaming_matches_batch_chunking(self, tmp_path):
+        from pipelines.ingestion_pipeline import run_ingestion_streaming
+        from src.ingestion.chunking import semantic_chunk_documents
+        from src.ingestion.text_cleaner import clean_text
+
+        text = " ".join(f"Clause {i} sets out the obligations of both parties." for i in range(300))
+        path = tmp_path / "contract.txt"
+        path.write_text(text, encoding="utf-8")
+
+        store = _RecordingStore()
+        result = run_ingestion_streaming(str(path), store=store, batch_size=4)
+
+        expected = semantic_chunk_documents(
+            [{"page_content": clean_text(text), "metadata": {"source": "contract.txt", "page": 1}}]
+        )
+        streamed = [c for batch in store.batches for c in batch]
+        assert result["status"] == "success"
+        assert result["chunks_indexed"] == len(expected)
+        assert [c["page_content"] for c in streamed] == [c["page_content"] for c in expected]
+        assert [c["metadata"]["chunk_id"] for c in streamed] == [
+            c["metadata"]["chunk_id"] for c in expected
+        ]
+        assert all(len(b) <= 4 for b in store.batches)
+
+    def test_streaming_empty_file_reports_error(self, tmp_path):
+        from pipelines.ingestion_pipeline import run_ingestion_streaming
+        path = tmp_path / "empty.txt"
+        path.write_text("   ", encoding="utf-8")
+        result = run_ingestion_streaming(str(path), store=_RecordingStore())
+        assert result["status"] == "error"
+        assert result["chunks_indexed"] == 0
+
+
+class TestIncrementalIngestion:
+    def _paragraphs(self, n, changed=()):
+        return "\n\n".join(
+            (f"Amended {i} of the policy. " if i in changed else f"Paragraph {i} of the policy. ") * 6
+            for i in range(n)
+        )
+
+    def test_unchanged_file_is_skipped(self, tmp_path):
+        from pipelines.ingestion_pipeline import run_ingestion
+        path = tmp_path / "policy.txt"
+        path.write_text(self._paragraphs(20), encoding="utf-8")
+        store = _RecordingStore()
+
+        first = run_ingestion(str(path), store=store)
+        batches_after_first = len(store.batches)
+        second = run_ingestion(str(path), store=store)
+
+        assert first["chunks_indexed"] > 0
+        assert second["skipped"] is True
+        assert second["chunks_indexed"] == 0
+        assert len(store.batches) == batches_after_first
+
+    def test_changed_file_reembeds_only_changed_chunks(self, tmp_path):
+        from pipelines.ingestion_pipeline import run_ingestion
+        path = tmp_path / "policy.txt"
+        path.write_text(self._paragraphs(20), encoding="utf-8")
+        store = _RecordingStore()
+        first = run_ingestion(str(path), store=store)
+
+        path.write_text(self._paragraphs(20, changed={3, 11}), encoding="utf-8")
+        second = run_ingestion(str(path), store=store)
+
+        assert 0 < second["chunks_indexed"] < first["chunks_indexed"]
+        assert second["chunks_deleted"] == second["chunks_indexed"]
+        assert len(store.points) == first["chunks_indexed"]
+        hashes = set(store.get_source_state("policy.txt").values())
+        assert len(hashes) == 1  # every point stamped with the new file hash
+
+    def test_retry_after_failure_mid_stream_completes_the_file(self, tmp_path):
+        from pipelines.ingestion_pipeline import run_ingestion_streaming
+        path = tmp_path / "policy.txt"
+        path.write_text(self._paragraphs(40), encoding="utf-8")
+
+        class _FailingStore(_RecordingStore):
+            fail_at = 2
+
+            def add_documents(self, documents, ids=None):
+                if len(self.batches) == self.fail_at:
+                    raise ConnectionError("vector store went away")
+                super().add_documents(documents, ids=ids)
+
+        store = _FailingStore()
+        first = run_ingestion_streaming(str(path), store=store, batch_size=2)
+        assert first["status"] == "error" and len(store.points) == 4
+        assert set(store.get_source_state("policy.txt").values()) == {None}  # not complete
+
+        store.fail_at = None
+        second = run_ingestion_streaming(str(path), store=store, batch_size=2)
+        assert second["status"] == "success" and second["skipped"] is False
+        assert second["chunks_unchanged"] == 4 and second["chunks_indexed"] > 0
+        hashes = set(store.get_source_state("policy.txt").values())
+        assert len(hashes) == 1 and None not in hashes
+        assert run_ingestion_streaming(str(path), store=store)["skipped"] is True
+
+
+class TestNearDuplicateSuppression:
+    DISCLAIMER = (
+        "This communication is confidential and intended solely for the addressee. "
+        "If you have received it in error please notify the sender immediately and "
+        "delete all copies. Any unauthorised review, use or distribution is prohibited "
+        "and may be unlawful. {company} accepts no liability for viruses."
+    )
+
+    def test_minhash_similarity(self):
+        from src.ingestion.near_dedup import jaccard, minhash
+        a = minhash(self.DISCLAIMER.format(company="ACME Corp"))
+        b = minhash(self.DISCLAIMER.format(company="ACME Ltd"))
+        c = minhash("The quarterly revenue grew by twelve percent driven by strong demand in Europe.")
+        assert jaccard(a, b) > 0.8
+        assert jaccard(a, c) < 0.2
+        assert minhash("too short") is None
+
+    def test_cross_document_duplicate_is_referenced_not_embedded(self, tmp_path):
+        from pipelines.ingestion_pipeline import run_ingestion
+        store = _RecordingStore()
+        (tmp_path / "a.txt").write_text(self.DISCLAIMER.format(company="ACME Corp"))
+        (tmp_path / "b.txt").write_text(self.DISCLAIMER.format(company="ACME Ltd"))
+
+        first = run_ingestion(str(tmp_path / "a.txt"), store=store)
+        second = run_ingestion(str(tmp_path / "b.txt"), store=store)
+
+        assert first["chunks_indexed"] == 1
+        assert second["chunks_indexed"] == 0
+        assert second["chunks_deduplicated"] == 1
+        [meta] = store.points.values()
+        assert meta["source"] == "a.txt"
+        assert meta["also_in"] == ["b.txt"]
+
+    def test_referenced_chunk_survives_owner_change(self, tmp_path):
+        from pipelines.ingestion_pipeline import run_ingestion
+        store = _RecordingStore()
+        (tmp_path / "a.txt").write_text(self.DISCLAIMER.format(company="ACME Corp"))
+        (tmp_path / "b.txt").write_text(self.DISCLAIMER.format(company="ACME Ltd"))
+        run_ingestion(str(tmp_path / "a.txt"), store=store)
+        run_ingestion(str(tmp_path / "b.txt"), store=store)
+
+        (tmp_path / "a.txt").write_text("The holiday policy now grants twenty five days of paid leave per year.")
+        result = run_ingestion(str(tmp_path / "a.txt"), store=store)
+
+        assert result["chunks_deleted"] == 0
+        by_source = {m["source"]: m for m in store.points.values()}
+        assert set(by_source) == {"a.txt", "b.txt"}
+        assert by_source["b.txt"]["also_in"] == []
+        # The handed-over point carries b.txt's file hash, so unchanged b.txt is still skipped
+        assert by_source["b.txt"]["file_hash"] is not None
+        assert run_ingestion(str(tmp_path / "b.txt"), store=store)["skipped"] is True
+
+    def test_store_without_update_payload_embeds_duplicates(self, tmp_path):
+        from pipelines.ingestion_pipeline import run_ingestion
+
+        class _PlainStore:
+            """A store without update_payload(): cannot record also_in references."""
+
+            def __init__(self):
+                self.batches = []
+
+            def add_documents(self, documents, ids=None):
+                self.batches.append(list(documents))
+
+        store = _PlainStore()
+        (tmp_path / "a.txt").write_text(self.DISCLAIMER.format(company="ACME Corp"))
+        (tmp_path / "b.txt").write_text(self.DISCLAIMER.format(company="ACME Ltd"))
+        run_ingestion(str(tmp_path / "a.txt"), store=store)
+        second = run_ingestion(str(tmp_path / "b.txt"), store=store)
+        assert second["chunks_indexed"] == 1
+        assert second["chunks_deduplicated"] == 0
+
+    def test_duplicate_of_a_point_that_is_gone_is_embedded(self, tmp_path):
+        from pipelines.ingestion_pipeline import run_ingestion
+        from src.ingestion.near_dedup import get_fingerprint_index, index_scope
+        (tmp_path / "a.txt").write_text(self.DISCLAIMER.format(company="ACME Corp"))
+        (tmp_path / "b.txt").write_text(self.DISCLAIMER.format(company="ACME Ltd"))
+        store = _RecordingStore()
+        run_ingestion(str(tmp_path / "a.txt"), store=store)
+
+        store.points.clear()  # collection reset behind the index's back
+        second = run_ingestion(str(tmp_path / "b.txt"), store=store)
+        assert (second["chunks_indexed"], second["chunks_deduplicated"]) == (1, 0)
+        [meta] = store.points.values()
+        assert meta["source"] == "b.txt"
+        assert get_fingerprint_index(index_scope(store)).stats() == {"fingerprints": 1, "references": 0}
+
+    def _chunk(self, company, source):
+        return {"page_content": self.DISCLAIMER.format(company=company), "metadata": {"source": source}}
+
+    def test_near_repeats_within_one_file_are_embedded_once(self):
+        from pipelines.ingestion_pipeline import _SourceSync
+        store = _RecordingStore()
+        sync = _SourceSync(store, "a.txt", "h1")
+        fresh, ids = sync.new_chunks([self._chunk("ACME Corp", "a.txt")])
+        store.add_documents(fresh, ids=ids)
+        # Next streamed batch: a near-repeat of the first chunk and of itself
+        fresh, _ = sync.new_chunks([self._chunk("ACME Ltd", "a.txt"), self._chunk("ACME Inc", "a.txt")])
+        sync.finish()
+        assert fresh == [] and len(store.points) == 1
+        assert sync.result(1)["chunks_deduplicated"] == 2
+
+        # A new version of the file keeps the repeat suppressed against its own kept chunk
+        again = _SourceSync(store, "a.txt", "h2")
+        fresh, _ = again.new_chunks([self._chunk("ACME Corp", "a.txt"), self._chunk("ACME Ltd", "a.txt")])
+        again.finish()
+        assert fresh == [] and again.near_repeats == 1 and len(store.points) == 1
+
+    def test_near_duplicates_within_one_batch_become_references(self):
+        from pipelines.ingestion_pipeline import _SourceSync
+        from src.ingestion.near_dedup import SignatureView
+        store, view = _RecordingStore(), SignatureView()
+        syncs = [_SourceSync(store, name, "h", view=view) for name in ("a.txt", "b.txt")]
+        buffer, buffer_ids = [], []
+        for sync, company in zip(syncs, ("ACME Corp", "ACME Ltd")):
+            fresh, ids = sync.new_chunks([self._chunk(company, sync.source)])
+            buffer += fresh
+            buffer_ids += ids
+        store.add_documents(buffer, ids=buffer_ids)  # one upsert, as bulk ingestion flushes
+        for sync in syncs:
+            sync.finish()
+
+        [meta] = store.points.values()
+        assert (meta["source"], meta["also_in"]) == ("a.txt", ["b.txt"])
+        assert len(view) == 0  # finished chunks are looked up in the index from now on
+
+    def test_index_is_per_collection_and_cleared_with_it(self, tmp_path):
+        from pipelines.ingestion_pipeline import run_ingestion
+        from src.ingestion.near_dedup import clear_fingerprint_index, get_fingerprint_index, index_scope
+        (tmp_path / "a.txt").write_text(self.DISCLAIMER.format(company="ACME Corp"))
+        (tmp_path / "b.txt").write_text(self.DISCLAIMER.format(company="ACME Ltd"))
+        first, second = _RecordingStore(), _RecordingStore()
+        first.collection_name, second.collection_name = "docs", "archive"
+        assert index_scope(first) == "_RecordingStore-docs"
+
+        run_ingestion(str(tmp_path / "a.txt"), store=first)
+        assert run_ingestion(str(tmp_path / "b.txt"), store=second)["chunks_indexed"] == 1
+
+        clear_fingerprint_index(first)
+        assert get_fingerprint_index(index_scope(first)).stats() == {"fingerprints": 0, "references": 0}
+        assert get_fingerprint_index(index_scope(second)).stats()["fingerprints"] == 1
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# background ingestion jobs
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestIngestionJobs:
+    def _wait(self, manager, job_id, timeout=10):
+        import time
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = manager.get(job_id)
+            if job["status"] in ("success", "error"):
+                return job
+            time.sleep(0.02)
+        raise AssertionError(f"job {job_id} did not finish")
+
+    def test_job_reports_pipeline_progress(self, tmp_path):
+        from pipelines.ingestion_pipeline import run_ingestion
+        from src.services.ingestion_jobs import IngestionJobManager
+
+        path = tmp_path / "handbook.txt"
+        path.write_text(" ".join(f"Rule {i} applies to every employee." for i in range(400)))
+        store = _RecordingStore()
+        manager = IngestionJobManager(workers=1, runner=run_ingestion)
+        try:
+            job = self._wait(manager, manager.submit(str(path), store=store))
+        finally:
+            manager.shutdown()
+
+        indexed = sum(len(b) for b in store.batches)
+        assert job["status"] == "success"
+        assert job["result"]["chunks_indexed"] == indexed
+        assert job["progress"] == {
+            "pages_extracted": 1, "chunks_embedded": indexed, "chunks_upserted": indexed,
+        }
+        assert job["finished_at"] >= job["started_at"] >= job["created_at"]
+
+    def test_queue_limit_and_cleanup(self, tmp_path):
+        import threading
+        import time
+        from src.services.ingestion_jobs import IngestionJobManager, QueueFullError
+
+        release = threading.Event()
+
+        def runner(file_path, progress=None, **kwargs):
+            release.wait(5)
+            raise RuntimeError("extraction exploded")
+
+        upload_dir = tmp_path / "upload"
+        upload_dir.mkdir()
+        manager = IngestionJobManager(workers=1, max_queued=1, runner=runner)
+        try:
+            first = manager.submit(str(upload_dir / "a.pdf"), cleanup_dir=str(upload_dir))
+            while manager.get(first)["status"] == "queued":
+                time.sleep(0.01)
+            manager.submit("b.pdf")  # waits behind the running job
+            with pytest.raises(QueueFullError):
+                manager.submit("c.pdf")
+            release.set()
+            job = self._wait(manager, first)
+        finally:
+            release.set()
+            manager.shutdown()
+
+        assert job["status"] == "error"
+        assert "exploded" in job["error"]
+        assert not upload_dir.exists()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# bulk directory ingestion
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestBulkIngestion:
+    def _tree(self, root):
+        for folder in ("hr", "legal"):
+            (root / folder).mkdir(parents=True)
+            for i in range(3):
+                (root / folder / f"doc{i}.txt").write_text(
+                    " ".join(f"{folder} document {i} clause {j} binds {folder}{i}-{j}." for j in range(60))
+                )
+        (root / "legal" / "image.png").write_bytes(b"\x89PNG")
+
+    def test_indexes_tree_and_resumes_from_checkpoint(self, tmp_path):
+        from pipelines.bulk_ingest import run_bulk_ingestion
+        root = tmp_path / "share"
+        self._tree(root)
+        checkpoint = str(tmp_path / "ckpt.jsonl")
+        store = _RecordingStore()
+
+        first = run_bulk_ingestion(str(root), store=store, workers=2, embed_batch=8,
+                                   checkpoint_path=checkpoint)
+        assert first["docs"] == 6
+        assert first["docs_failed"] == 0
+        assert first["chunks_embedded"] == len(store.points) > 0
+        sources = {m["source"] for m in store.points.values()}
+        assert sources == {f"{d}/doc{i}.txt" for d in ("hr", "legal") for i in range(3)}
+
+        (root / "hr" / "doc1.txt").write_text("Rewritten. " * 40)
+        second = run_bulk_ingestion(str(root), store=store, workers=2, embed_batch=8,
+                                    checkpoint_path=checkpoint)
+        assert second["docs_resumed"] == 5
+        assert second["docs"] == 1
+        assert {m["source"] for m in store.points.values()} == sources
+
+    def test_unchanged_files_are_skipped_before_extraction(self, tmp_path, monkeypatch):
+        import pipelines.bulk_ingest as bulk
+        root = tmp_path / "share"
+        self._tree(root)
+        store = _RecordingStore()
+        bulk.run_bulk_ingestion(str(root), store=store, workers=2, embed_batch=8,
+                                checkpoint_path=str(tmp_path / "first.jsonl"))
+
+        # Fresh checkpoint: only the stored file hashes can tell the files are unchanged
+        (root / "hr" / "doc2.txt").unlink()
+        summary = bulk.run_bulk_ingestion(str(root), store=store, workers=2, embed_batch=8,
+                                          checkpoint_path=str(tmp_path / "second.jsonl"))
+        assert summary["docs_unchanged"] == 5
+        assert summary["docs"] == 0
+
+    def test_checkpoint_record_of_deleted_file(self, tmp_path):
+        from pipelines.pipeline_utils import Checkpoint
+        checkpoint = Checkpoint(str(tmp_path / "ckpt.jsonl"))
+        rec = Checkpoint.file_record("gone.txt", str(tmp_path / "gone.txt"), "error", error="deleted")
+        checkpoint.record([rec])
+        assert rec["size"] is None
+        assert not checkpoint.is_done("gone.txt", str(tmp_path / "gone.txt"))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# extraction cache
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestExtractionCache:
+    def _pages(self, n, size=200):
+        return [
+            {"page_content": f"page {i} " + "lorem ipsum " * size, "metadata": {"source": "a.pdf", "page": i}}
+            for i in range(1, n + 1)
+        ]
+
+    def test_round_trip_is_keyed_by_version(self, tmp_path):
+        from src.ingestion.extraction_cache import ExtractionCache
+        cache = ExtractionCache(str(tmp_path))
+        pages = self._pages(3)
+        cache.put("ab" * 32, "3", pages)
+        assert list(cache.get("ab" * 32, "3")) == pages
+        assert cache.get("ab" * 32, "4") is None
+        assert cache.size_bytes() < len(str(pages)) / 5  # stored compressed
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        import os
+        import time
+        from src.ingestion.extraction_cache import ExtractionCache
+        cache = ExtractionCache(str(tmp_path), max_mb=2)
+        # ~600 KB compressed per entry, so the fourth entry crosses the 2 MB cap
+        blob = [{"page_content": os.urandom(600_000).hex(), "metadata": {"page": 1}}]
+        cache.put("00" * 32, "3", blob)
+        cache.put("11" * 32, "3", blob)
+        past = time.time() - 100
+        os.utime(cache._path("00" * 32, "3"), (past, past))
+        os.utime(cache._path("11" * 32, "3"), (past, past))
+        assert cache.get("00" * 32, "3") is not None  # refreshes its LRU position
+        cache.put("22" * 32, "3", blob)
+        cache.put("33" * 32, "3", blob)
+        assert cache.size_bytes() <= cache.max_bytes
+        assert cache.get("11" * 32, "3") is None
+        assert cache.get("33" * 32, "3") is not None
+
+    def test_pages_are_decoded_one_at_a_time(self, tmp_path):
+        from src.ingestion.extraction_cache import ExtractionCache
+        cache = ExtractionCache(str(tmp_path))
+        pages = self._pages(50, size=2000)
+        cache.put("66" * 32, "3", pages)
+        path = cache._path("66" * 32, "3")
+        with open(path, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(data[: len(data) // 2])  # torn entry
+
+        cached = cache.get("66" * 32, "3")
+        assert next(cached) == pages[0]
+        with pytest.raises(Exception):
+            list(cached)
+        assert cache.get("66" * 32, "3") is None  # dropped
+
+    def test_cache_version_follows_extraction_settings(self, monkeypatch):
+        import src.ingestion.extract_text as et
+        before = et.extraction_cache_version()
+        assert before.startswith(et.EXTRACTOR_VERSION + "-")
+        monkeypatch.setattr(et, "DOCX_MAX_PIECE_CHARS", 1000)
+        assert et.extraction_cache_version() != before
+
+    def test_unreadable_entry_is_re_extracted(self, tmp_path, monkeypatch):
+        import os
+        from pipelines import ingestion_pipeline
+        from src.ingestion import extraction_cache
+        from src.ingestion.extract_text import extraction_cache_version
+
+        cache = extraction_cache.ExtractionCache(str(tmp_path / "c"))
+        monkeypatch.setattr(extraction_cache, "_cache", cache)
+        path = tmp_path / "note.txt"
+        path.write_text("Remember to renew the insurance policy before March.")
+        entry = cache._path("77" * 32, extraction_cache_version())
+        os.makedirs(os.path.dirname(entry))
+        with open(entry, "wb") as f:
+            f.write(b"not zlib at all")
+
+        pages = list(ingestion_pipeline._iter_extracted(str(path), file_hash="77" * 32))
+        assert [p["page_content"] for p in pages] == ["Remember to renew the insurance policy before March."]
+        assert [p["page_content"] for p in cache.get("77" * 32, extraction_cache_version())] == [
+            "Remember to renew the insurance policy before March."
+        ]
+
+    def test_entry_larger_than_the_cap_is_abandoned(self, tmp_path):
+        import os
+        from src.ingestion.extraction_cache import ExtractionCache
+        cache = ExtractionCache(str(tmp_path), max_mb=1)
+        writer = cache.writer("44" * 32, "3")
+        for i in range(4):  # ~400 KB compressed each
+            writer.add({"page_content": os.urandom(400_000).hex(), "metadata": {"page": i}})
+        assert writer.commit() is False
+        assert cache.get("44" * 32, "3") is None
+        assert os.listdir(tmp_path / "44") == []  # temp file removed
+
+    def test_failed_extraction_leaves_no_entry(self, tmp_path, monkeypatch):
+        import os
+        from pipelines import ingestion_pipeline
+        from src.ingestion import extraction_cache
+
+        cache = extraction_cache.ExtractionCache(str(tmp_path / "c"))
+        monkeypatch.setattr(extraction_cache, "_cache", cache)
+
+        def _broken(*a):
+            yield {"page_content": "first page", "metadata": {"source": "x.pdf", "page": 1}}
+            raise ValueError("corrupt xref")
+
+        monkeypatch.setattr(ingestion_pipeline, "_extract_pages", _broken)
+        with pytest.raises(ValueError):
+            list(ingestion_pipeline._iter_extracted("x.pdf", file_hash="55" * 32))
+        assert not any(files for _, _, files in os.walk(tmp_path / "c"))
+
+    def test_reingest_with_new_chunking_skips_extraction(self, tmp_path, monkeypatch):
+        from pipelines import ingestion_pipeline
+        from src.ingestion import extraction_cache
+
+        monkeypatch.setattr(extraction_cache, "_cache", extraction_cache.ExtractionCache(str(tmp_path / "c")))
+        path = tmp_path / "manual.txt"
+        path.write_text(" ".join(f"Step {i}: tighten the bolt firmly." for i in range(200)))
+        calls = []
+        real = ingestion_pipeline._extract_pages
+        monkeypatch.setattr(
+            ingestion_pipeline, "_extract_pages",
+            lambda *a: calls.append(a[0]) or real(*a),
+        )
+
+        first = ingestion_pipeline.run_ingestion(str(path), store=_RecordingStore())
+        second = ingestion_pipeline.run_ingestion(str(path), store=_RecordingStore())
+        assert first["chunks_indexed"] == second["chunks_indexed"] > 0
+        assert len(calls) == 1
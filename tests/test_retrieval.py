@@ -18,6 +18,35 @@ def _cosine(a, b):
     return dot / (na * nb + 1e-8)
 
 
+class _WordEncoder:
+    """Offline stand-in for the embedding model: hashed bag of words, so shared words score high."""
+
+    dim = 32
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, texts, normalize_embeddings=False, **kwargs):
+        import numpy as np
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in zip(out, texts):
+            for word in text.lower().replace(".", " ").split():
+                row[sum(map(ord, word)) % self.dim] += 1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1.0, norms)
+
+
+@pytest.fixture
+def stub_model(monkeypatch):
+    """Serve _WordEncoder as the embedding model singleton (no download needed)."""
+    from src.retrieval import embedding_dispatcher, models
+    model = _WordEncoder()
+    monkeypatch.setenv("EMBEDDING_MODEL", "stub-words")
+    monkeypatch.setitem(models._MODELS, "embedding", model)
+    monkeypatch.setattr(embedding_dispatcher, "_dispatcher", None)
+    return model
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # QdrantVectorStore — in-memory path (no disk I/O, fast CI tests)
 # ─────────────────────────────────────────────────────────────────────────────
@@ -89,6 +118,17 @@ class TestQdrantVectorStoreMemory:
         # Should not crash and should return something
         assert isinstance(results, list)
 
+    def test_payload_keeps_only_filter_fields(self, tmp_path, monkeypatch, stub_model):
+        from src.retrieval.vector_store import QdrantVectorStore
+        monkeypatch.setenv("QDRANT_PATH", str(tmp_path / "qdrant_test"))
+        store = QdrantVectorStore()
+        store.add_texts(["Annual leave is 25 days."], [{"source": "g.pdf", "page": 3, "chunk_id": "g.pdf_p3_c0"}])
+        [point] = store.client.scroll(store.collection_name, limit=10)[0]
+        assert "text" not in point.payload and "chunk_id" not in point.payload
+        [(text, meta, _score)] = store.similarity_search("leave", k=1)
+        assert text == "Annual leave is 25 days."
+        assert meta == {"source": "g.pdf", "page": 3, "chunk_id": "g.pdf_p3_c0"}
+
     def test_uuid_id_is_valid(self, tmp_path):
         """Regression: ensure UUID format is correct (string uuid4 caused Qdrant failures)."""
         generated = uuid.UUID(str(uuid.uuid4()))
@@ -96,6 +136,619 @@ class TestQdrantVectorStoreMemory:
         assert isinstance(generated, uuid.UUID)
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Chunk text store
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestChunkTextStore:
+    def test_round_trip_and_delete(self, tmp_path):
+        from src.retrieval.chunk_store import ChunkTextStore
+        store = ChunkTextStore(str(tmp_path / "chunks.sqlite3"))
+        store.put([("a", "Alpha text " * 100, {"chunk_id": "x_p1_c0"}), ("b", "Beta", {})])
+
+        got = store.get_many(["a", "b", "missing"])
+        assert got["a"] == ("Alpha text " * 100, {"chunk_id": "x_p1_c0"})
+        assert set(got) == {"a", "b"}
+        assert store.stats()["compressed_bytes"] < len("Alpha text " * 100)
+
+        store.delete(["a"])
+        assert set(store.get_many(["a", "b"])) == {"b"}
+
+    def test_retrieval_fetches_each_candidate_once(self):
+        from pipelines.retrieval_pipeline import _search_all
+
+        class _IdStore:
+            materialized = []
+
+            def search_points_many(self, queries, k):
+                return [[("p1", {"source": "a.pdf"}, 0.9), (f"p-{q}", {"source": "b.pdf"}, 0.5)] for q in queries]
+
+            def materialize(self, hits):
+                self.materialized.extend(pid for pid, _, _ in hits)
+                return [(f"text {pid}", payload, score) for pid, payload, score in hits]
+
+        store = _IdStore()
+        results = _search_all(store, ["q1", "q2", "q3"])
+        assert sorted(store.materialized) == ["p-q1", "p-q2", "p-q3", "p1"]
+        assert results[0] == ("text p1", {"source": "a.pdf"}, 0.9)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Embedding cache
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _HashEncoder:
+    """Deterministic stand-in for SentenceTransformer.encode that counts calls."""
+
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.encoded = []
+
+    def encode(self, texts, **kwargs):
+        import numpy as np
+        self.encoded.extend(texts)
+        return np.array([
+            np.random.default_rng(abs(hash(t)) % 2 ** 32).normal(size=self.dim) for t in texts
+        ], dtype=np.float32)
+
+
+class TestEmbeddingCache:
+    def test_only_uncached_texts_are_encoded(self, tmp_path, monkeypatch):
+        import numpy as np
+        from src.retrieval import embedding_cache
+        cache = embedding_cache.EmbeddingCache(str(tmp_path / "emb.sqlite3"))
+        monkeypatch.setattr(embedding_cache, "_cache", cache)
+        model = _HashEncoder()
+
+        first = embedding_cache.encode_documents(model, ["alpha", "beta"], "m1")
+        second = embedding_cache.encode_documents(model, ["beta", "gamma", "alpha  "], "m1")
+
+        assert model.encoded == ["alpha", "beta", "gamma"]
+        assert second.dtype == np.float32
+        np.testing.assert_array_equal(second[0], first[1])
+        np.testing.assert_array_equal(second[2], first[0])  # whitespace-normalised key
+        assert cache.hits == 2 and cache.misses == 3
+
+        embedding_cache.encode_documents(model, ["alpha"], "m2")  # other model: miss
+        assert model.encoded[-1] == "alpha"
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        import numpy as np
+        from src.retrieval.embedding_cache import EmbeddingCache
+        cache = EmbeddingCache(str(tmp_path / "emb.sqlite3"), max_mb=1)
+        vecs = np.ones((300, 1024), dtype=np.float32)  # ~4 KB each, ~1.2 MB total
+        cache.put_many("m", [f"old {i}" for i in range(150)], vecs[:150])
+        cache.get_many("m", ["old 0"])  # refresh one old entry
+        cache.put_many("m", [f"new {i}" for i in range(150)], vecs[150:])
+
+        assert cache._size <= cache.max_bytes
+        got = cache.get_many("m", ["old 0", "old 1", "new 149"])
+        assert got[0] is not None and got[1] is None and got[2] is not None
+
+    def test_length_batches_respect_size_and_token_budget(self):
+        from src.retrieval.embedding_cache import length_batches
+        lengths = [500, 10, 12, 300, 11, 40, 9, 600]
+        batches = length_batches(lengths, batch_size=3, token_budget=1000)
+
+        assert sorted(i for b in batches for i in b) == list(range(len(lengths)))
+        flat = [lengths[i] for b in batches for i in b]
+        assert flat == sorted(lengths)
+        for b in batches:
+            assert len(b) <= 3
+            assert len(b) == 1 or len(b) * max(lengths[i] for i in b) <= 1000
+        assert batches[-1] == [7]  # over budget on its own, still encoded
+
+    def test_bucketed_encoding_keeps_input_order(self, monkeypatch):
+        import numpy as np
+        from src.retrieval import embedding_cache
+        monkeypatch.setattr(embedding_cache, "EMBED_TOKEN_BUDGET", 64)
+        model = _HashEncoder()
+        texts = ["x " * n for n in (90, 3, 40, 12, 120, 30)]
+
+        out = embedding_cache.encode_bucketed(model, texts)
+
+        assert out.dtype == np.float32 and out.flags["C_CONTIGUOUS"]
+        np.testing.assert_array_equal(out, model.encode(texts))
+        assert model.encoded[:len(texts)] == sorted(texts, key=len)
+
+
+class TestQueryEmbeddings:
+    def test_variants_encoded_in_one_pass_and_cached(self, monkeypatch):
+        import numpy as np
+        from src.retrieval import embedding_cache
+        monkeypatch.setattr(embedding_cache, "_query_lru", embedding_cache.QueryEmbeddingLRU(maxsize=2))
+        calls = []
+
+        class _Model(_HashEncoder):
+            def encode(self, texts, **kwargs):
+                calls.append(list(texts))
+                return super().encode(texts, **kwargs)
+
+        model = _Model()
+        first = embedding_cache.encode_queries(model, ["leave policy", "annual leave", "leave policy"], "m")
+        again = embedding_cache.encode_queries(model, ["annual leave", "leave policy"], "m")
+
+        assert calls == [["leave policy", "annual leave"]]
+        np.testing.assert_array_equal(first[0], first[2])
+        np.testing.assert_array_equal(again[0], first[1])
+
+        embedding_cache.encode_queries(model, ["parental leave"], "m")  # evicts "annual leave"
+        embedding_cache.encode_queries(model, ["annual leave"], "m")
+        assert calls[-1] == ["annual leave"]
+
+
+class TestEmbeddingDispatcher:
+    def test_concurrent_requests_share_forward_passes(self):
+        import threading
+        import numpy as np
+        from src.retrieval.embedding_dispatcher import EmbeddingDispatcher
+
+        class _Model(_HashEncoder):
+            batch_sizes = []
+
+            def encode(self, texts, **kwargs):
+                self.batch_sizes.append(len(texts))
+                return super().encode(texts, **kwargs)
+
+        model = _Model()
+        dispatcher = EmbeddingDispatcher(model, max_batch=16, max_wait_ms=50)
+        results = {}
+
+        def _ask(i):
+            results[i] = dispatcher.encode([f"question {i}", f"variant {i}"])
+
+        threads = [threading.Thread(target=_ask, args=(i,)) for i in range(12)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        dispatcher.close()
+
+        assert sum(model.batch_sizes) == 24
+        assert len(model.batch_sizes) < 12 and max(model.batch_sizes) <= 16
+        expected = _HashEncoder().encode(["question 3", "variant 3"])
+        np.testing.assert_array_equal(results[3], expected)
+
+    def test_errors_reach_every_caller(self):
+        from src.retrieval.embedding_dispatcher import EmbeddingDispatcher
+
+        class _Broken:
+            def encode(self, texts, **kwargs):
+                raise RuntimeError("out of memory")
+
+        dispatcher = EmbeddingDispatcher(_Broken(), max_wait_ms=0)
+        with pytest.raises(RuntimeError, match="out of memory"):
+            dispatcher.encode(["q"])
+        dispatcher.close()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ONNX int8 backend
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestOnnxBackend:
+    WORDS = "annual leave notice period payroll contractor expenses policy".split()
+
+    def _tiny_bert(self, path, num_labels=None):
+        from transformers import BertConfig, BertModel, BertForSequenceClassification, BertTokenizerFast
+        path.mkdir()
+        (path / "vocab.txt").write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + self.WORDS))
+        tok = BertTokenizerFast(vocab_file=str(path / "vocab.txt"))
+        cfg = BertConfig(vocab_size=tok.vocab_size, hidden_size=32, num_hidden_layers=2,
+                         num_attention_heads=2, intermediate_size=64, num_labels=num_labels or 2)
+        model = BertForSequenceClassification(cfg) if num_labels else BertModel(cfg)
+        model.save_pretrained(str(path))
+        tok.save_pretrained(str(path))
+        return str(path)
+
+    def test_int8_encoder_matches_torch(self, tmp_path, monkeypatch):
+        import numpy as np
+        pytest.importorskip("onnxruntime")
+        from sentence_transformers import CrossEncoder, SentenceTransformer
+        from src.retrieval import onnx_backend
+        monkeypatch.setattr(onnx_backend, "ONNX_CACHE_DIR", str(tmp_path / "onnx"))
+
+        texts = ["annual leave policy", "notice period for contractor", "payroll expenses " * 20]
+        model_dir = self._tiny_bert(tmp_path / "bert")
+        onnx_model = onnx_backend.load_onnx_model("embedding", model_dir)
+        expected = SentenceTransformer(model_dir, device="cpu").encode(texts, normalize_embeddings=True)
+        got = onnx_model.encode(texts, normalize_embeddings=True)
+        assert got.shape == expected.shape and got.dtype == np.float32
+        assert np.min(np.sum(got * expected, axis=1)) > 0.99
+
+        ce_dir = self._tiny_bert(tmp_path / "ce", num_labels=1)
+        pairs = [("annual leave", t) for t in texts]
+        onnx_ce = onnx_backend.load_onnx_model("reranker", ce_dir)
+        np.testing.assert_allclose(
+            onnx_ce.predict(pairs), CrossEncoder(ce_dir, device="cpu").predict(pairs), atol=0.05
+        )
+
+    def test_model_id_follows_the_loaded_backend(self, tmp_path, monkeypatch):
+        from src.retrieval import models
+        model_dir = self._tiny_bert(tmp_path / "bert")
+        monkeypatch.setenv("EMBEDDING_MODEL", model_dir)
+        monkeypatch.setattr(models, "EMBEDDING_BACKEND", "onnx-int8")
+        monkeypatch.setattr(models, "_load_onnx", lambda kind, name: None)  # export failed
+        monkeypatch.setitem(models._MODELS, "embedding", None)
+        assert models.get_embedding_model_id() == model_dir  # served by the PyTorch fallback
+
+        monkeypatch.setitem(models._MODELS, "embedding", type("Encoder", (), {"backend": "onnx-int8"})())
+        assert models.get_embedding_model_id() == f"{model_dir}@onnx-int8"
+
+    def test_interrupted_export_leaves_nothing_behind(self, tmp_path, monkeypatch):
+        import os
+        pytest.importorskip("onnxruntime")
+        from src.retrieval import onnx_backend
+        monkeypatch.setattr(onnx_backend, "ONNX_CACHE_DIR", str(tmp_path / "onnx"))
+        model_dir = self._tiny_bert(tmp_path / "bert")
+
+        def _killed(module, tokenizer, path, output_name):
+            open(os.path.join(path, onnx_backend._MODEL_FILE), "wb").close()
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(onnx_backend, "_export", _killed)
+        with pytest.raises(KeyboardInterrupt):
+            onnx_backend.load_onnx_model("embedding", model_dir)
+        assert os.listdir(tmp_path / "onnx") == []
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# In-memory fallback index
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestMemoryVectorIndex:
+    def test_search_matches_brute_force_cosine(self):
+        import numpy as np
+        from src.retrieval.memory_index import MemoryVectorIndex
+        rng = np.random.default_rng(0)
+        vecs = rng.normal(size=(700, 32)).astype(np.float32)  # grows past the initial capacity
+        index = MemoryVectorIndex()
+        for start in range(0, 700, 100):
+            ids = [f"p{i}" for i in range(start, start + 100)]
+            index.add(ids, [f"text {i}" for i in ids], [{"n": i} for i in ids], vecs[start:start + 100])
+        query = rng.normal(size=32)
+
+        [hits] = index.search(query, k=5)
+        expected = sorted(range(700), key=lambda i: -_cosine(query, vecs[i]))[:5]
+        assert [pid for pid, _, _ in hits] == [f"p{i}" for i in expected]
+        assert abs(hits[0][2] - _cosine(query, vecs[expected[0]])) < 1e-5
+        assert all(score >= 0.3 for _, _, score in index.search(query, k=50, score_threshold=0.3)[0])
+
+    def test_replace_remove_and_update(self):
+        import numpy as np
+        from src.retrieval.memory_index import MemoryVectorIndex
+        index = MemoryVectorIndex()
+        eye = np.eye(3, dtype=np.float32)
+        index.add(["a", "b", "c"], ["A", "B", "C"], [{}, {}, {"source": "x"}], eye * 5)
+        index.add(["a"], ["A2"], [{"v": 2}], [eye[1]])  # same ID: replaced, not duplicated
+
+        assert len(index) == 3
+        assert index.remove(["b", "missing"]) == 1
+        index.update_metadata(["c"], {"file_hash": "h"})
+        assert index.get_many(["a", "b", "c"]) == {"a": ("A2", {"v": 2}), "c": ("C", {"source": "x", "file_hash": "h"})}
+        [hits] = index.search(eye[1], k=3)
+        assert [pid for pid, _, _ in hits] == ["a", "c"] and hits[0][2] == pytest.approx(1.0)
+        assert sorted(pid for pid, _, _ in index.items()) == ["a", "c"]
+
+
+class TestDurableVectorIndex:
+    def test_points_survive_reopen_and_torn_rows_are_ignored(self, tmp_path):
+        import numpy as np
+        from src.retrieval.fallback_index import DurableVectorIndex
+        eye = np.eye(4, dtype=np.float32)
+        index = DurableVectorIndex(str(tmp_path))
+        index.add(["a", "b", "c"], ["A", "B", "C"], [{"n": 1}, {"n": 2}, {"n": 3}], eye[:3] * 3)
+        index.add(["a"], ["A2"], [{"n": 4}], [eye[3]])  # replaced: old row is left dead
+        assert index.remove(["b"]) == 1
+        # A crash mid-write: the vector file ends part-way through a row
+        with open(tmp_path / "vectors.f32", "ab") as f:
+            f.write(b"\0" * 7)
+
+        reopened = DurableVectorIndex(str(tmp_path))
+        assert len(reopened) == 2 and reopened.dim == 4
+        [hits] = reopened.search(eye[3], k=5)
+        assert [pid for pid, _, _ in hits] == ["a", "c"] and hits[0][1] == {"n": 4}
+        assert hits[0][2] == pytest.approx(1.0)
+        assert reopened.get_many(["a", "b"]) == {"a": ("A2", {"n": 4})}
+        np.testing.assert_allclose(reopened.vectors(["c"]), eye[2:3])
+
+        reopened.remove(["a", "c"])  # empty: the vector file is dropped
+        assert (tmp_path / "vectors.f32").stat().st_size == 0
+        reopened.add(["d"], ["D"], [{}], [[1.0, 0.0]])  # and may restart at a new width
+        assert DurableVectorIndex(str(tmp_path)).dim == 2
+
+    def test_rows_appended_after_a_torn_row_stay_aligned(self, tmp_path):
+        import numpy as np
+        from src.retrieval.fallback_index import DurableVectorIndex
+        eye = np.eye(4, dtype=np.float32)
+        DurableVectorIndex(str(tmp_path)).add(["a"], ["A"], [{}], [eye[0]])
+        with open(tmp_path / "vectors.f32", "ab") as f:
+            f.write(b"\1" * 7)
+
+        reopened = DurableVectorIndex(str(tmp_path))
+        assert (tmp_path / "vectors.f32").stat().st_size == 16
+        reopened.add(["b"], ["B"], [{}], [eye[1]])
+        again = DurableVectorIndex(str(tmp_path))
+        np.testing.assert_allclose(again.vectors(["a", "b"]), eye[:2])
+        [hits] = again.search(eye[1], k=1)
+        assert hits[0][0] == "b" and hits[0][2] == pytest.approx(1.0)
+
+    def test_second_process_falls_back_to_memory(self, tmp_path):
+        import os
+        import subprocess
+        import sys
+        from pathlib import Path
+        from src.retrieval.fallback_index import DurableVectorIndex
+        DurableVectorIndex(str(tmp_path / "docs")).add(["a"], ["A"], [{}], [[1.0, 0.0]])
+        DurableVectorIndex(str(tmp_path / "docs"))  # same process: still the owner
+
+        script = (
+            "from src.retrieval.fallback_index import open_fallback_index\n"
+            "index = open_fallback_index('docs')\n"
+            "print(type(index).__name__, len(index))\n"
+        )
+        env = {**os.environ, "FALLBACK_INDEX_DIR": str(tmp_path), "FALLBACK_INDEX": "1"}
+        out = subprocess.run(
+            [sys.executable, "-c", script], env=env, cwd=str(Path(__file__).resolve().parents[1]),
+            capture_output=True, text=True, timeout=60,
+        )
+        assert out.stdout.split() == ["MemoryVectorIndex", "0"], out.stderr
+
+    def test_reconcile_moves_points_into_qdrant_once_it_accepts_writes(self, tmp_path):
+        import numpy as np
+        from src.retrieval.fallback_index import DurableVectorIndex
+        from src.retrieval.vector_store import QdrantVectorStore
+
+        class FlakyClient:
+            def __init__(self):
+                self.down, self.uploaded = True, []
+
+            def upload_collection(self, ids, vectors, payload, **kwargs):
+                if self.down:
+                    raise ConnectionError("qdrant unavailable")
+                self.uploaded.extend(zip(ids, np.asarray(vectors).tolist(), payload))
+
+        store = QdrantVectorStore.__new__(QdrantVectorStore)
+        store.collection_name, store.chunk_store, store.projection, store.dimension = "docs", None, None, 2
+        store.client = FlakyClient()
+        store._memory = DurableVectorIndex(str(tmp_path))
+        store._memory.add(["p1", "p2"], ["one", "two"], [{"source": "a.pdf"}, {}], [[3.0, 0.0], [0.0, 1.0]])
+
+        assert store.reconcile_fallback(batch_size=1) == 0 and len(store._memory) == 2
+        store.client.down = False
+        assert store.reconcile_fallback(batch_size=1) == 2 and len(store._memory) == 0
+        assert store.client.uploaded == [
+            ("p1", [1.0, 0.0], {"source": "a.pdf", "text": "one"}),
+            ("p2", [0.0, 1.0], {"text": "two"}),
+        ]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Reduced-dimension projection
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestVectorProjection:
+    def test_pca_round_trip_preserves_neighbours(self, tmp_path):
+        import numpy as np
+        from src.retrieval.projection import VectorProjection
+        rng = np.random.default_rng(0)
+        # 8 informative directions inside 64 dims, plus a little noise
+        x = rng.normal(size=(400, 8)) @ rng.normal(size=(8, 64)) + 0.01 * rng.normal(size=(400, 64))
+        x = (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+        projection = VectorProjection.fit_pca(x, 8, model_name="m")
+        projection.save(str(tmp_path / "p.npz"))
+        loaded = VectorProjection.load(str(tmp_path / "p.npz"))
+        y = loaded.apply(x)
+
+        assert y.shape == (400, 8) and y.dtype == np.float32
+        np.testing.assert_allclose(np.linalg.norm(y, axis=1), 1.0, atol=1e-5)
+        np.testing.assert_array_equal(y, projection.apply(x))
+        assert np.argmax(y[1:] @ y[0]) == np.argmax(x[1:] @ x[0])
+
+    def test_get_projection_uses_saved_pca_for_same_model_only(self, tmp_path, monkeypatch):
+        import numpy as np
+        from src.retrieval import projection as proj
+        monkeypatch.setattr(proj, "PROJECTION_DIR", str(tmp_path))
+        monkeypatch.setattr(proj, "VECTOR_PROJECTION", "pca")
+        monkeypatch.setattr(proj, "VECTOR_DIM", 4)
+        assert proj.get_projection("docs", 16, "m1") is None  # not fitted yet
+
+        sample = np.random.default_rng(0).normal(size=(32, 16)).astype(np.float32)
+        proj.VectorProjection.fit_pca(sample, 4, model_name="m1").save(proj.projection_path("docs"))
+        assert proj.get_projection("docs", 16, "m1").dim == 4
+        assert proj.get_projection("docs", 16, "m2") is None
+
+        monkeypatch.setattr(proj, "VECTOR_PROJECTION", "truncate")
+        assert proj.get_projection("other", 16, "m1").apply(sample).shape == (32, 4)
+
+    def test_projection_is_keyed_by_model_name_not_backend(self, tmp_path, monkeypatch):
+        import json
+        import numpy as np
+        from src.retrieval import projection as proj
+        monkeypatch.setattr(proj, "PROJECTION_DIR", str(tmp_path))
+        sample = np.random.default_rng(0).normal(size=(32, 16)).astype(np.float32)
+        fitted = proj.VectorProjection.fit_pca(sample, 4, model_name="m1")
+        # A file written before the key change: "model_id" with the backend suffix
+        info = {"kind": "pca", "input_dim": 16, "dim": 4, "model_id": "m1@onnx-int8"}
+        np.savez(proj.projection_path("docs"), info=np.array(json.dumps(info)), components=fitted.components)
+
+        loaded = proj.load_saved_projection("docs", 16, "m1")
+        assert loaded is not None and loaded.model_name == "m1"
+
+    def test_narrower_collection_without_its_projection_refuses_to_open(self, tmp_path, monkeypatch):
+        from types import SimpleNamespace
+        from src.retrieval import projection as proj
+        from src.retrieval.vector_store import QdrantVectorStore
+        monkeypatch.setattr(proj, "PROJECTION_DIR", str(tmp_path))
+
+        class Client:
+            deleted = False
+
+            def get_collection(self, name):
+                return SimpleNamespace(config=SimpleNamespace(params=SimpleNamespace(vectors=SimpleNamespace(size=4))))
+
+            def delete_collection(self, name):
+                self.deleted = True
+
+        store = QdrantVectorStore.__new__(QdrantVectorStore)
+        store.collection_name, store.client, store.projection = "docs", Client(), None
+        store.dimension = store.model_dimension = 16
+        store.rebuild = False
+        with pytest.raises(RuntimeError, match="fit_projection"):
+            store._ensure_collection()
+        assert not store.client.deleted
+
+        store.rebuild = True  # fit_projection opens it to rebuild from the stored text
+        store._ensure_collection()
+        assert not store.client.deleted
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Collection storage profiles
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestCollectionProfile:
+    def test_env_overrides_config_which_overrides_preset(self, monkeypatch):
+        from src.retrieval.collection_profile import load_profile
+        for var in ("QDRANT_PROFILE", "QDRANT_ON_DISK_VECTORS", "QDRANT_ON_DISK_PAYLOAD",
+                    "QDRANT_RESCORE", "QDRANT_OVERSAMPLING", "QDRANT_PQ_COMPRESSION"):
+            monkeypatch.delenv(var, raising=False)
+        assert load_profile({}).as_dict()["quantization"] == "none"
+
+        config = {"profile": "scalar", "oversampling": 1.5, "on_disk_payload": False}
+        profile = load_profile(config)
+        assert (profile.quantization, profile.on_disk_vectors, profile.on_disk_payload) == ("scalar", True, False)
+        assert profile.oversampling == 1.5
+
+        monkeypatch.setenv("QDRANT_PROFILE", "product")
+        monkeypatch.setenv("QDRANT_PQ_COMPRESSION", "32")
+        monkeypatch.setenv("QDRANT_RESCORE", "0")
+        profile = load_profile(config)
+        assert profile.as_dict()["quantization"] == "product-x32" and profile.rescore is False
+        assert profile.oversampling == 1.5  # still from config.yaml
+
+        monkeypatch.setenv("QDRANT_PROFILE", "bogus")
+        assert load_profile(config).name == "memory"
+
+    def test_qdrant_models_and_ram_estimate(self):
+        from qdrant_client.http import models as qm
+        from src.retrieval.collection_profile import CollectionProfile
+        memory = CollectionProfile.preset("memory")
+        assert memory.quantization_config() is None and memory.search_params().quantization is None
+        assert memory.vectors_config(1024).on_disk is False
+
+        scalar = CollectionProfile.preset("scalar")
+        assert scalar.quantization_config().scalar.type == qm.ScalarType.INT8
+        assert scalar.search_params().quantization.oversampling == 2.0
+        assert scalar.vectors_config(1024).on_disk is True
+        binary = CollectionProfile.preset("binary")
+        assert isinstance(binary.quantization_config(), qm.BinaryQuantization)
+
+        n, dim = 1_000_000, 1024
+        ram = [p.ram_bytes(n, dim) for p in (memory, scalar, CollectionProfile.preset("product"), binary)]
+        assert ram == sorted(ram, reverse=True)
+        assert ram[0] > 4 * n * dim > ram[1]
+
+
+    def test_search_profiles_map_to_search_params(self):
+        from src.retrieval import collection_profile as cp
+        scalar = cp.CollectionProfile.preset("scalar", hnsw_m=32)
+        fast, balanced, exact = (scalar.search_params(name) for name in cp.SEARCH_PROFILES)
+        assert (fast.hnsw_ef, fast.quantization.rescore) == (cp.SEARCH_EF_FAST, False)
+        assert (balanced.hnsw_ef, balanced.quantization.rescore) == (cp.SEARCH_EF_BALANCED, True)
+        assert balanced.quantization.oversampling == 2.0
+        assert exact.exact is True and exact.quantization.ignore is True
+        assert scalar.hnsw_config().m == 32
+        with pytest.raises(ValueError):
+            scalar.search_params("slow")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Metadata filters
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestMetadataFilters:
+    _metas = [
+        {"source": "contract_x.pdf" if i % 3 == 0 else "handbook.pdf", "page": i, "type": "ocr" if i % 4 == 0 else "text"}
+        for i in range(24)
+    ]
+
+    def test_qdrant_filter_matches_python_semantics(self):
+        import numpy as np
+        from qdrant_client import QdrantClient
+        from qdrant_client.http import models as qm
+        from src.retrieval.filters import matches, normalize_filters, to_qdrant_filter
+
+        client = QdrantClient(":memory:")
+        client.create_collection("docs", vectors_config=qm.VectorParams(size=4, distance=qm.Distance.COSINE))
+        vecs = np.random.default_rng(0).normal(size=(24, 4))
+        client.upsert("docs", points=[
+            qm.PointStruct(id=i, vector=vecs[i].tolist(), payload=meta) for i, meta in enumerate(self._metas)
+        ])
+        for raw in (
+            {"source": "contract_x.pdf"},
+            {"source": ["contract_x.pdf", "other.pdf"], "type": "ocr"},
+            {"page": {"gte": 5, "lt": 12}, "type": "text"},
+            {"page": [2, 3.0]},
+        ):
+            filters = normalize_filters(raw)
+            hits = client.query_points("docs", query=[1, 0, 0, 0], query_filter=to_qdrant_filter(filters), limit=24)
+            expected = {i for i, meta in enumerate(self._metas) if matches(meta, filters)}
+            assert {p.id for p in hits.points} == expected and expected
+
+    def test_source_filter_also_matches_near_duplicate_files(self):
+        import numpy as np
+        from qdrant_client import QdrantClient
+        from qdrant_client.http import models as qm
+        from src.retrieval.filters import matches, normalize_filters, to_qdrant_filter
+
+        metas = [
+            {"source": "a.pdf"},
+            {"source": "a.pdf", "also_in": ["b.pdf", "c.pdf"]},
+            {"source": "c.pdf"},
+            {"source": "d.pdf", "also_in": []},
+        ]
+        client = QdrantClient(":memory:")
+        client.create_collection("docs", vectors_config=qm.VectorParams(size=4, distance=qm.Distance.COSINE))
+        vecs = np.random.default_rng(0).normal(size=(len(metas), 4))
+        client.upsert("docs", points=[
+            qm.PointStruct(id=i, vector=vecs[i].tolist(), payload=meta) for i, meta in enumerate(metas)
+        ])
+        for raw, expected in (
+            ({"source": "b.pdf"}, {1}),
+            ({"source": "c.pdf"}, {1, 2}),
+            ({"source": ["b.pdf", "d.pdf"]}, {1, 3}),
+            ({"source": "a.pdf"}, {0, 1}),
+        ):
+            filters = normalize_filters(raw)
+            assert {i for i, meta in enumerate(metas) if matches(meta, filters)} == expected
+            hits = client.query_points("docs", query=[1, 0, 0, 0], query_filter=to_qdrant_filter(filters), limit=10)
+            assert {p.id for p in hits.points} == expected
+
+    def test_fallback_indexes_filter_before_top_k(self, tmp_path):
+        import numpy as np
+        from src.retrieval.fallback_index import DurableVectorIndex
+        from src.retrieval.filters import matches, normalize_filters
+        from src.retrieval.memory_index import MemoryVectorIndex
+
+        vecs = np.random.default_rng(1).normal(size=(24, 8)).astype(np.float32)
+        ids = [f"p{i}" for i in range(24)]
+        filters = normalize_filters({"type": "ocr"})
+        for index in (MemoryVectorIndex(), DurableVectorIndex(str(tmp_path))):
+            index.add(ids, [""] * 24, self._metas, vecs)
+            [hits] = index.search(vecs[1], k=3, where=lambda meta: matches(meta, filters))
+            assert len(hits) == 3 and all(meta["type"] == "ocr" for _, meta, _ in hits)
+            assert index.search(vecs[1], k=3, where=lambda meta: False) == [[]]
+
+    def test_malformed_filters_rejected(self):
+        from src.retrieval.filters import normalize_filters
+        assert normalize_filters(None) == {}
+        for bad in ({"page": {"near": 3}}, {"page": {"gte": "3"}}, {"source": []}, {"source": {"a": 1}}, ["source"]):
+            with pytest.raises(ValueError):
+                normalize_filters(bad)
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # text_cleaner regression (quick cross-reference)
 # ─────────────────────────────────────────────────────────────────────────────